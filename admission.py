@@ -0,0 +1,142 @@
+import os
+import time
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+
+import deadlines
+from latency import LatencyWindow
+
+# Concurrent calls and queued calls allowed per tool, as (limit, queue size)
+DEFAULT_TOOL_LIMIT = (int(os.getenv("TRAIN_MCP_TOOL_CONCURRENCY", "32")), int(os.getenv("TRAIN_MCP_TOOL_QUEUE", "64")))
+TOOL_LIMITS = {
+    # Fan-out tools: every call makes many upstream requests
+    "check_seat_availability_matrix": (4, 8),
+    "find_best_journeys": (4, 8),
+    "get_live_train_status_batch": (4, 8),
+    "get_pnr_status_batch": (4, 8),
+    "get_train_information_batch": (4, 8),
+    "import_timetable": (2, 4),
+    # Live boards are rarely cached and slow upstream
+    "get_live_station_status": (16, 32),
+    "get_live_station_status_hedged": (16, 32),
+}
+# Overrides as "tool=limit:queue,...", e.g. "get_live_station_status=8:16"
+TOOL_LIMIT_OVERRIDES = os.getenv("TRAIN_MCP_TOOL_LIMITS", "")
+# Longest a call waits for a slot before it is rejected (capped by the tool deadline)
+QUEUE_TIMEOUT = float(os.getenv("TRAIN_MCP_TOOL_QUEUE_TIMEOUT", "5"))
+DEFAULT_SERVICE_TIME = 1.0
+
+
+class Overloaded(Exception):
+    """
+    Raised when a tool call is not admitted: its queue is full or no slot frees up in time.
+    """
+
+    def __init__(self, name: str, retry_after: float, reason: str):
+        super().__init__(f"Server overloaded: {name} {reason}, retry after {retry_after:.1f}s")
+        self.name = name
+        self.retry_after = retry_after
+
+    def result(self) -> dict:
+        return {"error": str(self), "overloaded": True, "retry_after": round(self.retry_after, 1)}
+
+
+class Gate:
+    """
+    Concurrency limit for one tool with a bounded FIFO queue in front of it.
+    A call that finds the queue full, or cannot get a slot before its queueing deadline, is
+    rejected at once with a retry hint instead of piling up behind slow calls.
+    """
+
+    def __init__(self, name: str, limit: int, queue_size: int):
+        self.name = name
+        self.limit = max(1, limit)
+        self.queue_size = max(0, queue_size)
+        self.running = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.durations = LatencyWindow(100)
+        self._waiters = deque()
+
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    def expected_wait(self, ahead: int) -> float:
+        """
+        Seconds until a call with `ahead` queued calls in front of it would get a slot.
+        """
+        return self.durations.percentile(50, DEFAULT_SERVICE_TIME) * (ahead + 1) / self.limit
+
+    async def acquire(self, deadline: float = None) -> None:
+        """
+        Wait for a slot. deadline is a time.monotonic() value.
+        """
+        if self.running < self.limit and not self._waiters:
+            self.running += 1
+            self.admitted += 1
+            return
+        ahead = len(self._waiters)
+        if ahead >= self.queue_size:
+            self.rejected += 1
+            raise Overloaded(self.name, self.expected_wait(ahead), f"has {self.running} calls running and {ahead} waiting")
+        timeout = QUEUE_TIMEOUT
+        if deadline is not None:
+            timeout = min(timeout, deadline - time.monotonic())
+        expected = self.expected_wait(ahead)
+        if expected > timeout:
+            self.rejected += 1
+            raise Overloaded(self.name, expected, f"would queue for about {expected:.1f}s")
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, max(0.0, timeout))
+        except BaseException as e:
+            if waiter.done() and not waiter.cancelled():
+                self.release()  # a slot was handed over just as the wait ended
+            else:
+                self._waiters.remove(waiter)
+            if isinstance(e, asyncio.TimeoutError):
+                self.rejected += 1
+                raise Overloaded(self.name, self.expected_wait(len(self._waiters)), f"had no free slot for {timeout:.1f}s") from None
+            raise
+        self.admitted += 1
+
+    def release(self) -> None:
+        # Hand the slot straight to the oldest waiter, so that new arrivals cannot overtake the queue
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.running -= 1
+
+    @asynccontextmanager
+    async def admit(self):
+        await self.acquire(deadlines.expires_at())
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.durations.record(time.perf_counter() - start)
+            self.release()
+
+
+def _parse_limits(spec: str) -> dict:
+    limits = dict(TOOL_LIMITS)
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        tool, _, numbers = item.partition("=")
+        limit, _, queue_size = numbers.partition(":")
+        limits[tool.strip()] = (int(limit), int(queue_size or limit))
+    return limits
+
+
+limits = _parse_limits(TOOL_LIMIT_OVERRIDES)
+gates = {}
+
+
+def gate_for(tool: str) -> Gate:
+    gate = gates.get(tool)
+    if gate is None:
+        gate = gates[tool] = Gate(tool, *limits.get(tool, DEFAULT_TOOL_LIMIT))
+    return gate
@@ -0,0 +1,153 @@
+import os
+import asyncio
+import datetime
+
+import ratelimit
+from records import parse_availability, pick, unwrap
+
+# Upper bound on availability requests one matrix call may make upstream
+MATRIX_MAX_CALLS = int(os.getenv("TRAIN_MCP_MATRIX_MAX_CALLS", "200"))
+MATRIX_MAX_DAYS = 31
+MATRIX_CONCURRENCY = int(os.getenv("TRAIN_MCP_MATRIX_CONCURRENCY", "8"))
+
+DATE_FORMATS = ("%d-%m-%Y", "%Y-%m-%d", "%Y%m%d")
+# Statuses that mean a ticket can be booked right now
+BOOKABLE_PREFIXES = ("AVAILABLE", "AVL", "CURR_AVBL", "RAC")
+
+
+def parse_date(value):
+    """
+    A datetime.date from dd-mm-yyyy, yyyy-mm-dd or yyyymmdd (day and month may be unpadded), or None.
+    """
+    for pattern in DATE_FORMATS:
+        try:
+            return datetime.datetime.strptime(str(value).strip(), pattern).date()
+        except ValueError:
+            continue
+    return None
+
+
+def date_range(start: str, days: int) -> list:
+    """
+    `days` consecutive dates from start, as datetime.date values.
+    """
+    first = parse_date(start)
+    if first is None:
+        raise ValueError(f"Unrecognised date {start!r}, expected dd-mm-yyyy or yyyy-mm-dd")
+    if not 1 <= days <= MATRIX_MAX_DAYS:
+        raise ValueError(f"days must be between 1 and {MATRIX_MAX_DAYS}")
+    return [first + datetime.timedelta(days=offset) for offset in range(days)]
+
+
+def bookable(status) -> bool:
+    return isinstance(status, str) and status.upper().startswith(BOOKABLE_PREFIXES)
+
+
+def class_codes(data) -> list:
+    """
+    Class codes from a getTrainClasses response: a list of codes or of {"class"/"classType": code} records.
+    """
+    body = unwrap(data)
+    codes = []
+    for item in body if isinstance(body, list) else []:
+        code = pick(item, "class", "classType", "Code") if isinstance(item, dict) else item
+        if isinstance(code, str) and code.strip():
+            codes.append(str(code).strip().upper())
+    return list(dict.fromkeys(codes))
+
+
+async def availability_matrix(fetch, train_numbers: list, dates: list, classes_for, quotas: list,
+                              concurrency: int = None) -> dict:
+    """
+    Seat availability for every train x class x quota x date combination.
+
+    fetch(train, date, class_code, quota) is a coroutine returning one upstream availability
+    response; classes_for(train) is a coroutine returning the class codes to check for a train.
+    An availability response usually covers several days from the requested date, so each
+    train/class/quota row is filled in rounds: every round asks, concurrently across rows,
+    for the first date that is still unknown and fills in every date the answer covers.
+    At most MATRIX_MAX_CALLS availability requests are made; cells left unchecked then read
+    "UNCHECKED" and "truncated" says why.
+
+    Returns {"dates", "grid": {train: {"CLASS/QUOTA": [status per date]}}, "available": [...],
+    "upstream_calls", "errors"}, plus "truncated" when the request budget ran out.
+    """
+    train_numbers = list(dict.fromkeys(str(train).strip() for train in train_numbers if str(train).strip()))
+    quotas = list(dict.fromkeys(str(quota).strip().upper() for quota in quotas if str(quota).strip()))
+    semaphore = asyncio.Semaphore(max(1, min(concurrency or MATRIX_CONCURRENCY, 32)))
+    level = ratelimit.explicit_priority()
+
+    async def bounded(call, *args):
+        async with semaphore:
+            return await call(*args)
+
+    with ratelimit.priority(ratelimit.NORMAL if level is None else level):
+        classes = await asyncio.gather(*(bounded(classes_for, train) for train in train_numbers), return_exceptions=True)
+        rows = []
+        errors = []
+        for train, codes in zip(train_numbers, classes):
+            if isinstance(codes, Exception) or not codes:
+                errors.append({"train_number": train, "error": f"No classes known for train {train}: {codes or 'empty'}"})
+                continue
+            rows.extend((train, code, quota) for code in codes for quota in quotas)
+        truncated = None
+        if len(rows) > MATRIX_MAX_CALLS:
+            truncated = (f"{len(rows)} train/class/quota rows requested, checked the first {MATRIX_MAX_CALLS}; "
+                         "narrow trains, classes or quotas to see the rest")
+            rows = rows[:MATRIX_MAX_CALLS]
+
+        statuses = {row: [None] * len(dates) for row in rows}
+        position = {date: index for index, date in enumerate(dates)}
+        calls = 0
+        while True:
+            wanted = []
+            for row, values in statuses.items():
+                missing = next((index for index, value in enumerate(values) if value is None), None)
+                if missing is not None:
+                    wanted.append((row, missing))
+            if not wanted:
+                break
+            if calls + len(wanted) > MATRIX_MAX_CALLS:
+                wanted = wanted[:MATRIX_MAX_CALLS - calls]
+                truncated = truncated or (f"Stopped after {MATRIX_MAX_CALLS} availability requests; "
+                                          "narrow trains, classes, quotas or dates to check the remaining cells")
+                if not wanted:
+                    break
+            calls += len(wanted)
+            answers = await asyncio.gather(
+                *(bounded(fetch, row[0], dates[index], row[1], row[2]) for row, index in wanted),
+                return_exceptions=True,
+            )
+            for (row, index), answer in zip(wanted, answers):
+                values = statuses[row]
+                if isinstance(answer, Exception) or (isinstance(answer, dict) and "error" in answer):
+                    message = str(answer) if isinstance(answer, Exception) else answer["error"]
+                    errors.append({"train_number": row[0], "class": row[1], "quota": row[2], "date": dates[index].isoformat(), "error": message})
+                    values[index] = "ERROR"
+                    continue
+                for record in parse_availability(answer):
+                    covered = position.get(parse_date(record.date))
+                    if covered is not None and values[covered] is None:
+                        values[covered] = record.status or "UNKNOWN"
+                if values[index] is None:
+                    values[index] = "UNKNOWN"
+
+    grid = {}
+    available = []
+    for (train, code, quota), values in statuses.items():
+        values[:] = ["UNCHECKED" if value is None else value for value in values]
+        grid.setdefault(train, {})[f"{code}/{quota}"] = values
+        for date, status in zip(dates, values):
+            if bookable(status):
+                available.append({"train_number": train, "class": code, "quota": quota, "date": date.isoformat(), "status": status})
+    available.sort(key=lambda cell: (cell["date"], cell["train_number"]))
+    matrix = {
+        "dates": [date.isoformat() for date in dates],
+        "grid": grid,
+        "available": available,
+        "upstream_calls": calls,
+        "errors": errors,
+    }
+    if truncated:
+        matrix["truncated"] = truncated
+    return matrix
@@ -0,0 +1,52 @@
+import os
+import asyncio
+import contextlib
+
+import ratelimit
+
+BATCH_CONCURRENCY = int(os.getenv("TRAIN_MCP_BATCH_CONCURRENCY", "8"))
+BATCH_MAX_CONCURRENCY = int(os.getenv("TRAIN_MCP_BATCH_MAX_CONCURRENCY", "32"))
+BATCH_MAX_ITEMS = int(os.getenv("TRAIN_MCP_BATCH_MAX_ITEMS", "50"))
+
+
+def _prepare(ids: list, concurrency: int):
+    ids = list(dict.fromkeys(str(item).strip() for item in ids if str(item).strip()))
+    if len(ids) > BATCH_MAX_ITEMS:
+        raise ValueError(f"At most {BATCH_MAX_ITEMS} ids per batch, got {len(ids)}")
+    concurrency = max(1, min(concurrency or BATCH_CONCURRENCY, BATCH_MAX_CONCURRENCY))
+    return ids, concurrency
+
+
+def _collect(ids: list, results: list) -> dict:
+    items = []
+    for item_id, result in zip(ids, results):
+        if isinstance(result, Exception):
+            items.append({"id": item_id, "error": str(result)})
+        elif isinstance(result, dict) and "error" in result:
+            items.append({"id": item_id, "error": result["error"]})
+        else:
+            items.append({"id": item_id, "data": result})
+    failed = sum("error" in item for item in items)
+    return {"results": items, "succeeded": len(items) - failed, "failed": failed}
+
+
+async def gather_bounded(ids: list, call, concurrency: int = None, level: int = None) -> dict:
+    """
+    Run the coroutine function call(id) for every id with at most `concurrency` in flight.
+    Duplicate ids are fetched once. Returns per-item data or error in input order.
+    Upstream calls run at the priority of the endpoint they call, as they would for a single
+    call of the tool, unless level (e.g. ratelimit.BULK for background imports) is given.
+    """
+    try:
+        ids, concurrency = _prepare(ids, concurrency)
+    except ValueError as e:
+        return {"error": str(e)}
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(item_id):
+        async with semaphore:
+            return await call(item_id)
+
+    with ratelimit.priority(level) if level is not None else contextlib.nullcontext():
+        results = await asyncio.gather(*(run(item_id) for item_id in ids), return_exceptions=True)
+    return _collect(ids, results)
@@ -0,0 +1,80 @@
+"""
+First-query latency of a freshly started server, with and without the persistent timetable store.
+A populate run fetches schedules into a temporary store; every measured run then starts a new
+Python process, as an MCP client does when it spawns the stdio server, and times schedule
+lookups and a journey plan against a slow stub, first cold and then warm.
+
+Usage:
+    python -m bench.bench_cold_start --latency-ms 500 --trains 50
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench.mock_upstream import start_stub
+from bench.stats import summarize
+
+
+async def child(args) -> None:
+    from mcp.shared.memory import create_connected_server_and_client_session
+
+    import trainClaude
+
+    trains = [str(12000 + i) for i in range(args.trains)]
+    timings = {"cold": [], "warm": []}
+    async with create_connected_server_and_client_session(trainClaude.mcp._mcp_server) as session:
+        if args.child == "populate":
+            await session.call_tool("import_timetable", {"train_numbers": trains})
+            return
+        for phase in ("cold", "warm"):
+            start = time.perf_counter()
+            result = await session.call_tool("plan_journey", {"from_station": "NDLS", "to_station": "BCT"})
+            timings[f"{phase} plan_journey"] = (time.perf_counter() - start) * 1000.0
+            timings[f"{phase} trains_indexed"] = json.loads(result.content[0].text)["trains_indexed"]
+            for train in trains:
+                start = time.perf_counter()
+                await session.call_tool("get_train_schedule_indian_rail", {"train_number": train, "limit": 1})
+                timings[phase].append((time.perf_counter() - start) * 1000.0)
+    print(json.dumps(timings))
+
+
+def spawn(args, mode: str, store_path: str, base_url: str):
+    env = dict(os.environ, TRAIN_MCP_STORE_PATH=store_path, TRAIN_MCP_INDIAN_RAIL_BASE_URL=f"{base_url}/api/v2")
+    env.setdefault("INDIAN_RAIL_API_KEY", "bench")
+    command = [sys.executable, "-m", "bench.bench_cold_start", "--child", mode, "--trains", str(args.trains)]
+    output = subprocess.run(command, env=env, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1]) if mode != "populate" else None
+
+
+def main(args) -> None:
+    stub = start_stub(latency_ms=args.latency_ms, distribution="lognormal", seed=1)
+    base_url = f"http://127.0.0.1:{stub.server_address[1]}"
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            store_path = os.path.join(directory, "reference.sqlite3")
+            spawn(args, "populate", store_path, base_url)
+            for label, path in (("no store", ""), ("store", store_path)):
+                timings = spawn(args, "measure", path, base_url)
+                for phase in ("cold", "warm"):
+                    print(summarize(f"{label}: {phase} schedule", timings[phase]))
+                    print(f"{label}: {phase} plan_journey {timings[f'{phase} plan_journey']:.2f} ms, "
+                          f"{timings[f'{phase} trains_indexed']} trains indexed")
+    finally:
+        stub.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency-ms", type=float, default=500.0)
+    parser.add_argument("--trains", type=int, default=50)
+    parser.add_argument("--child", choices=("populate", "measure"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        asyncio.run(child(args))
+    else:
+        main(args)
@@ -0,0 +1,62 @@
+"""
+Throughput of the MCP servers against a slow local stub as in-flight requests grow.
+Tools are called through FastMCP's call_tool with distinct arguments, so neither the
+cache nor request coalescing hides upstream calls; with non-blocking tools throughput
+should scale roughly linearly with the number of requests in flight.
+
+Usage:
+    python -m bench.bench_concurrency --latency-ms 200 --levels 1 10 100 300
+"""
+import argparse
+import asyncio
+import time
+
+import endpoints
+import freeTrainMCp
+import trainClaude
+import trainMCP
+import upstream
+from bench.mock_upstream import start_stub
+
+SERVERS = {
+    "trainMCP": (trainMCP, "get_live_train_status", lambda i: {"train_number": str(10000 + i)}),
+    "freeTrainMCp": (freeTrainMCp, "get_live_train_status", lambda i: {"train_number": str(10000 + i), "date": "20260101"}),
+    "trainClaude": (trainClaude, "get_live_train_status", lambda i: {"train_number": str(10000 + i), "date": "20260101"}),
+}
+
+
+def point_at(base_url: str) -> None:
+    endpoints.INDIAN_RAIL_BASE_URL = f"{base_url}/api/v2"
+    endpoints.RAPIDAPI_BASE_URL = base_url
+
+
+async def run_level(server, tool: str, arguments, inflight: int, offset: int):
+    start = time.perf_counter()
+    results = await asyncio.gather(*(server.mcp.call_tool(tool, arguments(offset + i)) for i in range(inflight)))
+    errors = sum('"error"' in result[0].text for result in results)
+    return inflight / (time.perf_counter() - start), errors
+
+
+async def main(latency_ms: float, levels: list) -> None:
+    stub = start_stub(latency_ms=latency_ms)
+    point_at(f"http://127.0.0.1:{stub.server_address[1]}")
+    offset = 0
+    try:
+        for name, (server, tool, arguments) in SERVERS.items():
+            baseline = None
+            for inflight in levels:
+                throughput, errors = await run_level(server, tool, arguments, inflight, offset)
+                offset += inflight
+                baseline = baseline or throughput
+                print(f"{name:<14} in-flight={inflight:<5} {throughput:8.1f} req/s  x{throughput / baseline:.1f}  errors={errors}")
+    finally:
+        await upstream.close()
+        stub.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--latency-ms", type=float, default=200.0)
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 10, 100, 300])
+    args = parser.parse_args()
+    asyncio.run(main(args.latency_ms, args.levels))
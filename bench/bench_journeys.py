@@ -0,0 +1,90 @@
+"""
+find_best_journeys against the tool chain an agent would otherwise run one call at a time:
+trains between two stations, then a fare per train, then availability per train and class
+in price order until enough bookable options are found. Both run against the stub with the
+given latency; the response cache is cleared before every search, the fare cache is not
+(it is what repeated searches reuse).
+
+Usage:
+    python -m bench.bench_journeys --latency-ms 200 --trains 25 --searches 5
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+os.environ.setdefault("TRAIN_MCP_STORE_PATH", "")
+
+import cache
+import endpoints
+import trainMCP
+from availability import bookable, parse_date
+from bench.mock_upstream import start_stub
+from bench.stats import summarize
+from journeys import fare_cache, quota_fares, status_on
+from records import parse_trains
+
+ROUTES = [("NDLS", "BCT"), ("MAS", "SBC"), ("HWH", "NDLS"), ("ADI", "PUNE"), ("ERS", "MAS")]
+
+
+async def call(tool: str, arguments: dict):
+    return json.loads((await trainMCP.mcp.call_tool(tool, arguments))[0].text)
+
+
+async def sequential(source: str, destination: str, date: str, limit: int) -> int:
+    trains = parse_trains(await call("find_trains_between_stations", {
+        "from_station_code": source, "to_station_code": destination, "date": date}))
+    options = []
+    for train in trains:
+        fares = quota_fares(await call("get_fare", {
+            "train_number": train.train_number, "from_station_code": source, "to_station_code": destination}), "GN")
+        options.extend((amount, train.train_number, code) for code, amount in fares.items())
+    found = 0
+    calls = 1 + len(trains)
+    for _, train_number, code in sorted(options):
+        calls += 1
+        answer = await call("check_seat_availability", {
+            "train_no": train_number, "date": "-".join(reversed(date.split("-"))), "class_type": code, "quota": "GN",
+            "from_station_code": source, "to_station_code": destination})
+        found += bookable(status_on(answer, parse_date(date)))
+        if found >= limit:
+            break
+    return calls
+
+
+async def main(args) -> None:
+    stub = start_stub(latency_ms=args.latency_ms, rows=args.trains, seed=1)
+    endpoints.RAPIDAPI_BASE_URL = f"http://127.0.0.1:{stub.server_address[1]}"
+    endpoints.RAPIDAPI_KEY = endpoints.RAPIDAPI_KEY or "bench"
+    timings = {"sequential": [], "composite (cold fares)": [], "composite (cached fares)": []}
+    try:
+        for search in range(args.searches):
+            source, destination = ROUTES[search % len(ROUTES)]
+            date = f"2026-11-{search % 28 + 1:02d}"
+            for label in timings:
+                cache.response_cache.clear()
+                if label != "composite (cached fares)":
+                    fare_cache.clear()
+                start = time.perf_counter()
+                if label == "sequential":
+                    calls = await sequential(source, destination, date, args.limit)
+                else:
+                    result = await call("find_best_journeys", {
+                        "from_station_code": source, "to_station_code": destination, "date": date, "limit": args.limit})
+                    calls = sum(result["upstream_calls"].values())
+                timings[label].append((time.perf_counter() - start) * 1000.0)
+                print(f"  search {search} {label}: {calls} upstream lookups")
+        for label, samples in timings.items():
+            print(summarize(label, samples))
+    finally:
+        stub.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency-ms", type=float, default=200.0)
+    parser.add_argument("--trains", type=int, default=25, help="trains between each pair of stations")
+    parser.add_argument("--searches", type=int, default=5)
+    parser.add_argument("--limit", type=int, default=5, help="bookable options wanted")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,134 @@
+"""
+JSON decode and encode cost on large upstream payloads (station boards and long schedules
+from the stub's generators), comparing the ways an upstream body can be turned into data:
+
+  aiohttp     join the chunks, decode to str, json.loads (what response.json() does)
+  buffered    join the chunks into a bytearray, jsoncodec.loads (orjson when installed)
+  stdlib      as buffered, but always with the json module
+  incremental jsoncodec.IncrementalDecoder fed chunk by chunk (used without orjson)
+
+and the encodings paid after it: the compact cache encoding (json module vs jsoncodec.dumps)
+and the indented MCP response encoding (pydantic_core, as FastMCP does).
+Peak memory is the tracemalloc peak above the chunk list, i.e. what decoding adds; it is
+dominated by the decoded records whichever way they are parsed. "stall" is the longest single
+step, i.e. how long the event loop would be blocked while decoding.
+
+Usage:
+    python -m bench.bench_json --rows 500 2000 8000 --runs 20
+"""
+import argparse
+import json
+import random
+import time
+import tracemalloc
+
+import pydantic_core
+
+import jsoncodec
+from bench.mock_upstream import indian_rail_payload, rapidapi_payload
+from bench.stats import summarize
+
+
+def payloads(rows: int) -> dict:
+    rng = random.Random(rows)
+    return {
+        "AllTrainOnStation": indian_rail_payload("AllTrainOnStation", rng, rows),
+        "getTrainsByStation": rapidapi_payload("getTrainsByStation", rng, rows),
+        "TrainSchedule": indian_rail_payload("TrainSchedule", rng, rows),
+    }
+
+
+def chunked(body: bytes) -> list:
+    size = jsoncodec.CHUNK_SIZE
+    return [body[start:start + size] for start in range(0, len(body), size)]
+
+
+def decode_aiohttp(chunks: list):
+    return json.loads(b"".join(chunks).decode("utf-8"))
+
+
+def decode_buffered(chunks: list):
+    body = bytearray()
+    for chunk in chunks:
+        body += chunk
+    return jsoncodec.loads(body)
+
+
+def decode_stdlib(chunks: list):
+    body = bytearray()
+    for chunk in chunks:
+        body += chunk
+    return json.loads(body.decode("utf-8"))
+
+
+def decode_incremental(chunks: list):
+    decoder = jsoncodec.IncrementalDecoder()
+    for chunk in chunks:
+        decoder.feed(chunk)
+    return decoder.close()
+
+
+DECODERS = {"aiohttp": decode_aiohttp, "buffered": decode_buffered, "stdlib": decode_stdlib,
+            "incremental": decode_incremental}
+ENCODERS = {
+    "cache json": lambda value: json.dumps(value, separators=(",", ":")).encode(),
+    f"cache {jsoncodec.BACKEND}": jsoncodec.dumps,
+    "response pydantic": lambda value: pydantic_core.to_json(value, fallback=str, indent=2),
+}
+
+
+def longest_step_ms(name: str, chunks: list) -> float:
+    if name != "incremental":
+        return min(timed(DECODERS[name], chunks, 3))
+    decoder = jsoncodec.IncrementalDecoder()
+    longest = 0.0
+    for chunk in chunks:
+        start = time.perf_counter()
+        decoder.feed(chunk)
+        longest = max(longest, time.perf_counter() - start)
+    start = time.perf_counter()
+    decoder.close()
+    return max(longest, time.perf_counter() - start) * 1000.0
+
+
+def timed(function, argument, runs: int) -> list:
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        function(argument)
+        samples.append((time.perf_counter() - start) * 1000.0)
+    return samples
+
+
+def peak_mb(function, argument) -> float:
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    baseline = tracemalloc.get_traced_memory()[0]
+    result = function(argument)
+    peak = tracemalloc.get_traced_memory()[1] - baseline
+    tracemalloc.stop()
+    del result
+    return peak / 1e6
+
+
+def main(args) -> None:
+    print(f"jsoncodec backend: {jsoncodec.BACKEND}")
+    for rows in args.rows:
+        for endpoint, document in payloads(rows).items():
+            body = json.dumps(document, indent=1, ensure_ascii=False).encode("utf-8")
+            chunks = chunked(body)
+            print(f"{endpoint}, {rows} rows, {len(body) / 1e6:.2f} MB in {len(chunks)} chunks")
+            for name, decode in DECODERS.items():
+                assert decode(chunks) == document
+                label = f"  decode {name}"
+                print(f"{summarize(label, timed(decode, chunks, args.runs))} "
+                      f"peak={peak_mb(decode, chunks):6.2f}MB stall={longest_step_ms(name, chunks):6.2f}ms")
+            for name, encode in ENCODERS.items():
+                print(summarize(f"  encode {name}", timed(encode, document, args.runs)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[500, 2000, 8000])
+    parser.add_argument("--runs", type=int, default=20)
+    main(parser.parse_args())
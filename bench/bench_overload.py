@@ -0,0 +1,105 @@
+"""
+Overload behaviour: a burst of slow get_live_station_status calls (against a slow stub) while
+cheap get_train_schedule_indian_rail calls keep arriving (against a fast stub). Runs with the
+per-tool admission limits from admission.py and with them lifted, alternating for --rounds
+rounds, and reports the cheap tool's latency over all rounds, how many slow calls completed
+or were shed, and how fast shedding was.
+
+The stubs run in their own processes, so that only the server's own work competes with the
+cheap calls: decoding and shaping every live board that comes back. Boards have --rows rows.
+
+Usage:
+    python -m bench.bench_overload --burst 600 --slow-ms 2000 --cheap 100 --rounds 3
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+os.environ.setdefault("TRAIN_MCP_STORE_PATH", "")
+
+import admission
+import cache
+import endpoints
+import trainMCP
+from bench.mock_upstream import STATIONS, start_stub_process
+from bench.stats import summarize
+from upstream import lifespan
+
+
+async def timed_call(tool: str, arguments: dict):
+    start = time.perf_counter()
+    result = json.loads((await trainMCP.mcp.call_tool(tool, arguments))[0].text)
+    return (time.perf_counter() - start) * 1000.0, result
+
+
+async def cheap_calls(count: int, interval: float, offset: int, latencies: list) -> None:
+    for number in range(count):
+        latency, _ = await timed_call("get_train_schedule_indian_rail", {"train_number": str(offset + number), "limit": 1})
+        latencies.append(latency)
+        await asyncio.sleep(interval)
+
+
+async def run(args, round_number: int, totals: dict) -> None:
+    cache.response_cache.clear()
+    admission.gates.clear()
+    stations = [code for code, _ in STATIONS]
+    burst = [
+        timed_call("get_live_station_status", {"from_station_code": stations[i % len(stations)],
+                                               "hours": i // len(stations) % 4 + 1 + 4 * round_number, "limit": 1})
+        for i in range(args.burst)
+    ]
+    cheap = []
+    start = time.perf_counter()
+    results = await asyncio.gather(cheap_calls(args.cheap, args.interval_ms / 1000.0, 10000 + 1000 * round_number, cheap), *burst)
+    totals["elapsed"] += time.perf_counter() - start
+    totals["cheap"] += cheap
+    totals["shed"] += [latency for latency, result in results[1:] if result.get("overloaded")]
+    totals["failed"] += sum("error" in result and not result.get("overloaded") for _, result in results[1:])
+    totals["calls"] += args.burst
+
+
+def report(label: str, totals: dict) -> None:
+    shed = totals["shed"]
+    print(f"{label}: {totals['elapsed']:.1f}s")
+    print(summarize("  cheap tool", totals["cheap"]))
+    print(summarize("  slow tool, shed", shed))
+    print(f"  slow tool: {totals['calls'] - len(shed) - totals['failed']} completed, {len(shed)} shed, {totals['failed']} failed")
+
+
+async def main(args) -> None:
+    slow, slow_url = start_stub_process(latency_ms=args.slow_ms, rows=args.rows)
+    fast, fast_url = start_stub_process(latency_ms=args.fast_ms, rows=20)
+    endpoints.RAPIDAPI_BASE_URL = slow_url
+    endpoints.RAPIDAPI_KEY = endpoints.RAPIDAPI_KEY or "bench"
+    endpoints.INDIAN_RAIL_BASE_URL = f"{fast_url}/api/v2"
+    endpoints.INDIAN_RAIL_API_KEY = endpoints.INDIAN_RAIL_API_KEY or "bench"
+    limited = dict(admission.limits), admission.DEFAULT_TOOL_LIMIT
+    lifted = {}, (1_000_000, 1_000_000)
+    modes = {"admission control": limited, "no limits": lifted}
+    totals = {label: {"elapsed": 0.0, "cheap": [], "shed": [], "failed": 0, "calls": 0} for label in modes}
+    try:
+        async with lifespan(trainMCP.mcp):
+            for round_number in range(args.rounds):
+                for label, (limits, default) in modes.items():
+                    admission.limits, admission.DEFAULT_TOOL_LIMIT = limits, default
+                    await run(args, round_number, totals[label])
+        for label in modes:
+            report(label, totals[label])
+    finally:
+        for process in (slow, fast):
+            process.terminate()
+            process.wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--burst", type=int, default=600, help="concurrent slow calls")
+    parser.add_argument("--slow-ms", type=float, default=2000.0)
+    parser.add_argument("--fast-ms", type=float, default=20.0)
+    parser.add_argument("--rows", type=int, default=200, help="trains per live board")
+    parser.add_argument("--cheap", type=int, default=100, help="cheap calls made one after another during each burst")
+    parser.add_argument("--interval-ms", type=float, default=20.0, help="pause between cheap calls")
+    parser.add_argument("--rounds", type=int, default=3)
+    asyncio.run(main(parser.parse_args()))
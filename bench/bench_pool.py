@@ -0,0 +1,73 @@
+"""
+Before/after latency of upstream calls against the local stub:
+a fresh connection per call (the old behaviour) versus the shared pool in upstream.py.
+
+Usage:
+    python -m bench.bench_pool --requests 500 --latency-ms 2
+"""
+import argparse
+import asyncio
+import time
+
+import aiohttp
+import requests
+
+import upstream
+from bench.mock_upstream import start_stub
+from bench.stats import summarize
+
+
+def time_sync(call, url: str, count: int) -> list:
+    samples = []
+    for _ in range(count):
+        start = time.perf_counter()
+        call(url)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+async def time_async(call, url: str, count: int) -> list:
+    samples = []
+    for _ in range(count):
+        start = time.perf_counter()
+        await call(url)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def unpooled_sync(url: str) -> dict:
+    response = requests.get(url, timeout=300)
+    response.raise_for_status()
+    return response.json()
+
+
+async def unpooled_async(url: str) -> dict:
+    async with aiohttp.ClientSession() as session:
+        async with session.get(url) as response:
+            response.raise_for_status()
+            return await response.json()
+
+
+async def run_async(url: str, count: int) -> None:
+    print(summarize("async new session per call", await time_async(unpooled_async, url, count)))
+    print(summarize("async shared pool", await time_async(upstream.fetch_data, url, count)))
+    await upstream.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = start_stub(latency_ms=args.latency_ms)
+    url = f"http://127.0.0.1:{server.server_address[1]}/api/v2/TrainSchedule/apikey/x/TrainNumber/12951"
+    try:
+        print(summarize("sync requests.get per call", time_sync(unpooled_sync, url, args.requests)))
+        asyncio.run(run_async(url, args.requests))
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
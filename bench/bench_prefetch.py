@@ -0,0 +1,82 @@
+"""
+Latency of live station boards under skewed traffic, with and without prefetching.
+Clients ask for station boards following a Zipf-like popularity curve against a slow
+stub; the board TTL is shortened so that entries expire many times during the run.
+With the prefetcher and stale-while-revalidate, the hot stations should be answered
+from memory almost every time.
+
+Usage:
+    python -m bench.bench_prefetch --latency-ms 800 --ttl 2 --seconds 20
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+
+from bench.mock_upstream import STATIONS, start_stub
+from bench.stats import summarize
+
+
+async def run(args) -> None:
+    from mcp.shared.memory import create_connected_server_and_client_session
+
+    import cache
+    import freeTrainMCp
+
+    cache.ENDPOINT_TTLS["LiveStation"] = args.ttl
+    stations = [code for code, _ in STATIONS[:args.stations]]
+    weights = [1.0 / (rank + 1) for rank in range(len(stations))]
+    rng = random.Random(1)
+    hot, cold = [], []
+    stale = 0
+    async with create_connected_server_and_client_session(freeTrainMCp.mcp._mcp_server) as session:
+
+        async def client():
+            nonlocal stale
+            while time.perf_counter() < stop:
+                code = rng.choices(stations, weights)[0]
+                start = time.perf_counter()
+                result = await session.call_tool("get_live_station_status", {"station_code": code, "hours": 2})
+                elapsed = (time.perf_counter() - start) * 1000.0
+                data = json.loads(result.content[0].text)
+                if start > measure_from and "error" not in data:
+                    (hot if stations.index(code) < args.hot else cold).append(elapsed)
+                    stale += bool(data.get("stale"))
+                await asyncio.sleep(rng.expovariate(1.0 / args.think))
+
+        measure_from = time.perf_counter() + args.warmup
+        stop = measure_from + args.seconds
+        await asyncio.gather(*(client() for _ in range(args.clients)))
+    label = "prefetch" if args.top_n else "no prefetch"
+    print(summarize(f"{label}: top {args.hot} stations", hot))
+    print(summarize(f"{label}: other stations", cold))
+    print(f"{label}: {stale / max(1, len(hot) + len(cold)):.1%} of answers were stale")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency-ms", type=float, default=800.0)
+    parser.add_argument("--ttl", type=int, default=2, help="LiveStation cache TTL for the run")
+    parser.add_argument("--seconds", type=float, default=20.0)
+    parser.add_argument("--warmup", type=float, default=5.0, help="seconds of traffic before measuring")
+    parser.add_argument("--clients", type=int, default=20)
+    parser.add_argument("--think", type=float, default=0.2, help="mean pause between a client's calls")
+    parser.add_argument("--stations", type=int, default=50)
+    parser.add_argument("--hot", type=int, default=5)
+    parser.add_argument("--top-n", type=int, default=20, help="prefetched keys, 0 to disable prefetch")
+    parser.add_argument("--interval", type=float, default=1.0, help="prefetch interval")
+    args = parser.parse_args()
+    stub = start_stub(latency_ms=args.latency_ms, distribution="lognormal", seed=1)
+    # Settings are read at import time, so set them before the server modules load
+    os.environ["TRAIN_MCP_INDIAN_RAIL_BASE_URL"] = f"http://127.0.0.1:{stub.server_address[1]}/api/v2"
+    os.environ.setdefault("INDIAN_RAIL_API_KEY", "bench")
+    os.environ["TRAIN_MCP_PREFETCH_TOP_N"] = str(args.top_n)
+    os.environ["TRAIN_MCP_PREFETCH_INTERVAL"] = str(args.interval)
+    try:
+        asyncio.run(run(args))
+    finally:
+        stub.shutdown()
+    sys.exit(0)
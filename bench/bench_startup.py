@@ -0,0 +1,85 @@
+"""
+Start-up cost of the MCP servers, as paid by every agent session that spawns one.
+Two numbers per server module, each over --runs fresh processes:
+
+  import    wall time of `python -c "import <module>"`
+  session   spawn to first tools/list answer over stdio (python trainClaude.py), which
+            is what a client waits for before its first tool call
+
+--breakdown prints the modules with the largest cumulative import time (python -X importtime).
+
+Usage:
+    python -m bench.bench_startup --runs 10
+    python -m bench.bench_startup --modules trainClaude --breakdown 15
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+from bench.stats import summarize
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def environment() -> dict:
+    # No persistent store, so that every run starts from the same state
+    return dict(os.environ, PYTHONPATH=ROOT, TRAIN_MCP_STORE_PATH="")
+
+
+def time_import(module: str) -> float:
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", f"import {module}"], cwd=ROOT, env=environment(),
+                   check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return (time.perf_counter() - start) * 1000.0
+
+
+async def time_session(module: str) -> float:
+    from mcp import ClientSession
+    from mcp.client.stdio import StdioServerParameters, stdio_client
+
+    parameters = StdioServerParameters(
+        command=sys.executable, args=["-c", f"from {module} import mcp; mcp.run(transport='stdio')"],
+        env=environment(), cwd=ROOT,
+    )
+    start = time.perf_counter()
+    with open(os.devnull, "w") as errors:
+        async with stdio_client(parameters, errlog=errors) as (read, write):
+            async with ClientSession(read, write) as session:
+                await session.initialize()
+                await session.list_tools()
+                return (time.perf_counter() - start) * 1000.0
+
+
+def breakdown(module: str, top: int) -> None:
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], cwd=ROOT,
+                            env=environment(), capture_output=True, text=True, check=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        rows.append((int(cumulative), name.rstrip()))
+    print(f"{module}: largest cumulative import times")
+    for cumulative, name in sorted(rows, reverse=True)[:top]:
+        print(f"  {cumulative / 1000.0:8.1f} ms  {name}")
+
+
+def main(args) -> None:
+    for module in args.modules:
+        imports = [time_import(module) for _ in range(args.runs)]
+        print(summarize(f"{module}: import", imports))
+        sessions = [asyncio.run(time_session(module)) for _ in range(args.runs)]
+        print(summarize(f"{module}: session", sessions))
+        if args.breakdown:
+            breakdown(module, args.breakdown)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modules", nargs="+", default=["trainMCP", "freeTrainMCp", "trainClaude"])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--breakdown", type=int, default=0, help="show the N slowest imports")
+    main(parser.parse_args())
@@ -0,0 +1,77 @@
+"""
+Journey planner benchmark on a synthetic national-scale timetable.
+Builds corridors through a shared set of junctions, runs trains along segments
+of them, then times earliest-arrival queries between random junctions.
+
+Usage:
+    python -m bench.bench_timetable --stations 8000 --trains 12000 --queries 200
+"""
+import argparse
+import random
+import time
+
+from bench.stats import summarize
+from timetable import DAY_MINUTES, Timetable, format_time
+
+
+def synthetic_schedules(stations: int, trains: int, seed: int = 7) -> list:
+    rng = random.Random(seed)
+    codes = [f"S{i:05d}" for i in range(stations)]
+    junctions = codes[: max(50, stations // 25)]
+    corridors = []
+    for _ in range(max(20, stations // 30)):
+        length = rng.randint(40, 120)
+        corridor = [rng.choice(codes) if rng.random() > 0.15 else rng.choice(junctions) for _ in range(length)]
+        corridors.append(list(dict.fromkeys(corridor)))
+    schedules = []
+    for number in range(trains):
+        corridor = rng.choice(corridors)
+        if rng.random() < 0.5:
+            corridor = corridor[::-1]
+        length = rng.randint(10, min(40, len(corridor)))
+        start = rng.randint(0, len(corridor) - length)
+        clock = rng.randint(0, DAY_MINUTES - 1)
+        stops = []
+        for code in corridor[start:start + length]:
+            stops.append((code, clock, clock + 2))
+            clock += 2 + rng.randint(5, 45)
+        schedules.append({"number": f"{10000 + number}", "name": f"SYNTHETIC {number}", "days": 0b1111111, "stops": stops})
+    return schedules, junctions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--stations", type=int, default=8000)
+    parser.add_argument("--trains", type=int, default=12000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--max-legs", type=int, default=3)
+    args = parser.parse_args()
+
+    schedules, junctions = synthetic_schedules(args.stations, args.trains)
+    table = Timetable()
+    for schedule in schedules:
+        table.add_train(schedule)
+    start = time.perf_counter()
+    connections = table.connections()
+    print(f"built {len(table)} trains, {table.stations()} stations, {connections} connections "
+          f"in {(time.perf_counter() - start) * 1000:.0f}ms")
+
+    rng = random.Random(11)
+    samples = []
+    found = 0
+    for _ in range(args.queries):
+        origin, destination = rng.sample(junctions, 2)
+        departure = rng.randint(0, DAY_MINUTES - 1)
+        start = time.perf_counter()
+        journeys = table.earliest_arrival(origin, destination, departure, weekday=rng.randint(0, 6), max_legs=args.max_legs)
+        samples.append((time.perf_counter() - start) * 1000)
+        found += bool(journeys)
+    print(summarize(f"earliest_arrival (max_legs={args.max_legs})", samples))
+    print(f"{found}/{args.queries} queries found a journey")
+    if journeys:
+        print("last:", [(leg["train_number"], leg["from"], leg["to"], format_time(leg["departure"]),
+                         format_time(leg["arrival"])) for leg in journeys[-1]])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Streamable-HTTP deployment benchmark: one `python serving.py --transport streamable-http`
+service per worker count, driven by concurrent MCP clients asking for a hot set of
+station boards and schedules from a slow stub upstream.
+
+Reports tool calls per second, latency, and how many requests reached the upstream. With
+--no-share every worker keeps its own cache and rate limits, as separate stdio processes do.
+
+Usage:
+    python -m bench.bench_workers --workers 1 2 4 --clients 32 --calls 20 --latency-ms 200
+"""
+import argparse
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench.mock_upstream import start_stub
+from bench.stats import summarize
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STATIONS = ["NDLS", "BCT", "MAS", "HWH", "SBC", "ERS", "PUNE", "ADI"]
+TRAINS = [str(12000 + i) for i in range(40)]
+
+
+def free_port() -> int:
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+def start_service(args, workers: int, port: int, base_url: str, state_dir: str) -> subprocess.Popen:
+    env = dict(os.environ, TRAIN_MCP_STATE_DIR=state_dir, TRAIN_MCP_STORE_PATH="",
+               TRAIN_MCP_INDIAN_RAIL_BASE_URL=f"{base_url}/api/v2")
+    env.setdefault("INDIAN_RAIL_API_KEY", "bench")
+    if args.no_share:
+        env.update(TRAIN_MCP_CACHE_PATH="", TRAIN_MCP_RATE_LIMIT_PATH="")
+    command = [sys.executable, os.path.join(ROOT, "serving.py"), "--server", "trainClaude",
+               "--transport", "streamable-http", "--port", str(port), "--workers", str(workers)]
+    return subprocess.Popen(command, env=env, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+async def wait_ready(port: int, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            _, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.close()
+            return
+        except OSError:
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"service on port {port} did not start")
+
+
+async def client(url: str, calls: int, seed: int, latencies: list) -> int:
+    from mcp import ClientSession
+    from mcp.client.streamable_http import streamablehttp_client
+
+    rng = random.Random(seed)
+    errors = 0
+    async with streamablehttp_client(url) as (read, write, _):
+        async with ClientSession(read, write) as session:
+            await session.initialize()
+            for _ in range(calls):
+                if rng.random() < 0.5:
+                    tool, arguments = "get_all_trains_on_station", {"station_code": rng.choice(STATIONS), "limit": 5}
+                else:
+                    tool, arguments = "get_train_schedule_indian_rail", {"train_number": rng.choice(TRAINS), "limit": 5}
+                start = time.perf_counter()
+                result = await session.call_tool(tool, arguments)
+                latencies.append((time.perf_counter() - start) * 1000.0)
+                errors += result.isError or '"error"' in result.content[0].text
+    return errors
+
+
+async def run(args, workers: int, stub, base_url: str) -> None:
+    port = free_port()
+    with tempfile.TemporaryDirectory() as state_dir:
+        service = start_service(args, workers, port, base_url, state_dir)
+        try:
+            await wait_ready(port)
+            url = f"http://127.0.0.1:{port}/mcp"
+            upstream_before = stub.requests
+            latencies = []
+            start = time.perf_counter()
+            errors = await asyncio.gather(*(client(url, args.calls, seed, latencies) for seed in range(args.clients)))
+            elapsed = time.perf_counter() - start
+            print(summarize(f"{workers} worker(s)", latencies))
+            print(f"  {len(latencies) / elapsed:8.1f} calls/s, {stub.requests - upstream_before} upstream requests "
+                  f"for {len(latencies)} calls, {sum(errors)} errors")
+        finally:
+            service.terminate()
+            service.wait(timeout=30)
+
+
+def main(args) -> None:
+    stub = start_stub(latency_ms=args.latency_ms, distribution="lognormal", rows=args.rows, seed=1)
+    base_url = f"http://127.0.0.1:{stub.server_address[1]}"
+    try:
+        for workers in args.workers:
+            asyncio.run(run(args, workers, stub, base_url))
+    finally:
+        stub.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--calls", type=int, default=20, help="tool calls per client")
+    parser.add_argument("--latency-ms", type=float, default=200.0)
+    parser.add_argument("--rows", type=int, default=500, help="records per list payload")
+    parser.add_argument("--no-share", action="store_true", help="give every worker its own cache and rate limits")
+    main(parser.parse_args())
@@ -0,0 +1,209 @@
+"""
+Load test of every tool of the three MCP servers against the local upstream stub.
+Each server is driven through a real MCP client session (in-memory transport), so
+JSON-RPC framing, argument validation and result serialisation are part of the
+measurement. Tools are discovered with list_tools, so new tools are covered
+automatically as long as their parameters have an argument generator below.
+
+For every tool and concurrency level, `--requests` calls are issued by that many
+concurrent workers; `--distinct` bounds how many different argument sets are used,
+which sets the cache hit ratio (the default makes every call distinct).
+
+Results can be saved with --save and compared with --baseline; the run exits with
+status 1 when a tool's throughput drops or its p95 grows by more than --tolerance.
+
+Usage:
+    python -m bench.load_test --latency-ms 50 --distribution lognormal --concurrency 1 16 64
+    python -m bench.load_test --servers freeTrainMCp --tools get_live_train_status --requests 500
+    python -m bench.load_test --save bench_output.json
+    python -m bench.load_test --baseline bench_output.json --tolerance 0.2
+"""
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import sys
+import time
+
+from bench.mock_upstream import STATIONS, add_stub_arguments, start_stub
+from bench.stats import percentile
+
+SERVER_MODULES = ("trainMCP", "freeTrainMCp", "trainClaude")
+
+
+def _station(i: int) -> str:
+    return STATIONS[i % len(STATIONS)][0]
+
+
+# Argument generators by parameter name; i is the argument set index
+ARGUMENTS = {
+    "station_name": lambda i: STATIONS[i % len(STATIONS)][1] + ("" if i < len(STATIONS) else f" {i}"),
+    "query": lambda i: f"Q{i}",
+    "train_number": lambda i: str(10000 + i),
+    "train_no": lambda i: str(10000 + i),
+    "train_numbers": lambda i: [str(10000 + i * 4 + n) for n in range(4)],
+    "pnr_number": lambda i: str(1000000000 + i),
+    "pnr_numbers": lambda i: [str(1000000000 + i * 4 + n) for n in range(4)],
+    "station_code": lambda i: _station(i) if i < len(STATIONS) else f"S{i}",
+    "from_station_code": lambda i: _station(i),
+    "to_station_code": lambda i: _station(i + 1 + i // len(STATIONS)),
+    "from_station": lambda i: _station(i),
+    "to_station": lambda i: _station(i + 1 + i // len(STATIONS)),
+    "station_from": lambda i: _station(i),
+    "station_to": lambda i: _station(i + 1 + i // len(STATIONS)),
+    "date": lambda i: f"2026{1 + i // 28 % 12:02d}{1 + i % 28:02d}",
+    "start_date": lambda i: f"{1 + i % 28:02d}-{1 + i // 28 % 12:02d}-2026",
+    "hours": lambda i: 2 + i % 3,
+    "quota": lambda i: "GN",
+    "class_type": lambda i: "3A",
+}
+
+# Tools whose date parameter is in yyyy-mm-dd form
+DASHED_DATES = {"find_trains_between_stations", "check_seat_availability"}
+
+
+def arguments_for(tool, i: int):
+    """
+    Arguments for the i-th call of a tool, or None when a required parameter has no generator.
+    """
+    schema = tool.inputSchema or {}
+    arguments = {}
+    for name in schema.get("required", []):
+        if name not in ARGUMENTS:
+            return None
+        arguments[name] = ARGUMENTS[name](i)
+    if tool.name in DASHED_DATES and "date" in arguments:
+        date = arguments["date"]
+        arguments["date"] = f"{date[:4]}-{date[4:6]}-{date[6:]}"
+    return arguments
+
+
+def failed(result) -> bool:
+    if result.isError:
+        return True
+    text = result.content[0].text if result.content else ""
+    return text.startswith('{"error"') or '"error":' in text[:64]
+
+
+async def run_tool(session, tool, requests: int, concurrency: int, distinct: int, offset: int) -> dict:
+    latencies = []
+    errors = 0
+    next_call = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for n in next_call:
+            arguments = arguments_for(tool, offset + n % distinct)
+            start = time.perf_counter()
+            try:
+                result = await session.call_tool(tool.name, arguments)
+                errors += failed(result)
+            except Exception:
+                errors += 1
+            latencies.append((time.perf_counter() - start) * 1000.0)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return {
+        "requests": requests,
+        "errors": errors,
+        "throughput": requests / elapsed,
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+    }
+
+
+async def run_server(name: str, args, offset: int):
+    """
+    Run every selected tool of one server. Returns (results, next argument offset).
+    """
+    from mcp.shared.memory import create_connected_server_and_client_session
+
+    server = importlib.import_module(name)
+    results = {}
+    async with create_connected_server_and_client_session(server.mcp._mcp_server) as session:
+        tools = (await session.list_tools()).tools
+        for tool in tools:
+            if args.tools and tool.name not in args.tools:
+                continue
+            if arguments_for(tool, 0) is None:
+                print(f"{name}.{tool.name}: skipped, no argument generator for {tool.inputSchema.get('required')}")
+                continue
+            for concurrency in args.concurrency:
+                distinct = args.distinct or args.requests
+                result = await run_tool(session, tool, args.requests, concurrency, distinct, offset)
+                # Fresh arguments for the next run (the cache is shared by all servers) unless it is meant to be warm
+                offset += 0 if args.distinct else args.requests
+                label = f"{name}.{tool.name}@{concurrency}"
+                results[label] = result
+                print(
+                    f"{label:<58} {result['throughput']:9.1f} req/s "
+                    f"p50={result['p50']:8.2f}ms p95={result['p95']:8.2f}ms p99={result['p99']:8.2f}ms "
+                    f"errors={result['errors']}"
+                )
+    return results, offset
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """
+    Regressions of results against a saved baseline, as printable lines.
+    """
+    regressions = []
+    for label, result in results.items():
+        before = baseline.get(label)
+        if before is None:
+            continue
+        if result["throughput"] < before["throughput"] * (1 - tolerance):
+            regressions.append(f"{label}: throughput {before['throughput']:.1f} -> {result['throughput']:.1f} req/s")
+        if result["p95"] > before["p95"] * (1 + tolerance):
+            regressions.append(f"{label}: p95 {before['p95']:.2f} -> {result['p95']:.2f} ms")
+    return regressions
+
+
+async def main(args) -> int:
+    stub = start_stub(0, args.latency_ms, args.distribution, args.error_rate, args.rows, args.seed)
+    base_url = f"http://127.0.0.1:{stub.server_address[1]}"
+    # The servers read their upstream settings at import time
+    os.environ["TRAIN_MCP_INDIAN_RAIL_BASE_URL"] = f"{base_url}/api/v2"
+    os.environ["TRAIN_MCP_RAPIDAPI_BASE_URL"] = base_url
+    os.environ.setdefault("INDIAN_RAIL_API_KEY", "bench")
+    os.environ.setdefault("RAPIDAPI_KEY", "bench")
+    # Reference data persisted by earlier runs would hide upstream calls
+    os.environ["TRAIN_MCP_STORE_PATH"] = ""
+    results = {}
+    offset = 0
+    try:
+        for name in args.servers:
+            server_results, offset = await run_server(name, args, offset)
+            results.update(server_results)
+    finally:
+        import upstream
+        await upstream.close()
+        stub.shutdown()
+    if args.save:
+        with open(args.save, "w") as handle:
+            json.dump(results, handle, indent=2)
+    if args.baseline:
+        with open(args.baseline) as handle:
+            regressions = compare(results, json.load(handle), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--servers", nargs="+", choices=SERVER_MODULES, default=list(SERVER_MODULES))
+    parser.add_argument("--tools", nargs="+", default=None, help="only these tool names")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 16])
+    parser.add_argument("--requests", type=int, default=200, help="calls per tool and concurrency level")
+    parser.add_argument("--distinct", type=int, default=None, help="distinct argument sets (default: all distinct)")
+    parser.add_argument("--save", default=None, help="write results as JSON")
+    parser.add_argument("--baseline", default=None, help="compare with results saved by --save")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    add_stub_arguments(parser)
+    sys.exit(asyncio.run(main(parser.parse_args())))
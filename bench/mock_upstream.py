@@ -0,0 +1,296 @@
+"""
+Local stub of the upstream rail APIs for benchmarks.
+Emulates the indianrailapi.com v2 and RapidAPI IRCTC endpoints used by the servers with
+response shapes close to the real ones, so caching, parsing and station learning do real
+work. Latency follows a configurable distribution, a fraction of requests can fail, and
+list payloads scale with --rows. Payloads are deterministic per request path.
+
+Usage:
+    python -m bench.mock_upstream --port 8765 --latency-ms 50 --distribution lognormal --error-rate 0.01
+"""
+import argparse
+import csv
+import datetime
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+# The stations module is not imported, so that loading the stub does not read server settings
+STATIONS_PATH = os.getenv(
+    "TRAIN_MCP_STATIONS_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "stations.csv"),
+)
+
+DISTRIBUTIONS = ("fixed", "uniform", "exponential", "lognormal")
+
+
+def _load_stations() -> list:
+    try:
+        with open(STATIONS_PATH, newline="", encoding="utf-8") as handle:
+            return [(row["code"], row["name"]) for row in csv.DictReader(handle)]
+    except OSError:
+        return [("NDLS", "NEW DELHI"), ("MMCT", "MUMBAI CENTRAL"), ("HWH", "HOWRAH JN"), ("MAS", "CHENNAI CENTRAL")]
+
+
+STATIONS = _load_stations()
+
+
+def _clock(minutes: int) -> str:
+    return f"{minutes // 60 % 24:02d}:{minutes % 60:02d}"
+
+
+def _route(rng: random.Random, rows: int) -> list:
+    stops = rng.sample(STATIONS, min(max(2, rows), len(STATIONS)))
+    minute = rng.randrange(0, 24 * 60)
+    route = []
+    for serial, (code, name) in enumerate(stops, 1):
+        arrival = minute
+        minute += rng.randrange(2, 10)
+        route.append({
+            "SerialNo": str(serial),
+            "StationCode": code,
+            "StationName": name,
+            "ArrivalTime": "--" if serial == 1 else _clock(arrival),
+            "DepartureTime": "--" if serial == len(stops) else _clock(minute),
+            "Day": str(1 + minute // (24 * 60)),
+            "Distance": str(serial * 47),
+        })
+        minute += rng.randrange(30, 180)
+    return route
+
+
+def _trains(rng: random.Random, rows: int) -> list:
+    trains = []
+    for _ in range(rows):
+        (source, source_name), (destination, destination_name) = rng.sample(STATIONS, 2)
+        departure = rng.randrange(0, 24 * 60)
+        trains.append({
+            "TrainNo": str(rng.randrange(10000, 23000)),
+            "TrainName": f"{source_name.split()[0]} {destination_name.split()[0]} EXP",
+            "Source": source,
+            "Destination": destination,
+            "ArrivalTime": _clock(departure - rng.randrange(2, 10)),
+            "DepartureTime": _clock(departure),
+            "ExpectedArrival": _clock(departure + rng.randrange(0, 60)),
+            "DelayInArrival": f"00:{rng.randrange(0, 60):02d}",
+            "TravelTime": _clock(rng.randrange(120, 1800)),
+            "RunningDays": "".join(rng.choice("YN") for _ in range(6)) + "Y",
+            "Platform": str(rng.randrange(1, 16)),
+        })
+    return trains
+
+
+def _fares(rng: random.Random) -> list:
+    return [{"Code": code, "Name": code, "Fare": str(rng.randrange(200, 4000))} for code in ("SL", "3A", "2A", "1A")]
+
+
+def _availability(rng: random.Random, start: str) -> list:
+    # Like the real API, one answer covers the requested date and the days after it
+    statuses = ("AVAILABLE-0042", "RAC 12", "GNWL 35/WL 20", "REGRET")
+    try:
+        first = datetime.datetime.strptime(start, "%d-%m-%Y").date()
+    except (TypeError, ValueError):
+        first = datetime.date(2026, 1, 1)
+    days = (first + datetime.timedelta(days=offset) for offset in range(6))
+    return [{"date": f"{day.day}-{day.month}-{day.year}", "status": rng.choice(statuses)} for day in days]
+
+
+def indian_rail_payload(endpoint: str, rng: random.Random, rows: int):
+    station, station_name = rng.choice(STATIONS)
+    if endpoint == "StationNameToCode":
+        return {"ResponseCode": "200", "Station": {"NameEn": station_name, "StationCode": station}}
+    if endpoint in ("TrainSchedule", "TrainInformation"):
+        return {"ResponseCode": "200", "TrainNumber": str(rng.randrange(10000, 23000)), "TrainName": "STUB EXPRESS",
+                "Route": _route(rng, rows)}
+    if endpoint in ("AllTrainOnStation", "LiveStation", "TrainBetweenStation"):
+        return {"ResponseCode": "200", "TotalTrains": rows, "Trains": _trains(rng, rows)}
+    if endpoint == "livetrainstatus":
+        return {"ResponseCode": "200", "Position": "Running late", "LastUpdated": "01 Jan 2026 10:00",
+                "CurrentStation": {"StationCode": station, "StationName": station_name, "DelayInArrival": "00:12"},
+                "TrainRoute": _route(rng, rows)}
+    if endpoint == "TrainFare":
+        return {"ResponseCode": "200", "Fares": _fares(rng)}
+    return None
+
+
+def rapidapi_payload(endpoint: str, rng: random.Random, rows: int, query: dict = None):
+    station, station_name = rng.choice(STATIONS)
+    if endpoint == "searchStation":
+        data = [{"code": code, "name": name, "eng_name": name} for code, name in rng.sample(STATIONS, min(rows, len(STATIONS)))]
+    elif endpoint in ("searchTrain", "trainBetweenStations"):
+        data = [
+            {"train_number": train["TrainNo"], "train_name": train["TrainName"], "from": train["Source"],
+             "to": train["Destination"], "from_std": train["DepartureTime"], "to_sta": train["ArrivalTime"],
+             "duration": train["TravelTime"]}
+            for train in _trains(rng, rows)
+        ]
+    elif endpoint == "getTrainSchedule":
+        data = {"route": [
+            {"station_code": stop["StationCode"], "station_name": stop["StationName"], "sta": stop["ArrivalTime"],
+             "std": stop["DepartureTime"], "day": stop["Day"], "distance_from_source": stop["Distance"]}
+            for stop in _route(rng, rows)
+        ]}
+    elif endpoint == "liveTrainStatus":
+        data = {"current_station_code": station, "current_station_name": station_name, "delay": 12,
+                "new_message": "Running late", "status_as_of": "1 min ago"}
+    elif endpoint == "getPNRStatus":
+        data = {"Pnr": "1234567890", "ChartPrepared": False,
+                "PassengerStatus": [{"Number": n, "CurrentStatus": "CNF"} for n in range(1, 5)]}
+    elif endpoint == "checkSeatAvailability":
+        data = _availability(rng, (query or {}).get("date", [None])[0])
+    elif endpoint == "getTrainClasses":
+        data = ["SL", "3A", "2A", "1A"]
+    elif endpoint == "getFare":
+        data = {"general": [{"classType": code, "fare": rng.randrange(200, 4000)} for code in ("SL", "3A", "2A")],
+                "tatkal": [{"classType": code, "fare": rng.randrange(400, 5000)} for code in ("SL", "3A")]}
+    elif endpoint in ("getTrainsByStation", "getLiveStation"):
+        data = [
+            {"trainNumber": train["TrainNo"], "trainName": train["TrainName"], "sourceStationCode": train["Source"],
+             "destinationStationCode": train["Destination"], "arrival_time": train["ArrivalTime"],
+             "departure_time": train["DepartureTime"], "platform_number": train["Platform"]}
+            for train in _trains(rng, rows)
+        ]
+    else:
+        return None
+    return {"status": True, "message": "Success", "timestamp": 0, "data": data}
+
+
+def payload_for(path: str, rows: int):
+    """
+    (endpoint, JSON document) for a request path, or (None, None) for an unknown path.
+    The same path always yields the same document.
+    """
+    parts = [part for part in urlsplit(path).path.split("/") if part]
+    rng = random.Random(zlib.crc32(path.encode()))
+    if len(parts) >= 3 and parts[0] == "api" and parts[1] == "v2" and "apikey" in parts:
+        endpoint = parts[2]
+        return endpoint, indian_rail_payload(endpoint, rng, rows)
+    if len(parts) == 3 and parts[0] == "api":
+        endpoint = parts[2]
+        return endpoint, rapidapi_payload(endpoint, rng, rows, parse_qs(urlsplit(path).query))
+    return None, None
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real upstreams
+    disable_nagle_algorithm = True
+    latency = 0.0
+    distribution = "fixed"
+    error_rate = 0.0
+    rows = 20
+    rng = random.Random()
+
+    def delay(self) -> float:
+        if not self.latency:
+            return 0.0
+        if self.distribution == "uniform":
+            return self.rng.uniform(0, 2 * self.latency)
+        if self.distribution == "exponential":
+            return self.rng.expovariate(1 / self.latency)
+        if self.distribution == "lognormal":
+            # Median at `latency` with a long right tail, the usual shape of upstream API latency
+            return self.latency * self.rng.lognormvariate(0, 0.6)
+        return self.latency
+
+    def do_GET(self):
+        self.server.requests += 1
+        delay = self.delay()
+        if delay:
+            time.sleep(delay)
+        endpoint, payload = payload_for(self.path, self.rows)
+        status = 200
+        headers = {}
+        if payload is None:
+            status, payload = 404, {"ResponseCode": "404", "Message": f"Unknown path {self.path}"}
+        elif self.error_rate and self.rng.random() < self.error_rate:
+            if self.rng.random() < 0.5:
+                status, payload = 503, {"message": "Service temporarily unavailable"}
+            else:
+                status, payload, headers = 429, {"message": "Too many requests"}, {"Retry-After": "0"}
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+    requests = 0  # requests received, for benchmarks counting upstream calls
+
+    def handle_error(self, request, client_address):
+        # Clients dropping idle keep-alive connections is normal under load
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+def start_stub(port: int = 0, latency_ms: float = 0.0, distribution: str = "fixed",
+               error_rate: float = 0.0, rows: int = 20, seed: int = None) -> ThreadingHTTPServer:
+    """
+    Start the stub server on a background thread and return it.
+    Use server.server_address to find the bound port and server.shutdown() to stop it.
+    """
+    if distribution not in DISTRIBUTIONS:
+        raise ValueError(f"distribution must be one of {DISTRIBUTIONS}")
+    handler = type("Handler", (StubHandler,), {
+        "latency": latency_ms / 1000.0,
+        "distribution": distribution,
+        "error_rate": error_rate,
+        "rows": rows,
+        "rng": random.Random(seed),
+    })
+    server = StubServer(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def start_stub_process(latency_ms: float = 0.0, rows: int = 20, distribution: str = "fixed") -> tuple:
+    """
+    Start the stub in a separate Python process, so that its threads do not compete with the
+    process being measured for the GIL. Returns (process, base URL); stop it with process.terminate().
+    """
+    command = [sys.executable, "-u", "-m", "bench.mock_upstream", "--port", "0", "--latency-ms", str(latency_ms),
+               "--rows", str(rows), "--distribution", distribution]
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    process = subprocess.Popen(command, cwd=root, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    banner = [process.stdout.readline() for _ in range(3)]  # read it all, so that the stub never writes to a closed pipe
+    process.stdout.close()
+    base_url = banner[0].split()[-1]
+    return process, base_url
+
+
+def add_stub_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="median upstream latency")
+    parser.add_argument("--distribution", choices=DISTRIBUTIONS, default="fixed")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 429/503")
+    parser.add_argument("--rows", type=int, default=20, help="records per list payload")
+    parser.add_argument("--seed", type=int, default=None)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+    server = start_stub(args.port, args.latency_ms, args.distribution, args.error_rate, args.rows, args.seed)
+    print(f"Stub upstream listening on http://127.0.0.1:{server.server_address[1]}")
+    print(f"  TRAIN_MCP_INDIAN_RAIL_BASE_URL=http://127.0.0.1:{server.server_address[1]}/api/v2")
+    print(f"  TRAIN_MCP_RAPIDAPI_BASE_URL=http://127.0.0.1:{server.server_address[1]}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,21 @@
+def percentile(samples: list, pct: float) -> float:
+    """
+    Nearest-rank percentile of a list of samples.
+    """
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def summarize(name: str, samples_ms: list) -> str:
+    """
+    Format a one-line latency summary in milliseconds.
+    """
+    return (
+        f"{name:<32} n={len(samples_ms):<5} "
+        f"p50={percentile(samples_ms, 50):8.2f}ms "
+        f"p95={percentile(samples_ms, 95):8.2f}ms "
+        f"p99={percentile(samples_ms, 99):8.2f}ms"
+    )
@@ -0,0 +1,208 @@
+import os
+import time
+
+from metrics import registry
+from records import parse_board
+from timetable import DAY_MINUTES, WEEKDAYS, format_time, load_stored_schedules_async, parse_time, parse_weekday, timetable
+
+# How long the train list of an upstream station board is trusted as every train calling there
+BOARD_MAX_AGE = float(os.getenv("TRAIN_MCP_BOARD_MAX_AGE", str(7 * 24 * 3600)))
+
+_boards = {}  # station code -> (train numbers on the last upstream board, time.time() it was seen)
+
+
+def _count(query: str, local: bool) -> None:
+    registry.inc("train_mcp_station_queries_total", (("query", query), ("source", "local" if local else "upstream")))
+
+
+def observe_board(station_code: str, data) -> bool:
+    """
+    Remember which trains an upstream station board lists, as the reference for local coverage.
+    """
+    if not isinstance(data, (dict, list)) or (isinstance(data, dict) and "error" in data):
+        return False
+    numbers = frozenset(record.train_number for record in parse_board(data))
+    if not numbers:
+        return False
+    _boards[str(station_code).strip().upper()] = (numbers, time.time())
+    return True
+
+
+def coverage(station_code: str) -> dict:
+    """
+    How much of a station the index covers: complete when a recent upstream board was seen and
+    every train on it has an indexed schedule calling there. Only looks at what is in memory:
+    callers await load_stored_schedules_async() first.
+    """
+    station = station_code.strip().upper()
+    indexed = timetable.trains_at(station)
+    board = _boards.get(station)
+    if board is None or time.time() - board[1] > BOARD_MAX_AGE:
+        return {"complete": False, "trains_indexed": len(indexed), "trains_on_board": None, "missing_schedules": []}
+    missing = sorted(board[0] - indexed)
+    return {"complete": not missing, "trains_indexed": len(indexed), "trains_on_board": len(board[0]),
+            "missing_schedules": missing}
+
+
+def _clock(minutes: int) -> str:
+    return format_time(minutes) if minutes >= 0 else f"{format_time(minutes + DAY_MINUTES)} -1d"
+
+
+def _describe(station: str, call: tuple) -> dict:
+    number, arrival, departure, started = call
+    schedule = timetable.trains[number]
+    origin, terminus = schedule["stops"][0][0], schedule["stops"][-1][0]
+    return {
+        "train_number": number,
+        "train_name": schedule["name"],
+        "from": origin,
+        "to": terminus,
+        "arrival": None if station == origin else _clock(arrival),
+        "departure": None if station == terminus else _clock(departure),
+        "day": (arrival - started * DAY_MINUTES) // DAY_MINUTES + 1,
+        "runs_on": [day for index, day in enumerate(WEEKDAYS) if (schedule["days"] >> index) & 1],
+    }
+
+
+def local_board(endpoint: str, station_code: str):
+    """
+    The board of a station built from the index in the upstream format of `endpoint`
+    (AllTrainOnStation or getTrainsByStation), or None when the index does not cover every
+    train calling there and the board has to come from upstream.
+    """
+    station = str(station_code).strip().upper()
+    if not coverage(station)["complete"]:
+        _count("board", False)
+        return None
+    _count("board", True)
+    trains = []
+    calls = sorted(timetable.calls_at(station), key=lambda call: (call[1] % DAY_MINUTES, call[0]))
+    for number, arrival, departure, _ in calls:
+        train = _describe(station, (number, arrival % DAY_MINUTES, departure % DAY_MINUTES, 0))
+        train["arrival"] = train["arrival"] or "--"
+        train["departure"] = train["departure"] or "--"
+        train["running_days"] = "".join("Y" if day in train["runs_on"] else "N" for day in WEEKDAYS)
+        trains.append(train)
+    if endpoint == "getTrainsByStation":
+        groups = {"passing": [], "originating": [], "destinating": []}
+        for train in trains:
+            group = "originating" if train["from"] == station else "destinating" if train["to"] == station else "passing"
+            groups[group].append({
+                "trainNumber": train["train_number"], "trainName": train["train_name"],
+                "sourceStationCode": train["from"], "destinationStationCode": train["to"],
+                "arrival_time": train["arrival"], "departure_time": train["departure"], "running_days": train["running_days"],
+            })
+        return {"status": True, "message": "Success", "served_from": "local_index", "data": groups}
+    return {
+        "ResponseCode": "200",
+        "TotalTrains": len(trains),
+        "Trains": [
+            {"TrainNo": train["train_number"], "TrainName": train["train_name"], "Source": train["from"],
+             "Destination": train["to"], "ArrivalTime": train["arrival"], "DepartureTime": train["departure"],
+             "RunningDays": train["running_days"]}
+            for train in trains
+        ],
+        "served_from": "local_index",
+    }
+
+
+def _weekday(day: str):
+    weekday = parse_weekday(day)
+    if weekday is None and str(day).strip()[:3].upper() in WEEKDAYS:
+        weekday = WEEKDAYS.index(str(day).strip()[:3].upper())
+    return weekday
+
+
+def _in_window(arrival, departure, start: int, end: int):
+    """
+    When a board entry's clock times fall in the window, the arrival in window minutes; otherwise None.
+    """
+    arrival = arrival if arrival is not None else departure
+    departure = departure if departure is not None else arrival
+    if arrival is None:
+        return None
+    if departure < arrival:
+        departure += DAY_MINUTES
+    for shift in (-DAY_MINUTES, 0, DAY_MINUTES):
+        if arrival + shift < end and departure + shift >= start:
+            return arrival + shift
+    return None
+
+
+async def trains_through_station(fetch_board, station_code: str, from_time: str = "00:00", to_time: str = "23:59",
+                                 day: str = None, limit: int = None) -> dict:
+    """
+    Trains calling at a station between two times (inclusive), optionally on a date or weekday.
+
+    Answered from the station index when it covers the station completely. Otherwise the
+    board comes from upstream through fetch_board(station_code) and is filtered by its clock
+    times, with running days and day of journey taken from indexed schedules where known.
+    """
+    start, end = parse_time(from_time), parse_time(to_time)
+    if start is None or end is None:
+        return {"error": f"Invalid time window {from_time!r} to {to_time!r}, expected HH:MM"}
+    weekday = _weekday(day) if day else None
+    if day and weekday is None:
+        return {"error": f"Invalid day {day!r}, expected a date or a weekday name"}
+    station = station_code.strip().upper()
+    await load_stored_schedules_async()
+    end = (end + 1) % DAY_MINUTES or DAY_MINUTES
+    if end <= start:
+        end += DAY_MINUTES
+    state = coverage(station)
+    local = state["complete"]
+    calls = timetable.calls_at(station, start, end, weekday)
+
+    if local:
+        trains = [_describe(station, call) for call in calls]
+    else:
+        data = await fetch_board(station)
+        if isinstance(data, dict) and "error" in data:
+            return data
+        known = timetable.trains_at(station)
+        # A train can call more than once in the window, e.g. on consecutive days around midnight
+        instances = {}
+        for call in calls:
+            instances.setdefault(call[0], []).append(call)
+        seen = set()
+        found = {}  # (train number, day it started, None when unknown) -> (arrival, train)
+        for record in parse_board(data):
+            number = record.train_number
+            if number in seen:
+                continue
+            seen.add(number)
+            if number in known:
+                for call in instances.get(number, ()):
+                    found[(number, call[3])] = (call[1], _describe(station, call))
+                continue
+            arrives = _in_window(parse_time(record.arrival), parse_time(record.departure), start, end)
+            if arrives is not None:
+                found[(number, None)] = (arrives, {
+                    "train_number": number, "train_name": record.train_name, "from": record.source,
+                    "to": record.destination, "arrival": record.arrival, "departure": record.departure,
+                    "day": None, "runs_on": None,
+                })
+        trains = [train for _, train in sorted(found.values(), key=lambda item: (item[0], item[1]["train_number"]))]
+        state = coverage(station)
+    _count("window", local)
+    return {
+        "station": station,
+        "from_time": from_time,
+        "to_time": to_time,
+        "weekday": WEEKDAYS[weekday] if weekday is not None else None,
+        "served_from": "local_index" if local else "upstream",
+        "coverage": state,
+        "total": len(trains),
+        "trains": trains[:limit] if limit is not None else trains,
+    }
+
+
+def _collect_index_metrics() -> list:
+    covered = sum(coverage(station)["complete"] for station in list(_boards))
+    return [
+        ("train_mcp_station_index_stations", "gauge", "Stations with at least one indexed train.", (), len(timetable.at_station)),
+        ("train_mcp_station_boards_covered", "gauge", "Stations whose boards are answered from the index.", (), covered),
+    ]
+
+
+registry.add_collector(_collect_index_metrics)
@@ -0,0 +1,276 @@
+import os
+import time
+import sqlite3
+import asyncio
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import jsoncodec
+
+logger = logging.getLogger("train-mcp")
+
+MINUTE = 60
+HOUR = 60 * MINUTE
+DAY = 24 * HOUR
+
+# Time-to-live per upstream endpoint, in seconds. 0 means never cache.
+ENDPOINT_TTLS = {
+    # indianrailapi.com v2
+    "StationNameToCode": 30 * DAY,
+    "TrainSchedule": DAY,
+    "TrainInformation": DAY,
+    "TrainFare": DAY,
+    "AllTrainOnStation": 6 * HOUR,
+    "TrainBetweenStation": 6 * HOUR,
+    "LiveStation": 30,
+    "livetrainstatus": 30,
+    # RapidAPI IRCTC
+    "searchStation": 7 * DAY,
+    "searchTrain": DAY,
+    "getTrainSchedule": DAY,
+    "getTrainClasses": 7 * DAY,
+    "getFare": DAY,
+    "getTrainsByStation": 6 * HOUR,
+    "trainBetweenStations": HOUR,
+    "getLiveStation": 30,
+    "liveTrainStatus": 30,
+    "checkSeatAvailability": 2 * MINUTE,
+    "getPNRStatus": 0,
+}
+
+# Seconds past expiry during which a response is still served at once while a fresh copy is
+# fetched in the background (stale-while-revalidate). These keys are also prefetched when hot.
+ENDPOINT_STALE_WHILE_REVALIDATE = {
+    "LiveStation": 2 * MINUTE,
+    "livetrainstatus": 2 * MINUTE,
+    "getLiveStation": 2 * MINUTE,
+    "liveTrainStatus": 2 * MINUTE,
+    "getTrainsByStation": HOUR,
+}
+
+CACHE_MAX_ENTRIES = int(os.getenv("TRAIN_MCP_CACHE_MAX_ENTRIES", "4096"))
+CACHE_MAX_BYTES = int(os.getenv("TRAIN_MCP_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+CACHE_PATH = os.getenv("TRAIN_MCP_CACHE_PATH")  # Optional on-disk tier, e.g. "train-cache.sqlite3"
+# Expired entries are kept this long so they can be served, marked stale, while an upstream is failing
+STALE_GRACE = float(os.getenv("TRAIN_MCP_STALE_GRACE", str(HOUR)))
+
+
+def ttl_for(endpoint: str) -> int:
+    """
+    Return the cache TTL in seconds for an upstream endpoint (0 when it must not be cached).
+    """
+    return ENDPOINT_TTLS.get(endpoint, 0)
+
+
+def stale_while_revalidate_for(endpoint: str) -> int:
+    """
+    Return how long past expiry an endpoint's responses may be served while revalidating (0 for never).
+    """
+    return ENDPOINT_STALE_WHILE_REVALIDATE.get(endpoint, 0)
+
+
+def make_key(endpoint: str, url: str, params: dict = None) -> str:
+    """
+    Build a normalised cache key for an upstream request.
+    Codes and names are compared case-insensitively, so "ndls" and "NDLS" share an entry.
+    The key is hashed so that API keys embedded in URLs never reach the disk tier.
+    """
+    parts = [url.strip().upper()]
+    for name, value in sorted((params or {}).items()):
+        if value is not None:
+            parts.append(f"{name}={str(value).strip().upper()}")
+    digest = hashlib.sha1("&".join(parts).encode()).hexdigest()
+    return f"{endpoint}:{digest}"
+
+
+def is_cacheable(data) -> bool:
+    """
+    Only successful responses are cached; error dicts are always refetched.
+    """
+    return isinstance(data, (dict, list)) and not (isinstance(data, dict) and "error" in data)
+
+
+class MemoryCache:
+    """
+    In-memory LRU tier bounded by entry count and total serialised size.
+    Values are shared between callers and must be treated as read-only.
+    """
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES, max_bytes: int = CACHE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._entries = OrderedDict()  # key -> (expires_at, size, value)
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            now = time.time()
+            if entry[0] <= now:
+                if entry[0] + STALE_GRACE <= now:
+                    self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[2]
+
+    def peek(self, key: str):
+        """
+        Return (expires_at, value) for an entry, expired or not, or None.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            return None if entry is None else (entry[0], entry[2])
+
+    def set(self, key: str, value, ttl: float, size: int) -> None:
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.time() + ttl, size, value)
+            self.total_bytes += size
+            while len(self._entries) > self.max_entries or self.total_bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _remove(self, key: str) -> None:
+        _, size, _ = self._entries.pop(key)
+        self.total_bytes -= size
+
+
+class DiskCache:
+    """
+    Optional SQLite-backed tier that survives restarts. Its methods block on SQLite locks, which
+    other worker processes may hold, so async code goes through TieredCache's async methods.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, expires_at REAL, body BLOB)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str, max_stale: float = 0):
+        """
+        Return (expires_at, body) for a live entry, or one expired at most max_stale seconds ago, or None.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT expires_at, body FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or row[0] + max_stale <= time.time():
+            return None
+        return row
+
+    def set(self, key: str, body: bytes, ttl: float) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, expires_at, body) VALUES (?, ?, ?)",
+                (key, time.time() + ttl, body),
+            )
+            self._conn.commit()
+
+    def purge_expired(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM cache WHERE expires_at <= ?", (time.time() - STALE_GRACE,))
+            self._conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM cache")
+            self._conn.commit()
+
+
+class TieredCache:
+    """
+    Response cache consulted before any upstream request: memory first, then disk.
+    Disk hits are promoted back into memory for their remaining lifetime. The *_async
+    methods run disk operations on the cache's own thread, off the event loop.
+    """
+
+    def __init__(self, memory: MemoryCache, disk: DiskCache = None):
+        self.memory = memory
+        self.disk = disk
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="train-mcp-cache") if disk is not None else None
+
+    async def _off_loop(self, method, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, method, *args)
+
+    async def get_async(self, key: str):
+        value = self.memory.get(key)
+        if value is not None or self.disk is None:
+            return value
+        return await self._off_loop(self.get, key)
+
+    async def get_stale_async(self, key: str, max_stale: float = STALE_GRACE):
+        if self.disk is None:
+            return self.get_stale(key, max_stale)
+        return await self._off_loop(self.get_stale, key, max_stale)
+
+    async def set_async(self, key: str, value, ttl: float) -> None:
+        if self.disk is None:
+            self.set(key, value, ttl)
+            return
+        body = jsoncodec.dumps(value)
+        self.memory.set(key, value, ttl, len(body))
+        await self._off_loop(self.disk.set, key, body, ttl)
+
+    def get(self, key: str):
+        value = self.memory.get(key)
+        if value is not None or self.disk is None:
+            return value
+        row = self.disk.get(key)
+        if row is None:
+            return None
+        expires_at, body = row
+        value = jsoncodec.loads(body)
+        self.memory.set(key, value, expires_at - time.time(), len(body))
+        return value
+
+    def get_stale(self, key: str, max_stale: float = STALE_GRACE):
+        """
+        Return (value, seconds since it expired) for an entry that expired at most max_stale seconds ago,
+        or None. Used to answer while an upstream is unavailable.
+        """
+        entry = self.memory.peek(key)
+        if entry is None and self.disk is not None:
+            row = self.disk.get(key, max_stale)
+            entry = None if row is None else (row[0], jsoncodec.loads(row[1]))
+        if entry is None:
+            return None
+        age = time.time() - entry[0]
+        if age > max_stale:
+            return None
+        return entry[1], max(0.0, age)
+
+    def set(self, key: str, value, ttl: float) -> None:
+        body = jsoncodec.dumps(value)
+        self.memory.set(key, value, ttl, len(body))
+        if self.disk is not None:
+            self.disk.set(key, body, ttl)
+
+    def clear(self) -> None:
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+
+response_cache = TieredCache(MemoryCache(), DiskCache(CACHE_PATH) if CACHE_PATH else None)
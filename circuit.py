@@ -0,0 +1,86 @@
+import os
+import time
+import threading
+
+# Consecutive upstream failures that open an endpoint's circuit, and how long it then stays open
+FAILURE_THRESHOLD = int(os.getenv("TRAIN_MCP_BREAKER_FAILURES", "5"))
+OPEN_SECONDS = float(os.getenv("TRAIN_MCP_BREAKER_OPEN_SECONDS", "30"))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Per-endpoint circuit breaker. After FAILURE_THRESHOLD consecutive failures the circuit
+    opens and calls fail fast; once OPEN_SECONDS have passed a single probe call is let
+    through, and its outcome closes the circuit again or keeps it open for another period.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = FAILURE_THRESHOLD, open_seconds: float = OPEN_SECONDS):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.failures = 0
+        self.opened = 0  # times the circuit has opened
+        self._opened_at = None
+        self._probe_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return CLOSED
+        if time.monotonic() - self._opened_at < self.open_seconds:
+            return OPEN
+        return HALF_OPEN
+
+    def allow(self) -> bool:
+        """
+        Whether a call may go upstream now. In the half-open state only one probe is allowed
+        per open period; a probe that never reports back is replaced after that period.
+        """
+        with self._lock:
+            state = self.state
+            if state == CLOSED:
+                return True
+            if state == OPEN:
+                return False
+            now = time.monotonic()
+            if self._probe_at is not None and now - self._probe_at < self.open_seconds:
+                return False
+            self._probe_at = now
+            return True
+
+    def retry_after(self) -> float:
+        """
+        Seconds until the next probe may be let through (0 when the circuit is closed).
+        """
+        if self._opened_at is None:
+            return 0.0
+        return max(0.0, self._opened_at + self.open_seconds - time.monotonic())
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self._opened_at = None
+            self._probe_at = None
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or (self._opened_at is None and self.failures >= self.failure_threshold):
+                self._opened_at = time.monotonic()
+                self._probe_at = None
+                self.opened += 1
+
+
+breakers = {}
+
+
+def breaker_for(endpoint: str) -> CircuitBreaker:
+    breaker = breakers.get(endpoint)
+    if breaker is None:
+        breaker = breakers.setdefault(endpoint, CircuitBreaker(endpoint))
+    return breaker
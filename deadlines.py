@@ -0,0 +1,52 @@
+import os
+import time
+import contextvars
+from contextlib import contextmanager
+
+# Budget for one tool call, from the moment the server receives it until the answer is ready
+TOOL_DEADLINE = float(os.getenv("TRAIN_MCP_TOOL_DEADLINE", "60"))
+
+_deadline = contextvars.ContextVar("request_deadline", default=None)
+
+
+@contextmanager
+def deadline(seconds: float):
+    """
+    Run the enclosed block (and tasks started inside it) with a deadline `seconds` from now.
+    A nested deadline can only shorten the one already in force.
+    """
+    expires_at = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(expires_at if current is None else min(current, expires_at))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+@contextmanager
+def detached(seconds: float):
+    """
+    Run the enclosed block with its own deadline, ignoring the caller's.
+    For background work that outlives the request that started it.
+    """
+    token = _deadline.set(time.monotonic() + seconds)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def expires_at():
+    """
+    The time.monotonic() value at which the current request expires, or None.
+    """
+    return _deadline.get()
+
+
+def remaining():
+    """
+    Seconds left before the current request expires (possibly negative), or None without a deadline.
+    """
+    expires = _deadline.get()
+    return None if expires is None else expires - time.monotonic()
@@ -0,0 +1,286 @@
+import os
+import inspect
+
+from boards import local_board, observe_board
+from records import shape_response
+from store import stored
+from timetable import load_stored_schedules_async, observe_schedule
+from upstream import fetch_data
+
+INDIAN_RAIL_API_KEY = os.getenv("INDIAN_RAIL_API_KEY")
+INDIAN_RAIL_BASE_URL = os.getenv("TRAIN_MCP_INDIAN_RAIL_BASE_URL", "http://indianrailapi.com/api/v2")
+RAPIDAPI_KEY = os.getenv("RAPIDAPI_KEY")
+RAPIDAPI_HOST = "irctc1.p.rapidapi.com"
+RAPIDAPI_BASE_URL = os.getenv("TRAIN_MCP_RAPIDAPI_BASE_URL", f"https://{RAPIDAPI_HOST}")
+
+REQUIRED = inspect.Parameter.empty
+SHAPE_DOCS = (
+    ("limit", "(Optional) Maximum number of records to return."),
+    ("offset", "(Optional) Number of records to skip."),
+)
+
+
+class Arg:
+    __slots__ = ("name", "annotation", "doc", "default", "upper")
+
+    def __init__(self, name: str, annotation, doc: str, default=REQUIRED, upper: bool = False):
+        self.name = name
+        self.annotation = annotation
+        self.doc = doc
+        self.default = default
+        self.upper = upper  # station codes are sent upper-case
+
+
+class Endpoint:
+    """
+    One upstream endpoint exposed as a tool.
+
+    path is formatted with the tool arguments (and {apikey} for Indian Rail API paths);
+    params maps RapidAPI query parameters to argument names, and parameters left empty are
+    not sent. shaped names example fields when the tool takes fields/limit/offset; stored
+    answers from the reference store keyed by the first argument; observe(key, data) is
+    called with every upstream answer; local(endpoint, key) answers from local data instead,
+    or returns None to go upstream.
+    """
+
+    __slots__ = ("tool", "endpoint", "provider", "path", "params", "args", "description", "shaped", "stored", "observe",
+                 "local")
+
+    def __init__(self, tool: str, endpoint: str, provider: str, path: str, args: tuple, description: str,
+                 params: tuple = (), shaped: tuple = None, stored: bool = False, observe=None, local=None):
+        self.tool = tool
+        self.endpoint = endpoint
+        self.provider = provider
+        self.path = path
+        self.params = params
+        self.args = args
+        self.description = description
+        self.shaped = shaped
+        self.stored = stored
+        self.observe = observe
+        self.local = local
+
+
+TRAIN_NUMBER = Arg("train_number", str, 'The train number (e.g., "19038").')
+FROM_STATION = Arg("from_station", str, 'Source station code (e.g., "NDLS").', upper=True)
+TO_STATION = Arg("to_station", str, 'Destination station code (e.g., "BCT").', upper=True)
+FROM_STATION_CODE = Arg("from_station_code", str, 'Source station code (e.g., "NDLS").')
+TO_STATION_CODE = Arg("to_station_code", str, 'Destination station code (e.g., "BVI").')
+QUERY = Arg("query", str, 'Search text (e.g., "NDLS").')
+
+ENDPOINTS = {spec.endpoint: spec for spec in (
+    # indianrailapi.com v2
+    Endpoint(
+        "station_name_to_code", "StationNameToCode", "indianrail", "StationNameToCode/apikey/{apikey}/StationName/{station_name}",
+        (Arg("station_name", str, 'The name of the station (e.g., "ERODE JN").', upper=True),),
+        "Convert a station name to its code using Indian Rail API.",
+    ),
+    Endpoint(
+        "get_train_schedule_indian_rail", "TrainSchedule", "indianrail", "TrainSchedule/apikey/{apikey}/TrainNumber/{train_number}",
+        (TRAIN_NUMBER,),
+        "Get the schedule of a train by its number using Indian Rail API.",
+        shaped=("station_code", "arrival"), stored=True, observe=observe_schedule,
+    ),
+    Endpoint(
+        "get_all_trains_on_station", "AllTrainOnStation", "indianrail", "AllTrainOnStation/apikey/{apikey}/StationCode/{station_code}",
+        (Arg("station_code", str, 'The station code (e.g., "NDLS").', upper=True),),
+        "Get all trains arriving at or departing from a station using Indian Rail API.\n"
+        "Answered from known train schedules when they cover every train at the station.",
+        shaped=("train_number", "arrival"), observe=observe_board, local=local_board,
+    ),
+    Endpoint(
+        "get_live_station_status", "LiveStation", "indianrail", "LiveStation/apikey/{apikey}/StationCode/{station_code}/hours/{hours}",
+        (Arg("station_code", str, 'The station code (e.g., "NDLS").', upper=True),
+         Arg("hours", int, "Number of hours to fetch live status for (e.g., 2 or 4).")),
+        "Get live status of trains at a station for the next few hours.",
+        shaped=("train_number", "arrival"),
+    ),
+    Endpoint(
+        "get_live_train_status", "livetrainstatus", "indianrail", "livetrainstatus/apikey/{apikey}/trainnumber/{train_number}/date/{date}",
+        (TRAIN_NUMBER, Arg("date", str, "Date of journey in yyyymmdd format.")),
+        "Get live status of a train.",
+    ),
+    Endpoint(
+        "get_train_fare", "TrainFare", "indianrail",
+        "TrainFare/apikey/{apikey}/TrainNumber/{train_number}/From/{station_from}/To/{station_to}/Quota/{quota}",
+        (TRAIN_NUMBER,
+         Arg("station_from", str, 'Source station code (e.g., "NDLS").', upper=True),
+         Arg("station_to", str, 'Destination station code (e.g., "BCT").', upper=True),
+         Arg("quota", str, 'Quota type (e.g., "GN").')),
+        "Get fare details for a train journey.",
+    ),
+    Endpoint(
+        "get_train_information", "TrainInformation", "indianrail", "TrainInformation/apikey/{apikey}/TrainNumber/{train_number}",
+        (TRAIN_NUMBER,),
+        "Get detailed information about a train.",
+        stored=True,
+    ),
+    Endpoint(
+        "find_trains_between_stations", "TrainBetweenStation", "indianrail",
+        "TrainBetweenStation/apikey/{apikey}/From/{from_station}/To/{to_station}",
+        (FROM_STATION, TO_STATION),
+        "Find trains between two stations.",
+        shaped=("train_number", "arrival"),
+    ),
+    # RapidAPI IRCTC
+    Endpoint(
+        "search_station", "searchStation", "rapidapi", "/api/v1/searchStation",
+        (QUERY,), "Search for a station by query.",
+        params=(("query", "query"),), shaped=("code", "name"),
+    ),
+    Endpoint(
+        "search_train", "searchTrain", "rapidapi", "/api/v1/searchTrain",
+        (Arg("query", str, 'Train number or name (e.g., "19038").'),), "Search for a train by query.",
+        params=(("query", "query"),), shaped=("train_number", "train_name"),
+    ),
+    Endpoint(
+        "find_trains_between_stations", "trainBetweenStations", "rapidapi", "/api/v3/trainBetweenStations",
+        (FROM_STATION_CODE, TO_STATION_CODE, Arg("date", str, "Date of journey in YYYY-MM-DD format.")),
+        "Find trains between two stations on a specific date.\nDate format: YYYY-MM-DD",
+        params=(("fromStationCode", "from_station_code"), ("toStationCode", "to_station_code"), ("dateOfJourney", "date")),
+        shaped=("train_number", "arrival"),
+    ),
+    Endpoint(
+        "get_train_schedule", "getTrainSchedule", "rapidapi", "/api/v1/getTrainSchedule",
+        (TRAIN_NUMBER,), "Get the schedule of a train by its number.",
+        params=(("trainNo", "train_number"),), shaped=("station_code", "arrival"), stored=True, observe=observe_schedule,
+    ),
+    Endpoint(
+        "get_live_train_status", "liveTrainStatus", "rapidapi", "/api/v1/liveTrainStatus",
+        (TRAIN_NUMBER, Arg("day", str, "(Optional) Start day: 0 = today, 1 = 1 day ago ... 4 = 4 days ago.", default=None)),
+        "Get live status of a train.\n"
+        "Optional File start day range from 0-4 0 = Day 1 1 = 1 Day Ago 2 = 2 Day Ago 3 = 3 Day Ago 4 = 4 Day Ago",
+        params=(("trainNo", "train_number"), ("startDay", "day")),
+    ),
+    Endpoint(
+        "get_pnr_status", "getPNRStatus", "rapidapi", "/api/v3/getPNRStatus",
+        (Arg("pnr_number", str, 'The 10-digit PNR number (e.g., "1234567890").'),), "Get PNR status.",
+        params=(("pnrNumber", "pnr_number"),),
+    ),
+    Endpoint(
+        "check_seat_availability", "checkSeatAvailability", "rapidapi", "/api/v1/checkSeatAvailability",
+        (Arg("train_no", str, 'Train number (e.g., "19038").'),
+         Arg("date", str, "Date of journey in dd-mm-yyyy format."),
+         Arg("class_type", str, 'Class type (e.g., "2A").'),
+         Arg("quota", str, 'Quota type (e.g., "GN").'),
+         Arg("from_station_code", str, 'Source station code (e.g., "ST").'),
+         Arg("to_station_code", str, 'Destination station code (e.g., "BVI").')),
+        "Check seat availability for a train.",
+        params=(("trainNo", "train_no"), ("date", "date"), ("classType", "class_type"), ("quota", "quota"),
+                ("fromStationCode", "from_station_code"), ("toStationCode", "to_station_code")),
+    ),
+    Endpoint(
+        "get_train_classes", "getTrainClasses", "rapidapi", "/api/v1/getTrainClasses",
+        (TRAIN_NUMBER,), "Get available classes for a train.",
+        params=(("trainNo", "train_number"),), stored=True,
+    ),
+    Endpoint(
+        "get_fare", "getFare", "rapidapi", "/api/v2/getFare",
+        (TRAIN_NUMBER, FROM_STATION_CODE, TO_STATION_CODE), "Get fare details for a train journey.",
+        params=(("trainNo", "train_number"), ("fromStationCode", "from_station_code"), ("toStationCode", "to_station_code")),
+    ),
+    Endpoint(
+        "get_trains_by_station", "getTrainsByStation", "rapidapi", "/api/v3/getTrainsByStation",
+        (Arg("station_code", str, 'The station code (e.g., "NDLS").'),),
+        "Get trains arriving at or departing from a station on a specific date.\n"
+        "Answered from known train schedules when they cover every train at the station.",
+        params=(("stationCode", "station_code"),), shaped=("train_number", "arrival"), observe=observe_board,
+        local=local_board,
+    ),
+    Endpoint(
+        "get_live_station_status", "getLiveStation", "rapidapi", "/api/v3/getLiveStation",
+        (FROM_STATION_CODE,
+         Arg("hours", int, "Number of hours to fetch live status for (e.g., 1)."),
+         Arg("to_station_code", str, '(Optional) Destination station code (e.g., "BVI").', default=None)),
+        "Get live status of trains at a station for the next few hours.",
+        params=(("fromStationCode", "from_station_code"), ("hours", "hours"), ("toStationCode", "to_station_code")),
+        shaped=("train_number", "arrival"),
+    ),
+)}
+
+
+def build_request(spec: Endpoint, arguments: dict):
+    """
+    (url, params, headers) for a call of an endpoint with tool arguments.
+    """
+    values = {arg.name: arguments.get(arg.name) for arg in spec.args}
+    for arg in spec.args:
+        if arg.upper and isinstance(values[arg.name], str):
+            values[arg.name] = values[arg.name].upper()
+    if spec.provider == "indianrail":
+        return f"{INDIAN_RAIL_BASE_URL}/" + spec.path.format(apikey=INDIAN_RAIL_API_KEY, **values), None, None
+    params = {name: values[arg] for name, arg in spec.params if values[arg] not in (None, "")}
+    headers = {"X-RapidAPI-Key": RAPIDAPI_KEY, "X-RapidAPI-Host": RAPIDAPI_HOST}
+    return f"{RAPIDAPI_BASE_URL}{spec.path}", params, headers
+
+
+async def call(endpoint: str, arguments: dict, fields: list = None, limit: int = None, offset: int = 0):
+    """
+    Call an endpoint from the table with tool arguments, from local data when it can answer,
+    through the reference store when it is stored, and shape the answer when it is shaped.
+    """
+    spec = ENDPOINTS[endpoint]
+    url, params, headers = build_request(spec, arguments)
+
+    def fetch():
+        return fetch_data(url, params=params, headers=headers, endpoint=spec.endpoint)
+
+    key = arguments.get(spec.args[0].name)
+    data = None
+    if spec.local is not None:
+        # Local answers come from the stored schedules, which are loaded off the event loop
+        await load_stored_schedules_async()
+        data = spec.local(spec.endpoint, key)
+    if data is None:
+        data = await (stored(spec.endpoint, key, fetch) if spec.stored else fetch())
+        if spec.observe is not None:
+            spec.observe(key, data)
+    if spec.shaped:
+        return shape_response(spec.endpoint, data, fields, limit, offset)
+    return data
+
+
+def make_tool(spec: Endpoint):
+    """
+    An async tool function for an endpoint, with a real signature and docstring for FastMCP.
+    """
+    parameters = [
+        inspect.Parameter(arg.name, inspect.Parameter.POSITIONAL_OR_KEYWORD, default=arg.default, annotation=arg.annotation)
+        for arg in spec.args
+    ]
+    docs = [f"        {arg.name}: {arg.doc}" for arg in spec.args]
+    if spec.shaped:
+        example = ", ".join(f'"{field}"' for field in spec.shaped)
+        parameters += [
+            inspect.Parameter("fields", inspect.Parameter.POSITIONAL_OR_KEYWORD, default=None, annotation=list[str]),
+            inspect.Parameter("limit", inspect.Parameter.POSITIONAL_OR_KEYWORD, default=None, annotation=int),
+            inspect.Parameter("offset", inspect.Parameter.POSITIONAL_OR_KEYWORD, default=0, annotation=int),
+        ]
+        docs.append(f"        fields: (Optional) Record fields to return (e.g., [{example}]); returns compact records.")
+        docs += [f"        {name}: {doc}" for name, doc in SHAPE_DOCS]
+    signature = inspect.Signature(parameters, return_annotation=dict)
+
+    async def tool(*args, **kwargs):
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        arguments = dict(bound.arguments)
+        shape = [arguments.pop(name, default) for name, default in (("fields", None), ("limit", None), ("offset", 0))]
+        return await call(spec.endpoint, arguments, *shape)
+
+    description = "\n".join(f"    {line}" for line in spec.description.splitlines())
+    tool.__name__ = tool.__qualname__ = spec.tool
+    tool.__signature__ = signature
+    tool.__doc__ = f"\n{description}\n    Parameters:\n" + "\n".join(docs) + "\n    "
+    return tool
+
+
+def register(mcp, *endpoints: str) -> dict:
+    """
+    Add a tool to the server for each named endpoint. Returns {tool name: tool function}.
+    """
+    tools = {}
+    for endpoint in endpoints:
+        tool = make_tool(ENDPOINTS[endpoint])
+        mcp.add_tool(tool)
+        tools[tool.__name__] = tool
+    return tools
@@ -0,0 +1,175 @@
+import os
+import asyncio
+
+import cache
+import ratelimit
+from availability import bookable, parse_date
+from records import parse_availability, parse_fares, parse_trains
+from timetable import parse_time
+
+JOURNEY_MAX_TRAINS = int(os.getenv("TRAIN_MCP_JOURNEY_MAX_TRAINS", "30"))
+# Upper bound on availability lookups one search may make
+JOURNEY_MAX_AVAILABILITY_CALLS = int(os.getenv("TRAIN_MCP_JOURNEY_MAX_AVAILABILITY_CALLS", "40"))
+JOURNEY_CONCURRENCY = int(os.getenv("TRAIN_MCP_JOURNEY_CONCURRENCY", "8"))
+RANKINGS = ("price", "duration", "departure")
+# RapidAPI keys fares by quota name rather than by quota code
+QUOTA_NAMES = {"GN": "general", "TQ": "tatkal"}
+
+# Parsed fares per train/from/to/quota. Fares change rarely, so they live as long as cached fare responses
+fare_cache = cache.MemoryCache(max_entries=int(os.getenv("TRAIN_MCP_FARE_CACHE_ENTRIES", "8192")))
+
+
+def _amount(value):
+    try:
+        return float(str(value).replace(",", "").strip())
+    except (TypeError, ValueError):
+        return None
+
+
+def quota_fares(data, quota: str) -> dict:
+    """
+    {class code: fare} for one quota from a fare response; fares without a quota apply to every quota.
+    """
+    names = {quota.lower(), QUOTA_NAMES.get(quota, "").lower()} - {""}
+    fares = {}
+    for record in parse_fares(data):
+        amount = _amount(record.fare)
+        if amount is not None and (record.quota is None or record.quota.lower() in names):
+            fares.setdefault(record.class_code.upper(), amount)
+    return fares
+
+
+def status_on(data, date) -> str:
+    """
+    The availability status for one date (a datetime.date) from an availability response.
+    """
+    for record in parse_availability(data):
+        if parse_date(record.date) == date:
+            return record.status or "UNKNOWN"
+    return "UNKNOWN"
+
+
+def _rank_key(rank_by: str, option: dict):
+    if rank_by == "duration":
+        primary = option["duration_minutes"]
+    elif rank_by == "departure":
+        primary = option["departure_minutes"]
+    else:
+        primary = option["fare"]
+    # Unknown values sort last; ties go to the cheaper, then the earlier train
+    return (primary is None, primary or 0, option["fare"], option["departure_minutes"] or 0, option["train_number"])
+
+
+async def best_journeys(trains_between, fare, availability, from_station: str, to_station: str, date: str,
+                        classes: list = None, quota: str = "GN", rank_by: str = "price",
+                        only_available: bool = True, limit: int = 10, concurrency: int = None) -> dict:
+    """
+    Trains between two stations with their fares and seat availability, best first.
+
+    trains_between(date) returns the upstream train list for the journey date (a datetime.date),
+    fare(train) one upstream fare response and availability(train, date, class_code) one upstream
+    availability response. Fares for every candidate train are fetched concurrently (reusing
+    parsed fares per train/from/to/quota); the train/class options are then ranked and
+    availability is checked in rank order, `concurrency` options at a time, until `limit`
+    bookable options are found, so most searches check only the first few options.
+
+    Returns {"options": [...], "trains_considered", "upstream_calls", "fare_cache_hits", "errors"}.
+    """
+    journey_date = parse_date(date)
+    if journey_date is None:
+        return {"error": f"Unrecognised date {date!r}, expected dd-mm-yyyy or yyyy-mm-dd"}
+    if rank_by not in RANKINGS:
+        return {"error": f"rank_by must be one of {', '.join(RANKINGS)}"}
+    quota = quota.strip().upper()
+    wanted = {code.strip().upper() for code in classes or () if code.strip()}
+    limit = max(1, limit)
+    concurrency = max(1, min(concurrency or JOURNEY_CONCURRENCY, 32))
+    semaphore = asyncio.Semaphore(concurrency)
+    calls = {"trains": 1, "fares": 0, "availability": 0}
+    errors = []
+    hits = 0
+
+    async def bounded(call, *args):
+        async with semaphore:
+            return await call(*args)
+
+    async def fares_for(train):
+        nonlocal hits
+        key = f"{train.train_number}:{from_station}:{to_station}:{quota}"
+        fares = fare_cache.get(key)
+        if fares is not None:
+            hits += 1
+            return fares
+        calls["fares"] += 1
+        data = await bounded(fare, train.train_number)
+        if isinstance(data, dict) and "error" in data:
+            raise LookupError(data["error"])
+        fares = quota_fares(data, quota)
+        if fares:
+            fare_cache.set(key, fares, cache.ttl_for("getFare"), len(fares))
+        return fares
+
+    level = ratelimit.explicit_priority()
+    with ratelimit.priority(ratelimit.NORMAL if level is None else level):
+        listing = await trains_between(journey_date)
+        if isinstance(listing, dict) and "error" in listing:
+            return listing
+        trains = list({train.train_number: train for train in parse_trains(listing)}.values())[:JOURNEY_MAX_TRAINS]
+        if not trains:
+            return {"error": f"No trains found between {from_station} and {to_station}"}
+
+        options = []
+        for train, fares in zip(trains, await asyncio.gather(*(fares_for(train) for train in trains), return_exceptions=True)):
+            if isinstance(fares, Exception):
+                errors.append({"train_number": train.train_number, "error": f"Fare lookup failed: {fares}"})
+                continue
+            for class_code, amount in fares.items():
+                if wanted and class_code not in wanted:
+                    continue
+                options.append({
+                    "train_number": train.train_number,
+                    "train_name": train.train_name,
+                    "departure": train.departure,
+                    "arrival": train.arrival,
+                    "duration": train.duration,
+                    "departure_minutes": parse_time(train.departure),
+                    "duration_minutes": parse_time(train.duration),
+                    "class": class_code,
+                    "fare": amount,
+                })
+        options.sort(key=lambda option: _rank_key(rank_by, option))
+
+        results = []
+        pending = options[:JOURNEY_MAX_AVAILABILITY_CALLS]
+        while pending and len(results) < limit:
+            wave, pending = pending[:concurrency], pending[concurrency:]
+            calls["availability"] += len(wave)
+            answers = await asyncio.gather(
+                *(bounded(availability, option["train_number"], journey_date, option["class"]) for option in wave),
+                return_exceptions=True,
+            )
+            for option, answer in zip(wave, answers):
+                if isinstance(answer, Exception) or (isinstance(answer, dict) and "error" in answer):
+                    message = str(answer) if isinstance(answer, Exception) else answer["error"]
+                    errors.append({"train_number": option["train_number"], "class": option["class"], "error": message})
+                    status = "ERROR"
+                else:
+                    status = status_on(answer, journey_date)
+                if bookable(status) or not only_available:
+                    results.append({**option, "availability": status})
+
+    for option in results:
+        del option["departure_minutes"], option["duration_minutes"]
+    return {
+        "from": from_station,
+        "to": to_station,
+        "date": journey_date.isoformat(),
+        "quota": quota,
+        "rank_by": rank_by,
+        "options": results[:limit],
+        "trains_considered": len(trains),
+        "options_considered": len(options),
+        "upstream_calls": calls,
+        "fare_cache_hits": hits,
+        "errors": errors,
+    }
@@ -0,0 +1,219 @@
+import os
+import re
+import json
+import codecs
+
+try:  # Optional: orjson decodes and encodes several times faster than the json module
+    import orjson
+except ImportError:
+    orjson = None
+
+BACKEND = "orjson" if orjson is not None else "json"
+
+# Upstream bodies larger than this (after decompression) are refused
+MAX_RESPONSE_BYTES = int(os.getenv("TRAIN_MCP_MAX_RESPONSE_BYTES", str(8 * 1024 * 1024)))
+CHUNK_SIZE = 64 * 1024
+# Endpoints answering with long record lists. Without orjson their bodies are decoded chunk by
+# chunk as they arrive (see IncrementalDecoder), so a multi-megabyte station board stalls the event
+# loop for a few milliseconds at a time rather than for one long json.loads call
+INCREMENTAL_ENDPOINTS = frozenset({
+    "AllTrainOnStation", "TrainBetweenStation", "LiveStation",
+    "getTrainsByStation", "trainBetweenStations", "getLiveStation",
+})
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_NUMBER_TAIL = re.compile(r"[0-9eE.+-]*")
+_decoder = json.JSONDecoder()
+
+
+class ResponseTooLarge(ValueError):
+    pass
+
+
+def loads(data):
+    """
+    Decode a JSON document from bytes or str.
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        data = bytes(data).decode("utf-8")
+    return json.loads(data)
+
+
+def dumps(value) -> bytes:
+    """
+    Compact UTF-8 JSON encoding.
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(value)
+        except TypeError:
+            pass  # e.g. integers beyond 64 bits, which the json module handles
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+async def read_json(response, endpoint: str = None, max_bytes: int = None):
+    """
+    Read and decode an aiohttp response body, refusing bodies over max_bytes.
+    """
+    limit = MAX_RESPONSE_BYTES if max_bytes is None else max_bytes
+    if response.content_length is not None and response.content_length > limit:
+        raise ResponseTooLarge(f"Upstream response of {response.content_length} bytes exceeds {limit}")
+    incremental = orjson is None and endpoint in INCREMENTAL_ENDPOINTS
+    decoder = IncrementalDecoder() if incremental else None
+    body = bytearray()
+    size = 0
+    async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+        size += len(chunk)
+        if size > limit:
+            raise ResponseTooLarge(f"Upstream response exceeds {limit} bytes")
+        if decoder is not None:
+            decoder.feed(chunk)
+        else:
+            body += chunk
+    if decoder is not None:
+        return decoder.close()
+    return loads(body)
+
+
+class IncrementalDecoder:
+    """
+    Decode a JSON document fed in chunks, without first joining them into one body.
+
+    Objects are walked key by key and arrays element by element; each array element and
+    each scalar is decoded as soon as its text is complete and its text is dropped, so the
+    body is never held whole. Array elements (the records) are decoded whole by the json
+    module's C scanner.
+    """
+
+    _OBJECT_KEY, _OBJECT_COLON, _OBJECT_VALUE, _OBJECT_NEXT = range(4)
+    _ARRAY_VALUE, _ARRAY_NEXT = range(4, 6)
+
+    def __init__(self):
+        self._text = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._pos = 0
+        self._stack = []  # [container, state, pending key] per open object or array
+        self._root = None
+        self._done = False
+
+    def feed(self, chunk: bytes) -> None:
+        self._buffer = self._buffer[self._pos:] + self._text.decode(chunk)
+        self._pos = 0
+        self._parse(False)
+
+    def close(self):
+        self._buffer = self._buffer[self._pos:] + self._text.decode(b"", final=True)
+        self._pos = 0
+        self._parse(True)
+        if not self._done:
+            raise ValueError("Truncated JSON document")
+        if _WHITESPACE.match(self._buffer, self._pos).end() != len(self._buffer):
+            raise ValueError("Extra data after JSON document")
+        return self._root
+
+    def _parse(self, final: bool) -> None:
+        buffer = self._buffer
+        end = len(buffer)
+        while not self._done:
+            pos = _WHITESPACE.match(buffer, self._pos).end()
+            self._pos = pos
+            if pos == end:
+                return
+            char = buffer[pos]
+            if not self._stack:
+                if char in "{[":
+                    self._open(char)
+                    continue
+                value = self._value(final)
+                if value is _INCOMPLETE:
+                    return
+                self._root, self._done = value, True
+                return
+            frame = self._stack[-1]
+            state = frame[1]
+            if state == self._OBJECT_KEY:
+                if char == "}" and not frame[0] and frame[2] is None:
+                    self._close()
+                    continue
+                key = self._value(final)
+                if key is _INCOMPLETE:
+                    return
+                if not isinstance(key, str):
+                    raise ValueError(f"Expecting property name at character {pos}")
+                frame[1], frame[2] = self._OBJECT_COLON, key
+            elif state == self._OBJECT_COLON:
+                if char != ":":
+                    raise ValueError(f"Expecting ':' at character {pos}")
+                self._pos += 1
+                frame[1] = self._OBJECT_VALUE
+            elif state == self._OBJECT_VALUE:
+                if char in "{[":
+                    frame[1] = self._OBJECT_NEXT
+                    self._open(char, frame[0], frame[2])
+                    continue
+                value = self._value(final)
+                if value is _INCOMPLETE:
+                    return
+                frame[0][frame[2]] = value
+                frame[1] = self._OBJECT_NEXT
+            elif state == self._OBJECT_NEXT:
+                if char == "}":
+                    self._close()
+                elif char == ",":
+                    self._pos += 1
+                    frame[1], frame[2] = self._OBJECT_KEY, ""
+                else:
+                    raise ValueError(f"Expecting ',' delimiter at character {pos}")
+            elif state == self._ARRAY_VALUE:
+                if char == "]" and not frame[0] and frame[2] is None:
+                    self._close()
+                    continue
+                value = self._value(final)
+                if value is _INCOMPLETE:
+                    return
+                frame[0].append(value)
+                frame[1] = self._ARRAY_NEXT
+            else:
+                if char == "]":
+                    self._close()
+                elif char == ",":
+                    self._pos += 1
+                    frame[1], frame[2] = self._ARRAY_VALUE, ""
+                else:
+                    raise ValueError(f"Expecting ',' delimiter at character {pos}")
+
+    def _open(self, char: str, parent=None, key=None) -> None:
+        container = {} if char == "{" else []
+        if parent is not None:
+            parent[key] = container
+        elif self._stack:
+            self._stack[-1][0].append(container)
+        else:
+            self._root = container
+        # The pending key slot is None right after the opening bracket, so an empty container may close
+        self._stack.append([container, self._OBJECT_KEY if char == "{" else self._ARRAY_VALUE, None])
+        self._pos += 1
+
+    def _close(self) -> None:
+        self._stack.pop()
+        self._pos += 1
+        if not self._stack:
+            self._done = True
+
+    def _value(self, final: bool):
+        try:
+            value, end = _decoder.raw_decode(self._buffer, self._pos)
+        except json.JSONDecodeError:
+            if final:
+                raise
+            return _INCOMPLETE
+        # A number that runs to the end of the buffer may continue in the next chunk ("2." then "5")
+        if not final and _NUMBER_TAIL.match(self._buffer, end).end() == len(self._buffer):
+            return _INCOMPLETE
+        self._pos = end
+        return value
+
+
+_INCOMPLETE = object()
@@ -0,0 +1,36 @@
+import time
+import threading
+from collections import deque
+
+
+class LatencyWindow:
+    """
+    Sliding window of recent latencies (seconds) for one upstream target.
+    """
+
+    def __init__(self, size: int = 200):
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+        self.failures = 0
+        self.last_failure = 0.0
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def record(self, seconds: float, ok: bool = True) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+            if not ok:
+                self.failures += 1
+                self.last_failure = time.monotonic()
+
+    def percentile(self, pct: float, default: float = None):
+        """
+        Nearest-rank percentile of the window, or default while it is empty.
+        """
+        with self._lock:
+            if not self._samples:
+                return default
+            ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered))) - 1))
+        return ordered[index]
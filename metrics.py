@@ -0,0 +1,254 @@
+import time
+import bisect
+from contextlib import contextmanager
+
+from mcp.server.fastmcp import FastMCP
+
+import admission
+import deadlines
+
+# Latency bucket upper bounds in seconds, spanning cache hits to slow upstream calls
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+METRIC_HELP = {
+    "train_mcp_tool_duration_seconds": ("histogram", "Tool call latency, end to end inside the server."),
+    "train_mcp_tool_inflight": ("gauge", "Tool calls currently running."),
+    "train_mcp_tool_errors_total": ("counter", "Failed tool calls, by exception type, error_result or overloaded."),
+    "train_mcp_tool_queue_seconds": ("histogram", "Time tool calls waited for a concurrency slot."),
+    "train_mcp_upstream_duration_seconds": ("histogram", "Upstream HTTP request latency, by endpoint and status."),
+    "train_mcp_upstream_queue_seconds": ("histogram", "Time spent waiting for a rate limit token before an upstream request."),
+    "train_mcp_upstream_inflight": ("gauge", "Upstream HTTP requests currently in flight."),
+    "train_mcp_upstream_errors_total": ("counter", "Failed upstream requests, by endpoint and error type."),
+    "train_mcp_cache_requests_total": ("counter", "Response cache lookups, by endpoint and result (hit, miss, revalidate or stale)."),
+    "train_mcp_prefetch_total": ("counter", "Background refreshes of hot or stale keys, by endpoint and result."),
+    "train_mcp_station_queries_total": ("counter", "Station board and time-window queries, by query and source (local index or upstream)."),
+}
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram in the Prometheus style.
+    """
+
+    __slots__ = ("buckets", "counts", "count", "sum")
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float:
+        """
+        Estimate a quantile by linear interpolation inside the bucket that contains it.
+        """
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                lower = self.buckets[index - 1] if index else 0.0
+                upper = self.buckets[index] if index < len(self.buckets) else self.buckets[-1]
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return self.buckets[-1]
+
+
+class Registry:
+    """
+    Counters, gauges and histograms keyed by metric name and a tuple of label pairs.
+    """
+
+    def __init__(self):
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+        self._collectors = []
+
+    def inc(self, name: str, labels: tuple = (), value: float = 1) -> None:
+        key = (name, labels)
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def add(self, name: str, labels: tuple = (), value: float = 1) -> None:
+        key = (name, labels)
+        self.gauges[key] = self.gauges.get(key, 0) + value
+
+    def observe(self, name: str, labels: tuple, value: float) -> None:
+        key = (name, labels)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = Histogram()
+        histogram.observe(value)
+
+    def add_collector(self, collector) -> None:
+        """
+        Register a callable returning [(name, kind, help, labels, value), ...] read at scrape time,
+        for values that already live elsewhere (cache size, coalesced calls, ...).
+        """
+        self._collectors.append(collector)
+
+    def clear(self) -> None:
+        self.counters.clear()
+        self.gauges.clear()
+        self.histograms.clear()
+
+    def snapshot(self) -> dict:
+        """
+        Metrics as nested dicts, with latency summaries in milliseconds.
+        """
+        result = {}
+        for (name, labels), value in sorted(self.counters.items()) + sorted(self.gauges.items()):
+            result.setdefault(name, []).append({**dict(labels), "value": value})
+        for (name, labels), histogram in sorted(self.histograms.items(), key=lambda item: item[0]):
+            result.setdefault(name, []).append({
+                **dict(labels),
+                "count": histogram.count,
+                "mean_ms": round(1000 * histogram.sum / histogram.count, 3) if histogram.count else 0.0,
+                "p50_ms": round(1000 * histogram.quantile(0.50), 3),
+                "p95_ms": round(1000 * histogram.quantile(0.95), 3),
+                "p99_ms": round(1000 * histogram.quantile(0.99), 3),
+            })
+        for collector in self._collectors:
+            for name, _, _, labels, value in collector():
+                result.setdefault(name, []).append({**dict(labels), "value": value})
+        return result
+
+    def render_prometheus(self) -> str:
+        """
+        Metrics in the Prometheus text exposition format.
+        """
+        families = {}
+        for (name, labels), value in self.counters.items():
+            families.setdefault(name, []).append(f"{name}{_labels(labels)} {value}")
+        for (name, labels), value in self.gauges.items():
+            families.setdefault(name, []).append(f"{name}{_labels(labels)} {value}")
+        for (name, labels), histogram in self.histograms.items():
+            lines = families.setdefault(name, [])
+            cumulative = 0
+            for bound, count in zip(histogram.buckets + (float("inf"),), histogram.counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{name}_bucket{_labels(labels + (('le', le),))} {cumulative}")
+            lines.append(f"{name}_sum{_labels(labels)} {histogram.sum}")
+            lines.append(f"{name}_count{_labels(labels)} {histogram.count}")
+        help_text = dict(METRIC_HELP)
+        for collector in self._collectors:
+            for name, kind, description, labels, value in collector():
+                help_text.setdefault(name, (kind, description))
+                families.setdefault(name, []).append(f"{name}{_labels(labels)} {value}")
+        output = []
+        for name in sorted(families):
+            kind, description = help_text.get(name, ("untyped", name))
+            output.append(f"# HELP {name} {description}")
+            output.append(f"# TYPE {name} {kind}")
+            output.extend(families[name])
+        return "\n".join(output) + "\n"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels: tuple) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels) + "}"
+
+
+registry = Registry()
+
+
+def _collect_admission_metrics() -> list:
+    samples = []
+    for gate in admission.gates.values():
+        labels = (("tool", gate.name),)
+        samples.append(("train_mcp_tool_rejected_total", "counter", "Tool calls shed because the tool was overloaded.", labels, gate.rejected))
+        samples.append(("train_mcp_tool_queued", "gauge", "Tool calls waiting for a concurrency slot.", labels, gate.queued()))
+    return samples
+
+
+registry.add_collector(_collect_admission_metrics)
+
+
+def count_error_result(prefix: str, labels: tuple, result) -> None:
+    """
+    Count a returned {"error": ...} result into <prefix>_errors_total, as "overloaded" for shed
+    calls and "error_result" otherwise; tools report most failures this way rather than raising.
+    """
+    if isinstance(result, dict) and "error" in result:
+        kind = "overloaded" if result.get("overloaded") else "error_result"
+        registry.inc(f"{prefix}_errors_total", labels + (("type", kind),))
+
+
+@contextmanager
+def track(prefix: str, labels: tuple):
+    """
+    Time the enclosed block into <prefix>_duration_seconds, keep <prefix>_inflight up to date
+    and count exceptions into <prefix>_errors_total by exception type (see count_error_result
+    for failures that are returned).
+    """
+    registry.add(f"{prefix}_inflight", labels)
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        registry.inc(f"{prefix}_errors_total", labels + (("type", type(e).__name__),))
+        raise
+    finally:
+        registry.observe(f"{prefix}_duration_seconds", labels, time.perf_counter() - start)
+        registry.add(f"{prefix}_inflight", labels, -1)
+
+
+class InstrumentedFastMCP(FastMCP):
+    """
+    FastMCP server that records latency, in-flight calls and errors for every tool, and
+    exposes the metrics as the get_metrics tool, the metrics://prometheus resource and,
+    when served over HTTP, a Prometheus scrape endpoint at /metrics.
+    Every tool call runs under a deadline of TRAIN_MCP_TOOL_DEADLINE seconds, which
+    the upstream calls it makes inherit, and is admitted through its tool's concurrency
+    limit and bounded queue (admission.py); calls that are shed get an "overloaded" result.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.add_tool(self.get_metrics, name="get_metrics")
+        self.resource("metrics://prometheus", mime_type="text/plain")(registry.render_prometheus)
+        self.custom_route("/metrics", methods=["GET"])(self.metrics_endpoint)
+
+    async def call_tool(self, name: str, arguments: dict):
+        tool = self._tool_manager.get_tool(name)
+        labels = (("tool", name),)
+        with deadlines.deadline(deadlines.TOOL_DEADLINE), track("train_mcp_tool", labels):
+            if tool is None:
+                return await super().call_tool(name, arguments)
+            queued_at = time.perf_counter()
+            try:
+                async with admission.gate_for(name).admit():
+                    registry.observe("train_mcp_tool_queue_seconds", labels, time.perf_counter() - queued_at)
+                    # Converted here rather than by FastMCP, so that returned errors can be counted
+                    result = await self._tool_manager.call_tool(name, arguments, context=self.get_context(),
+                                                                convert_result=False)
+            except admission.Overloaded as e:
+                result = e.result()
+            count_error_result("train_mcp_tool", labels, result)
+            return tool.fn_metadata.convert_result(result)
+
+    @staticmethod
+    async def get_metrics() -> dict:
+        """
+        Get server metrics: per-tool and per-upstream-endpoint latency (count, mean, p50/p95/p99),
+        in-flight calls, error counts by type, and response cache hits and misses.
+        """
+        return registry.snapshot()
+
+    @staticmethod
+    async def metrics_endpoint(request):
+        from starlette.responses import PlainTextResponse
+
+        return PlainTextResponse(registry.render_prometheus(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,79 @@
+import os
+import heapq
+import asyncio
+import logging
+
+logger = logging.getLogger("train-mcp")
+
+# Keep the PREFETCH_TOP_N most requested live keys warm, checking every PREFETCH_INTERVAL seconds
+PREFETCH_TOP_N = int(os.getenv("TRAIN_MCP_PREFETCH_TOP_N", "20"))
+PREFETCH_INTERVAL = float(os.getenv("TRAIN_MCP_PREFETCH_INTERVAL", "15"))
+HOT_KEYS_MAX = 1024
+# Request counts are multiplied by this every interval, so popularity follows recent traffic
+DECAY = 0.5
+MIN_SCORE = 0.1
+
+
+class HotKeys:
+    """
+    Decaying request counts per cache key, remembering how to refetch each key.
+    """
+
+    def __init__(self, max_keys: int = HOT_KEYS_MAX):
+        self.max_keys = max_keys
+        self.scores = {}
+        self.requests = {}  # key -> (url, params, headers, endpoint)
+
+    def __len__(self) -> int:
+        return len(self.scores)
+
+    def touch(self, key: str, request: tuple) -> None:
+        self.scores[key] = self.scores.get(key, 0.0) + 1.0
+        self.requests[key] = request
+        if len(self.scores) > 2 * self.max_keys:
+            self._trim(self.max_keys)
+
+    def top(self, n: int) -> list:
+        """
+        The n hottest keys as (key, request) pairs, hottest first.
+        """
+        keys = heapq.nlargest(n, self.scores, key=self.scores.get)
+        return [(key, self.requests[key]) for key in keys]
+
+    def decay(self) -> None:
+        for key in list(self.scores):
+            score = self.scores[key] * DECAY
+            if score < MIN_SCORE:
+                del self.scores[key]
+                del self.requests[key]
+            else:
+                self.scores[key] = score
+
+    def _trim(self, size: int) -> None:
+        keep = set(heapq.nlargest(size, self.scores, key=self.scores.get))
+        for key in [key for key in self.scores if key not in keep]:
+            del self.scores[key]
+            del self.requests[key]
+
+
+async def run_prefetcher(hot_keys: HotKeys, expires_in, refresh,
+                         interval: float = PREFETCH_INTERVAL, top_n: int = PREFETCH_TOP_N) -> None:
+    """
+    Every interval, refresh the top_n hottest keys whose cached response is missing or
+    would expire before the next pass, then decay the request counts.
+    expires_in(key, request) returns seconds until key expires (None when not cached);
+    refresh(key, request) is a coroutine that refetches and stores one key.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        due = []
+        for key, request in hot_keys.top(top_n):
+            remaining = expires_in(key, request)
+            if remaining is None or remaining < interval:
+                due.append(refresh(key, request))
+        if due:
+            results = await asyncio.gather(*due, return_exceptions=True)
+            for result in results:
+                if isinstance(result, Exception):
+                    logger.warning(f"Prefetch failed: {result}")
+        hot_keys.decay()
@@ -0,0 +1,238 @@
+import os
+import time
+import asyncio
+import datetime
+import logging
+
+import endpoints
+from latency import LatencyWindow
+from records import parse_board, parse_fares, parse_trains, pick, to_dict, unwrap
+from timetable import format_time, parse_schedule
+from upstream import fetch_data
+
+logger = logging.getLogger("train-mcp")
+
+# Hedging: a second provider is asked once the first has been slower than this percentile of its recent latencies
+HEDGE_PERCENTILE = float(os.getenv("TRAIN_MCP_HEDGE_PERCENTILE", "95"))
+HEDGE_MIN_SAMPLES = 20
+HEDGE_DEFAULT_DELAY = float(os.getenv("TRAIN_MCP_HEDGE_DEFAULT_DELAY", "3.0"))
+HEDGE_MIN_DELAY = 0.05
+FAILURE_PENALTY_SECONDS = 60
+
+
+def normalise_schedule(data, args: dict) -> dict:
+    schedule = parse_schedule(args["train_number"], data)
+    if schedule is None:
+        return None
+    return {
+        "train_number": schedule["number"],
+        "train_name": schedule["name"],
+        "stops": [
+            {"station_code": code, "arrival": format_time(arrival), "departure": format_time(departure)}
+            for code, arrival, departure in schedule["stops"]
+        ],
+    }
+
+
+def normalise_live_train_status(data, args: dict) -> dict:
+    body = unwrap(data)
+    current = pick(body, "CurrentStation") or {}
+    return {
+        "train_number": str(pick(body, "TrainNumber", "train_number") or args["train_number"]),
+        "current_station_code": pick(current, "StationCode") or pick(body, "current_station_code"),
+        "current_station_name": pick(current, "StationName") or pick(body, "current_station_name"),
+        "delay_minutes": pick(current, "DelayInArrival", "DelayInDeparture") or pick(body, "delay"),
+        "status": pick(body, "Position", "status", "new_message"),
+        "updated_at": pick(body, "LastUpdated", "status_as_of", "updated_time"),
+    }
+
+
+def normalise_live_station(data, args: dict) -> dict:
+    return {"station_code": args["station_code"], "trains": [to_dict(record) for record in parse_board(data)]}
+
+
+def normalise_fare(data, args: dict) -> dict:
+    return {
+        "train_number": args["train_number"],
+        "from": args["from_station"],
+        "to": args["to_station"],
+        "fares": [to_dict(record) for record in parse_fares(data)],
+    }
+
+
+def normalise_trains_between(data, args: dict) -> dict:
+    return {
+        "from": args["from_station"],
+        "to": args["to_station"],
+        "trains": [to_dict(record) for record in parse_trains(data)],
+    }
+
+
+NORMALISERS = {
+    "train_schedule": normalise_schedule,
+    "live_train_status": normalise_live_train_status,
+    "live_station": normalise_live_station,
+    "fare": normalise_fare,
+    "trains_between": normalise_trains_between,
+}
+
+
+def _days_ago(date: str) -> int:
+    journey = datetime.datetime.strptime(date, "%Y%m%d").date()
+    return max(0, min(4, (datetime.date.today() - journey).days))
+
+
+def _indian_rail_request(operation: str, args: dict):
+    base = f"{endpoints.INDIAN_RAIL_BASE_URL}/{{}}/apikey/{endpoints.INDIAN_RAIL_API_KEY}"
+    if operation == "train_schedule":
+        return base.format("TrainSchedule") + f"/TrainNumber/{args['train_number']}", None, "TrainSchedule"
+    if operation == "live_train_status":
+        return base.format("livetrainstatus") + f"/trainnumber/{args['train_number']}/date/{args['date']}", None, "livetrainstatus"
+    if operation == "live_station":
+        return base.format("LiveStation") + f"/StationCode/{args['station_code']}/hours/{args['hours']}", None, "LiveStation"
+    if operation == "fare":
+        path = f"/TrainNumber/{args['train_number']}/From/{args['from_station']}/To/{args['to_station']}/Quota/{args['quota']}"
+        return base.format("TrainFare") + path, None, "TrainFare"
+    if operation == "trains_between":
+        return base.format("TrainBetweenStation") + f"/From/{args['from_station']}/To/{args['to_station']}", None, "TrainBetweenStation"
+    return None
+
+
+def _rapidapi_request(operation: str, args: dict):
+    if operation == "train_schedule":
+        return f"{endpoints.RAPIDAPI_BASE_URL}/api/v1/getTrainSchedule", {"trainNo": args["train_number"]}, "getTrainSchedule"
+    if operation == "live_train_status":
+        params = {"trainNo": args["train_number"], "startDay": _days_ago(args["date"])}
+        return f"{endpoints.RAPIDAPI_BASE_URL}/api/v1/liveTrainStatus", params, "liveTrainStatus"
+    if operation == "live_station":
+        params = {"fromStationCode": args["station_code"], "hours": args["hours"]}
+        return f"{endpoints.RAPIDAPI_BASE_URL}/api/v3/getLiveStation", params, "getLiveStation"
+    if operation == "fare":
+        params = {"trainNo": args["train_number"], "fromStationCode": args["from_station"], "toStationCode": args["to_station"]}
+        return f"{endpoints.RAPIDAPI_BASE_URL}/api/v2/getFare", params, "getFare"
+    if operation == "trains_between" and args.get("date"):
+        params = {"fromStationCode": args["from_station"], "toStationCode": args["to_station"], "dateOfJourney": args["date"]}
+        return f"{endpoints.RAPIDAPI_BASE_URL}/api/v3/trainBetweenStations", params, "trainBetweenStations"
+    return None
+
+
+class Provider:
+    """
+    One upstream rail data provider: how to build requests for each logical operation,
+    how to recognise a failed response, and its recent latency per operation.
+    """
+
+    def __init__(self, name: str, build_request, api_key, headers=None):
+        self.name = name
+        self.build_request = build_request
+        self.api_key = api_key
+        self.headers = headers or (lambda: None)
+        self.windows = {}
+
+    def enabled(self) -> bool:
+        return bool(self.api_key())
+
+    def window(self, operation: str) -> LatencyWindow:
+        if operation not in self.windows:
+            self.windows[operation] = LatencyWindow()
+        return self.windows[operation]
+
+    def hedge_delay(self, operation: str) -> float:
+        window = self.window(operation)
+        if len(window) < HEDGE_MIN_SAMPLES:
+            return HEDGE_DEFAULT_DELAY
+        return max(HEDGE_MIN_DELAY, window.percentile(HEDGE_PERCENTILE))
+
+    def rank(self, operation: str) -> tuple:
+        """
+        Sort key: providers that failed recently go last, then the fastest median wins.
+        """
+        window = self.window(operation)
+        recently_failed = time.monotonic() - window.last_failure < FAILURE_PENALTY_SECONDS if window.failures else False
+        return (recently_failed, window.percentile(50, HEDGE_DEFAULT_DELAY))
+
+    @staticmethod
+    def succeeded(data) -> bool:
+        if not isinstance(data, dict) or "error" in data:
+            return False
+        if "ResponseCode" in data and str(data["ResponseCode"]) != "200":
+            return False
+        return data.get("status", True) not in (False, "false")
+
+
+PROVIDERS = [
+    Provider("indianrail", _indian_rail_request, api_key=lambda: endpoints.INDIAN_RAIL_API_KEY),
+    Provider(
+        "rapidapi",
+        _rapidapi_request,
+        api_key=lambda: endpoints.RAPIDAPI_KEY,
+        headers=lambda: {"X-RapidAPI-Key": endpoints.RAPIDAPI_KEY, "X-RapidAPI-Host": endpoints.RAPIDAPI_HOST},
+    ),
+]
+
+
+def providers_for(operation: str, args: dict) -> list:
+    """
+    Enabled providers able to serve an operation with the given arguments, best first.
+    """
+    candidates = []
+    for provider in PROVIDERS:
+        try:
+            if provider.enabled() and provider.build_request(operation, args) is not None:
+                candidates.append(provider)
+        except (KeyError, ValueError) as e:
+            logger.info(f"{provider.name} cannot serve {operation}: {e}")
+    return sorted(candidates, key=lambda provider: provider.rank(operation))
+
+
+async def _attempt(provider: Provider, operation: str, args: dict):
+    url, params, endpoint = provider.build_request(operation, args)
+    start = time.perf_counter()
+    # A cancelled attempt (the loser of a hedge race) raises here and records no latency sample
+    data = await fetch_data(url, params=params, headers=provider.headers(), endpoint=endpoint)
+    ok = provider.succeeded(data)
+    provider.window(operation).record(time.perf_counter() - start, ok)
+    return provider, data, ok
+
+
+async def call(operation: str, **args) -> dict:
+    """
+    Run a logical operation against every provider that supports it.
+    The best-ranked provider is asked first; if it has not answered within its hedge delay
+    (a high percentile of its recent latency) the next provider is asked as well, and the
+    first successful answer wins. A failed answer moves on to the next provider at once.
+    The result says which provider answered, whether a hedge was sent and whether an
+    earlier provider failed.
+    """
+    candidates = providers_for(operation, args)
+    if not candidates:
+        return {"error": f"No configured provider supports {operation}"}
+    remaining = list(candidates)
+    pending = set()
+    errors = {}
+    hedged = False
+    done = set()
+    while remaining or pending:
+        if remaining and (not pending or not done):
+            provider = remaining.pop(0)
+            hedged = hedged or bool(pending)  # started while another provider is still running
+            pending.add(asyncio.ensure_future(_attempt(provider, operation, args)))
+            delay = provider.hedge_delay(operation)
+        done, pending = await asyncio.wait(
+            pending, timeout=delay if remaining else None, return_when=asyncio.FIRST_COMPLETED
+        )
+        for task in done:
+            provider, data, ok = task.result()
+            if ok:
+                for other in pending:
+                    other.cancel()
+                result = NORMALISERS[operation](data, args) or {"raw": data}
+                result["provider"] = provider.name
+                result["hedged"] = hedged
+                result["failed_over"] = bool(errors)
+                return result
+            if isinstance(data, dict):
+                errors[provider.name] = data.get("error") or data.get("message") or "unsuccessful response"
+            else:
+                errors[provider.name] = str(data)
+    return {"error": f"All providers failed for {operation}", "providers": errors}
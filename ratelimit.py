@@ -0,0 +1,291 @@
+import os
+import time
+import heapq
+import sqlite3
+import asyncio
+import itertools
+import threading
+import contextvars
+import email.utils
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+# Request priorities, lower runs first
+INTERACTIVE = 0
+NORMAL = 1
+BULK = 2
+
+# Endpoints a user is typically waiting on right now
+ENDPOINT_PRIORITIES = {
+    "getPNRStatus": INTERACTIVE,
+    "checkSeatAvailability": INTERACTIVE,
+}
+
+# Per-host token buckets as "host=rate:burst,...", rate in requests per second
+RATE_LIMITS = os.getenv("TRAIN_MCP_RATE_LIMITS", "indianrailapi.com=5:10,irctc1.p.rapidapi.com=5:5")
+QUEUE_DEADLINE = float(os.getenv("TRAIN_MCP_QUEUE_DEADLINE", "30"))
+MAX_RETRY_AFTER = float(os.getenv("TRAIN_MCP_MAX_RETRY_AFTER", "60"))
+# Optional SQLite file holding the token buckets, so that every process using the same file draws
+# on one budget per host (set for multi-worker HTTP deployments, see serving.py)
+RATE_LIMIT_PATH = os.getenv("TRAIN_MCP_RATE_LIMIT_PATH")
+
+_priority = contextvars.ContextVar("upstream_priority", default=None)
+
+
+class QueueDeadlineExceeded(Exception):
+    """
+    Raised when a request cannot get an upstream slot before its queueing deadline.
+    """
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"Rate limit queue for {name} is full, retry after {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+@contextmanager
+def priority(level: int):
+    """
+    Run the enclosed upstream calls (and tasks started inside the block) at the given priority.
+    """
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def explicit_priority():
+    """
+    The priority set by an enclosing priority() block, or None.
+    """
+    return _priority.get()
+
+
+def current_priority(endpoint: str = None) -> int:
+    level = _priority.get()
+    if level is not None:
+        return level
+    return ENDPOINT_PRIORITIES.get(endpoint, NORMAL)
+
+
+def parse_retry_after(value):
+    """
+    Seconds to wait from a Retry-After header (delta-seconds or HTTP date), or None.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+class TokenBucket:
+    """
+    Token bucket local to this process.
+    """
+
+    shared = False
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+
+    def delay(self, ahead: int = 0) -> float:
+        """
+        Seconds until a caller with `ahead` callers in front of it could take a token.
+        """
+        now = time.monotonic()
+        self._refill(now)
+        return self._wait(self._tokens, self._blocked_until, now, ahead)
+
+    def take(self) -> float:
+        """
+        Take a token and return 0, or return the seconds until one is available.
+        """
+        delay = self.delay()
+        if delay <= 0:
+            self._tokens -= 1
+        return delay
+
+    def block_for(self, seconds: float) -> None:
+        now = time.monotonic()
+        self._refill(now)
+        self._tokens = min(self._tokens, 0.0)
+        self._blocked_until = max(self._blocked_until, now + seconds)
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _wait(self, tokens: float, blocked_until: float, now: float, ahead: int) -> float:
+        missing = ahead + 1 - tokens
+        delay = missing / self.rate if missing > 0 else 0.0
+        return max(delay, blocked_until - now)
+
+
+class SharedTokenBucket(TokenBucket):
+    """
+    Token bucket kept in a SQLite file and updated in short write transactions, so that
+    several server processes share one budget. Times are wall-clock seconds. Its methods
+    can wait on another process's write lock, so RateLimiter calls them off the event loop.
+    """
+
+    shared = True
+
+    def __init__(self, path: str, name: str, rate: float, burst: float):
+        super().__init__(rate, burst)
+        self.name = name
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=5.0, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS buckets (name TEXT PRIMARY KEY, tokens REAL, updated REAL, blocked_until REAL)"
+        )
+        self._conn.execute("INSERT OR IGNORE INTO buckets VALUES (?, ?, ?, 0)", (name, burst, time.time()))
+
+    def delay(self, ahead: int = 0) -> float:
+        with self._lock:
+            tokens, updated, blocked_until = self._conn.execute(
+                "SELECT tokens, updated, blocked_until FROM buckets WHERE name = ?", (self.name,)
+            ).fetchone()
+        now = time.time()
+        tokens = min(self.burst, tokens + max(0.0, now - updated) * self.rate)
+        return self._wait(tokens, blocked_until, now, ahead)
+
+    def take(self) -> float:
+        return self._update(take=True)
+
+    def block_for(self, seconds: float) -> None:
+        self._update(block=seconds)
+
+    def _update(self, take: bool = False, block: float = 0.0) -> float:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                tokens, updated, blocked_until = self._conn.execute(
+                    "SELECT tokens, updated, blocked_until FROM buckets WHERE name = ?", (self.name,)
+                ).fetchone()
+                now = time.time()
+                tokens = min(self.burst, tokens + max(0.0, now - updated) * self.rate)
+                if block:
+                    tokens = min(tokens, 0.0)
+                    blocked_until = max(blocked_until, now + block)
+                delay = self._wait(tokens, blocked_until, now, 0)
+                if take and delay <= 0:
+                    tokens -= 1
+                self._conn.execute(
+                    "UPDATE buckets SET tokens = ?, updated = ?, blocked_until = ? WHERE name = ?",
+                    (tokens, now, blocked_until, self.name),
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return delay
+
+
+class RateLimiter:
+    """
+    Token bucket with a priority queue in front of it.
+    Waiters are served strictly by (priority, arrival order); a waiter that cannot be
+    served before its deadline is rejected up front instead of spending quota late.
+    The queue is per process; the bucket may be shared between processes (SharedTokenBucket).
+    """
+
+    def __init__(self, name: str, rate: float, burst: float, bucket: TokenBucket = None):
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+        self.bucket = bucket if bucket is not None else TokenBucket(rate, burst)
+        self.granted = 0
+        self.rejected = 0
+        self._waiters = []  # heap of [priority, seq, event]
+        self._seq = itertools.count()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"train-mcp-{name}") if self.bucket.shared else None
+
+    async def _bucket(self, method, *args):
+        """
+        Run a bucket method, on the limiter's own thread when the bucket is shared between processes.
+        """
+        if self._executor is None:
+            return method(*args)
+        return await asyncio.get_running_loop().run_in_executor(self._executor, method, *args)
+
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    async def block_for(self, seconds: float) -> None:
+        """
+        Stop granting tokens for `seconds`, e.g. after a 429 with Retry-After.
+        """
+        await self._bucket(self.bucket.block_for, seconds)
+
+    async def acquire(self, level: int = NORMAL, deadline: float = None) -> None:
+        """
+        Wait for a token. deadline is a time.monotonic() value.
+        """
+        now = time.monotonic()
+        ahead = sum(1 for waiter in self._waiters if waiter[0] <= level)
+        expected = await self._bucket(self.bucket.delay, ahead)
+        if deadline is not None and now + expected > deadline:
+            self.rejected += 1
+            raise QueueDeadlineExceeded(self.name, expected)
+        entry = [level, next(self._seq), asyncio.Event()]
+        heapq.heappush(self._waiters, entry)
+        try:
+            while True:
+                delay = None
+                if self._waiters[0] is entry:
+                    delay = await self._bucket(self.bucket.take)
+                    if delay <= 0:
+                        self.granted += 1
+                        return
+                now = time.monotonic()
+                if deadline is not None:
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        self.rejected += 1
+                        raise QueueDeadlineExceeded(self.name, await self._bucket(self.bucket.delay, len(self._waiters) - 1))
+                    delay = remaining if delay is None else min(delay, remaining)
+                entry[2].clear()
+                try:
+                    await asyncio.wait_for(entry[2].wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self._waiters.remove(entry)
+            heapq.heapify(self._waiters)
+            if self._waiters:
+                self._waiters[0][2].set()
+
+
+def _parse_limits(spec: str) -> dict:
+    limiters = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        host, _, numbers = item.partition("=")
+        rate, _, burst = numbers.partition(":")
+        name, rate, burst = host.strip(), float(rate), float(burst or rate)
+        bucket = SharedTokenBucket(RATE_LIMIT_PATH, name, rate, burst) if RATE_LIMIT_PATH else None
+        limiters[name.lower()] = RateLimiter(name, rate, burst, bucket)
+    return limiters
+
+
+limiters = _parse_limits(RATE_LIMITS)
+
+
+def limiter_for(url: str):
+    """
+    The limiter for the host of url, or None when that host is not rate limited.
+    """
+    return limiters.get((urlsplit(url).hostname or "").lower())
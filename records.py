@@ -0,0 +1,276 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+
+
+@dataclass(slots=True)
+class StationRecord:
+    code: str
+    name: str = None
+    state: str = None
+
+
+@dataclass(slots=True)
+class StopRecord:
+    station_code: str
+    station_name: str = None
+    arrival: str = None
+    departure: str = None
+    day: int = None
+    distance: str = None
+    platform: str = None
+
+
+@dataclass(slots=True)
+class TrainRecord:
+    train_number: str
+    train_name: str = None
+    from_station: str = None
+    to_station: str = None
+    departure: str = None
+    arrival: str = None
+    duration: str = None
+    running_days: str = None
+
+
+@dataclass(slots=True)
+class BoardRecord:
+    train_number: str
+    train_name: str = None
+    source: str = None
+    destination: str = None
+    arrival: str = None
+    departure: str = None
+    expected_arrival: str = None
+    expected_departure: str = None
+    delay: str = None
+    platform: str = None
+
+
+@dataclass(slots=True)
+class FareRecord:
+    class_code: str
+    fare: str = None
+    quota: str = None
+
+
+@dataclass(slots=True)
+class AvailabilityRecord:
+    date: str
+    status: str = None
+    class_code: str = None
+    quota: str = None
+
+
+def pick(record, *fields):
+    """
+    First non-empty value among `fields` of a response record.
+    """
+    if not isinstance(record, dict):
+        return None
+    for field in fields:
+        value = record.get(field)
+        if value not in (None, ""):
+            return value
+    return None
+
+
+def _text(value):
+    return None if value is None else str(value)
+
+
+def unwrap(data):
+    """
+    RapidAPI wraps payloads in {"status", "message", "data"}; indianrailapi.com returns them at the top level.
+    """
+    return data.get("data", data) if isinstance(data, dict) else data
+
+
+def _lists(data, *fields) -> list:
+    """
+    The records of a response: the body itself when it is a list, otherwise every list under `fields`.
+    """
+    body = unwrap(data)
+    if isinstance(body, list):
+        return body
+    found = []
+    for field in fields:
+        value = body.get(field) if isinstance(body, dict) else None
+        if isinstance(value, list):
+            found.extend(value)
+    return found
+
+
+def parse_stations(data) -> list:
+    records = []
+    for item in _lists(data, "Stations", "stations"):
+        code = pick(item, "code", "StationCode", "station_code")
+        if code:
+            records.append(StationRecord(
+                code=str(code),
+                name=_text(pick(item, "name", "eng_name", "StationName", "NameEn")),
+                state=_text(pick(item, "state_name", "State")),
+            ))
+    return records
+
+
+def parse_stops(data) -> list:
+    body = unwrap(data)
+    route = pick(body, "Route", "route", "stations") if isinstance(body, dict) else body
+    records = []
+    for item in route if isinstance(route, list) else []:
+        code = pick(item, "StationCode", "station_code", "stationCode")
+        if code:
+            day = pick(item, "Day", "day")
+            records.append(StopRecord(
+                station_code=str(code),
+                station_name=_text(pick(item, "StationName", "station_name", "stationName")),
+                arrival=_text(pick(item, "ArrivalTime", "sta", "arrivalTime")),
+                departure=_text(pick(item, "DepartureTime", "std", "departureTime")),
+                day=int(day) if str(day).isdigit() else None,
+                distance=_text(pick(item, "Distance", "distance_from_source", "distance")),
+                platform=_text(pick(item, "Platform", "platform_number")),
+            ))
+    return records
+
+
+def parse_trains(data) -> list:
+    records = []
+    for item in _lists(data, "Trains", "trains"):
+        number = pick(item, "TrainNo", "TrainNumber", "train_number", "trainNumber", "train_no")
+        if number:
+            records.append(TrainRecord(
+                train_number=str(number),
+                train_name=_text(pick(item, "TrainName", "train_name", "trainName")),
+                from_station=_text(pick(item, "Source", "from", "from_station_code", "source_stn_code")),
+                to_station=_text(pick(item, "Destination", "to", "to_station_code", "dstn_stn_code")),
+                departure=_text(pick(item, "DepartureTime", "from_std", "departureTime", "departure_time")),
+                arrival=_text(pick(item, "ArrivalTime", "to_sta", "arrivalTime", "arrival_time")),
+                duration=_text(pick(item, "TravelTime", "duration")),
+                running_days=_text(pick(item, "RunningDays", "run_days", "running_days")),
+            ))
+    return records
+
+
+def parse_board(data) -> list:
+    records = []
+    for item in _lists(data, "Trains", "trains", "passing", "originating", "destinating"):
+        number = pick(item, "TrainNo", "TrainNumber", "trainNumber", "train_number", "train_no")
+        if number:
+            records.append(BoardRecord(
+                train_number=str(number),
+                train_name=_text(pick(item, "TrainName", "trainName", "train_name")),
+                source=_text(pick(item, "Source", "TrainSource", "source_stn_code", "sourceStationCode")),
+                destination=_text(pick(item, "Destination", "TrainDestination", "dstn_stn_code", "destinationStationCode")),
+                arrival=_text(pick(item, "ArrivalTime", "ScheduleArrival", "arrival_time", "scheduledArrival")),
+                departure=_text(pick(item, "DepartureTime", "ScheduleDeparture", "departure_time", "scheduledDeparture")),
+                expected_arrival=_text(pick(item, "ExpectedArrival", "expectedArrival", "eta")),
+                expected_departure=_text(pick(item, "ExpectedDeparture", "expectedDeparture", "etd")),
+                delay=_text(pick(item, "DelayInArrival", "DelayInDeparture", "delayInArrival", "delay")),
+                platform=_text(pick(item, "Platform", "platform", "platform_number")),
+            ))
+    return records
+
+
+def parse_fares(data) -> list:
+    records = []
+    for item in _lists(data, "Fares", "fares"):
+        code = pick(item, "Code", "classType", "class")
+        if code:
+            records.append(FareRecord(class_code=str(code), fare=_text(pick(item, "Fare", "fare", "total"))))
+    body = unwrap(data)
+    if not records and isinstance(body, dict):
+        # RapidAPI keys fares by quota, e.g. {"general": [...], "tatkal": [...]}
+        for quota, entries in body.items():
+            for item in entries if isinstance(entries, list) else []:
+                code = pick(item, "classType", "Code")
+                if code:
+                    records.append(FareRecord(class_code=str(code), fare=_text(pick(item, "fare", "Fare", "total")), quota=quota))
+    return records
+
+
+def parse_availability(data) -> list:
+    records = []
+    for item in _lists(data, "availability", "avlDayList"):
+        date = pick(item, "date", "availablityDate", "availabilityDate")
+        if date:
+            records.append(AvailabilityRecord(
+                date=str(date),
+                status=_text(pick(item, "status", "current_status", "availablityStatus", "availabilityStatus")),
+                class_code=_text(pick(item, "class_type", "classType")),
+                quota=_text(pick(item, "quota")),
+            ))
+    return records
+
+
+RECORD_PARSERS = {
+    "searchStation": (parse_stations, StationRecord),
+    "TrainSchedule": (parse_stops, StopRecord),
+    "getTrainSchedule": (parse_stops, StopRecord),
+    "TrainBetweenStation": (parse_trains, TrainRecord),
+    "trainBetweenStations": (parse_trains, TrainRecord),
+    "searchTrain": (parse_trains, TrainRecord),
+    "AllTrainOnStation": (parse_board, BoardRecord),
+    "getTrainsByStation": (parse_board, BoardRecord),
+    "LiveStation": (parse_board, BoardRecord),
+    "getLiveStation": (parse_board, BoardRecord),
+    "TrainFare": (parse_fares, FareRecord),
+    "getFare": (parse_fares, FareRecord),
+    "checkSeatAvailability": (parse_availability, AvailabilityRecord),
+}
+
+# Parsed records keyed by the identity of the (cached, read-only) response they came from
+_PARSED_MAX = 256
+_parsed = OrderedDict()
+
+
+def parse(endpoint: str, data) -> list:
+    """
+    Typed records for an upstream response, parsed once per cached response object.
+    """
+    key = (endpoint, id(data))
+    entry = _parsed.get(key)
+    if entry is not None and entry[0] is data:
+        _parsed.move_to_end(key)
+        return entry[1]
+    records = RECORD_PARSERS[endpoint][0](data)
+    _parsed[key] = (data, records)
+    if len(_parsed) > _PARSED_MAX:
+        _parsed.popitem(last=False)
+    return records
+
+
+def to_dict(record, fields=None) -> dict:
+    """
+    Compact dict for a record: only the requested fields, and no empty values.
+    """
+    result = {}
+    for field in fields or record.__slots__:
+        value = getattr(record, field)
+        if value is not None:
+            result[field] = value
+    return result
+
+
+def shape_response(endpoint: str, data, fields: list = None, limit: int = None, offset: int = 0):
+    """
+    Return the upstream response unchanged, or, when a projection or page is requested,
+    a compact page of typed records: {"total", "offset", "count", "items"}.
+    """
+    if fields is None and limit is None and not offset:
+        return data
+    if not isinstance(data, (dict, list)) or (isinstance(data, dict) and "error" in data):
+        return data
+    if fields:
+        valid = RECORD_PARSERS[endpoint][1].__slots__
+        unknown = [field for field in fields if field not in valid]
+        if unknown:
+            return {"error": f"Unknown fields {unknown}", "valid_fields": list(valid)}
+    records = parse(endpoint, data)
+    offset = max(0, offset or 0)
+    page = records[offset:offset + limit] if limit is not None else records[offset:]
+    return {
+        "total": len(records),
+        "offset": offset,
+        "count": len(page),
+        "items": [to_dict(record, fields) for record in page],
+    }
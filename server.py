@@ -0,0 +1,174 @@
+"""
+MCP server for the Indian Rail API (indianrailapi.com), shared by the freeTrainMCp and
+trainClaude entry points. Plain upstream tools are generated from the endpoint table in
+endpoints.py; the tools below add local answers, batching, tracking and planning.
+"""
+import logging
+
+from dotenv import load_dotenv
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("train-mcp")
+
+# Provider settings are read when endpoints and upstream are imported
+load_dotenv()
+
+import endpoints
+from batch import gather_bounded
+from boards import trains_through_station
+from metrics import InstrumentedFastMCP
+from providers import normalise_live_train_status
+from stations import learn_from_response, load_index, local_station_code, station_suggestions
+from store import import_reference_data, preload
+from timetable import plan_journey as plan_journey_locally
+from tracker import Tracker
+from upstream import add_background_worker, add_response_listener, lifespan, upstream_stats
+
+# Initialize the MCP server
+mcp = InstrumentedFastMCP("IRCTC MCP Server", lifespan=lifespan)
+add_response_listener(learn_from_response)
+add_background_worker(preload)
+
+@mcp.tool()
+async def station_name_to_code(station_name: str) -> dict:
+    """
+    Convert a station name to its code using Indian Rail API.
+    Known stations are answered from the local station index; the name is case-insensitive.
+    Parameters:
+        station_name: The name of the station (e.g., "ERODE JN").
+    """
+    await load_index()
+    local = local_station_code(station_name)
+    if local is not None:
+        return local
+    data = await endpoints.call("StationNameToCode", {"station_name": station_name})
+    if "error" in data:
+        data = {**data, "suggestions": station_suggestions(station_name)}
+    return data
+
+@mcp.tool()
+async def find_station(query: str, limit: int = 10) -> dict:
+    """
+    Search stations by code or name without calling the upstream API.
+    Matches exact codes and names, name prefixes and misspelled names.
+    Parameters:
+        query: Station code or (partial, possibly misspelled) name (e.g., "erod jn").
+        limit: Maximum number of matches to return (e.g., 10).
+    """
+    await load_index()
+    return {"query": query, "matches": station_suggestions(query, limit)}
+
+tools = endpoints.register(
+    mcp, "TrainSchedule", "AllTrainOnStation", "LiveStation", "livetrainstatus",
+    "TrainFare", "TrainInformation", "TrainBetweenStation",
+)
+get_train_schedule_indian_rail = tools["get_train_schedule_indian_rail"]
+get_live_train_status = tools["get_live_train_status"]
+get_train_information = tools["get_train_information"]
+get_all_trains_on_station = tools["get_all_trains_on_station"]
+
+@mcp.tool()
+async def get_live_train_status_batch(train_numbers: list[str], date: str, concurrency: int = None) -> dict:
+    """
+    Get live status of several trains in one call, fetched concurrently.
+    Parameters:
+        train_numbers: Train numbers (e.g., ["12951", "19038"]).
+        date: Date of journey in yyyymmdd format.
+        concurrency: (Optional) Maximum number of upstream requests in flight.
+    """
+    return await gather_bounded(train_numbers, lambda train_number: get_live_train_status(train_number, date), concurrency)
+
+@mcp.tool()
+async def get_train_information_batch(train_numbers: list[str], concurrency: int = None) -> dict:
+    """
+    Get detailed information about several trains in one call, fetched concurrently.
+    Parameters:
+        train_numbers: Train numbers (e.g., ["12951", "19038"]).
+        concurrency: (Optional) Maximum number of upstream requests in flight.
+    """
+    return await gather_bounded(train_numbers, get_train_information, concurrency)
+
+async def _poll_live_status(train_number: str, date: str) -> dict:
+    data = await get_live_train_status(train_number, date)
+    if "error" in data:
+        return data
+    return normalise_live_train_status(data, {"train_number": train_number})
+
+tracker = Tracker(_poll_live_status, get_train_schedule_indian_rail)
+add_background_worker(tracker.run)
+
+@mcp.tool()
+async def track_train(train_number: str, date: str, stop: bool = False) -> dict:
+    """
+    Start tracking a running train and get its current position and expected arrival times, or stop
+    tracking it. Its position and delay are then polled in the background, more often while they change;
+    read what changed with get_train_updates, passing the returned cursor.
+    Parameters:
+        train_number: The train number (e.g., "19038").
+        date: Date the train started its run in yyyymmdd format.
+        stop: (Optional) Stop tracking the train instead (e.g., false).
+    """
+    return await tracker.track(train_number, date, stop)
+
+@mcp.tool()
+async def get_train_updates(train_number: str, date: str, cursor: int = 0, eta_stops: int = 5) -> dict:
+    """
+    Get what changed for a tracked train since the last call, plus expected arrival times at the next
+    stations (only when something changed). Starts tracking the train if it is not tracked yet.
+    Parameters:
+        train_number: The train number (e.g., "19038").
+        date: Date the train started its run in yyyymmdd format.
+        cursor: (Optional) The cursor returned by the previous call; 0 returns the whole history.
+        eta_stops: (Optional) Number of upcoming stations to estimate arrival times for (e.g., 5).
+    """
+    return await tracker.updates(train_number, date, cursor, eta_stops)
+
+@mcp.tool()
+async def plan_journey(from_station: str, to_station: str, departure_time: str = "00:00", date: str = None, max_changes: int = 1) -> dict:
+    """
+    Plan journeys between two stations, including connections with changes of train.
+    Answered locally from the timetable built from train schedules fetched earlier,
+    returning the earliest arrival for each number of changes.
+    Parameters:
+        from_station: Source station code (e.g., "NDLS").
+        to_station: Destination station code (e.g., "BCT").
+        departure_time: Earliest departure time in HH:MM format (e.g., "18:00").
+        date: (Optional) Date of journey in yyyymmdd format, to honour running days.
+        max_changes: Maximum number of changes of train, at most 3 (e.g., 1).
+    """
+    return await plan_journey_locally(from_station, to_station, departure_time, date, max_changes)
+
+@mcp.tool()
+async def get_trains_through_station(station_code: str, from_time: str = "00:00", to_time: str = "23:59", day: str = None, limit: int = None) -> dict:
+    """
+    Get the trains calling at a station between two times, e.g. from 18:00 to 22:00 on a Friday.
+    Answered locally from known train schedules when they cover every train at the station,
+    otherwise from the station's upstream board.
+    Parameters:
+        station_code: The station code (e.g., "NDLS").
+        from_time: (Optional) Start of the window in HH:MM format (e.g., "18:00").
+        to_time: (Optional) End of the window in HH:MM format, inclusive; may be past midnight (e.g., "22:00").
+        day: (Optional) Date in yyyymmdd or yyyy-mm-dd format, or weekday name (e.g., "FRI"), to honour running days.
+        limit: (Optional) Maximum number of trains to return.
+    """
+    return await trains_through_station(get_all_trains_on_station, station_code, from_time, to_time, day, limit)
+
+@mcp.tool()
+async def import_timetable(train_numbers: list[str], concurrency: int = None) -> dict:
+    """
+    Fetch and store the Indian Rail API schedules of the given trains, so that schedule lookups,
+    station boards and local journey planning work without the network, also after the server restarts.
+    Parameters:
+        train_numbers: Trains whose schedules to fetch and store (e.g., ["12951", "19038"]).
+        concurrency: (Optional) Maximum number of upstream requests in flight.
+    """
+    return await import_reference_data(train_numbers, concurrency, get_train_schedule_indian_rail)
+
+@mcp.tool()
+async def get_upstream_stats() -> dict:
+    """
+    Get counters for the shared upstream path: calls coalesced into an in-flight
+    request, requests currently in flight, response cache size, rate limiters, and
+    per-endpoint circuit breaker state and adaptive timeout.
+    """
+    return upstream_stats()
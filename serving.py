@@ -0,0 +1,139 @@
+"""
+Run one of the MCP servers over stdio (as MCP clients spawn it) or as a streamable-HTTP service.
+
+    python serving.py --server trainMCP
+    python serving.py --server trainMCP --transport streamable-http --port 8000 --workers 4
+
+The server scripts accept the same options, e.g. python trainMCP.py --transport streamable-http.
+With more than one worker, uvicorn runs that many processes behind one port and requests are
+served statelessly, so any worker can answer any request. The workers share cached upstream
+responses and per-host rate limit budgets through SQLite files in TRAIN_MCP_STATE_DIR.
+Tracked trains (track_train) are still per worker. Clients reaching the service by a name other
+than the address it is bound to need that name in TRAIN_MCP_ALLOWED_HOSTS (e.g. "trains.example.com:*").
+"""
+import os
+import sys
+import logging
+import argparse
+import importlib
+from contextlib import asynccontextmanager
+
+logger = logging.getLogger("train-mcp")
+
+SERVERS = ("trainMCP", "freeTrainMCp", "trainClaude")
+ROOT = os.path.dirname(os.path.abspath(__file__))
+STATE_DIR = os.getenv("TRAIN_MCP_STATE_DIR") or os.path.join(os.path.expanduser("~"), ".cache", "train-mcp")
+LOOPBACK_HOSTS = ("127.0.0.1", "localhost", "::1")
+# Host headers (name or name:port, "name:*" for any port) and Origins accepted over HTTP, comma-separated.
+# DNS rebinding protection stays on: a service bound to a network address needs the names it is reached by here
+ALLOWED_HOSTS = os.getenv("TRAIN_MCP_ALLOWED_HOSTS", "")
+ALLOWED_ORIGINS = os.getenv("TRAIN_MCP_ALLOWED_ORIGINS", "")
+
+
+def http_app(mcp, stateless: bool = False):
+    """
+    The streamable-HTTP ASGI app for a server. The upstream pool and background workers
+    (prefetch, tracker) live as long as the app, not as long as one client session.
+    """
+    import upstream
+
+    mcp.settings.stateless_http = stateless
+    host = os.getenv("TRAIN_MCP_HOST", mcp.settings.host)
+    if host not in LOOPBACK_HOSTS or ALLOWED_HOSTS or ALLOWED_ORIGINS:
+        mcp.settings.transport_security = transport_security(host)
+    app = mcp.streamable_http_app()
+    sessions = app.router.lifespan_context
+
+    @asynccontextmanager
+    async def lifespan(app):
+        async with upstream.lifespan(mcp), sessions(app):
+            yield
+
+    app.router.lifespan_context = lifespan
+    return app
+
+
+def transport_security(host: str):
+    """
+    DNS rebinding protection for a server bound to host: the loopback names, the bound address
+    unless it is a wildcard, and TRAIN_MCP_ALLOWED_HOSTS / TRAIN_MCP_ALLOWED_ORIGINS.
+    """
+    from mcp.server.transport_security import TransportSecuritySettings
+
+    names = list(LOOPBACK_HOSTS)
+    if host not in ("0.0.0.0", "::", ""):
+        names.append(host)
+    hosts = [f"[{name}]:*" if ":" in name else f"{name}:*" for name in dict.fromkeys(names)]
+    hosts += [item.strip() for item in ALLOWED_HOSTS.split(",") if item.strip()]
+    origins = [f"http://{entry}" for entry in hosts]
+    origins += [item.strip() for item in ALLOWED_ORIGINS.split(",") if item.strip()]
+    if not ALLOWED_HOSTS and host in ("0.0.0.0", "::", ""):
+        logger.warning(f"Serving on {host} with only loopback Host headers allowed; set TRAIN_MCP_ALLOWED_HOSTS "
+                       "to the names clients use")
+    return TransportSecuritySettings(enable_dns_rebinding_protection=True, allowed_hosts=hosts, allowed_origins=origins)
+
+
+def create_app():
+    """
+    uvicorn factory for worker processes, serving the module named by TRAIN_MCP_SERVER.
+    """
+    module = importlib.import_module(os.environ["TRAIN_MCP_SERVER"])
+    return http_app(module.mcp, stateless=True)
+
+
+def parse_args(argv=None, server: str = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    if server is None:
+        parser.add_argument("--server", choices=SERVERS, default="trainMCP")
+    parser.add_argument("--transport", choices=("stdio", "streamable-http"), default=os.getenv("TRAIN_MCP_TRANSPORT", "stdio"))
+    parser.add_argument("--host", default=os.getenv("TRAIN_MCP_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("TRAIN_MCP_PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("TRAIN_MCP_WORKERS", "1")),
+                        help="worker processes for streamable-http")
+    args = parser.parse_args(argv)
+    if server is not None:
+        args.server = server
+    return args
+
+
+def share_state() -> None:
+    """
+    Point the response cache's disk tier and the rate limiters at files shared by every worker.
+    Read by cache and ratelimit at import, so this runs before the workers are started.
+    """
+    os.makedirs(STATE_DIR, exist_ok=True)
+    os.environ.setdefault("TRAIN_MCP_CACHE_PATH", os.path.join(STATE_DIR, "responses.sqlite3"))
+    os.environ.setdefault("TRAIN_MCP_RATE_LIMIT_PATH", os.path.join(STATE_DIR, "ratelimits.sqlite3"))
+
+
+def main(server: str = None, mcp=None, argv=None) -> None:
+    """
+    Serve according to the command line. The server scripts pass their module name and FastMCP instance.
+    """
+    args = parse_args(argv, server)
+    if args.transport == "streamable-http" and args.workers > 1:
+        if mcp is not None:
+            # Workers are spawned and would re-run the calling script as __mp_main__, registering
+            # every tool twice; start over from this small module instead
+            os.execv(sys.executable, [sys.executable, os.path.join(ROOT, "serving.py"), "--server", args.server,
+                                      *(sys.argv[1:] if argv is None else argv)])
+        import uvicorn
+
+        share_state()
+        os.environ["TRAIN_MCP_SERVER"] = args.server
+        os.environ["TRAIN_MCP_HOST"] = args.host
+        uvicorn.run("serving:create_app", factory=True, host=args.host, port=args.port, workers=args.workers)
+        return
+    if mcp is None:
+        mcp = importlib.import_module(args.server).mcp
+    if args.transport == "stdio":
+        mcp.run(transport="stdio")
+        return
+    import uvicorn
+
+    os.environ["TRAIN_MCP_HOST"] = args.host
+    uvicorn.run(http_app(mcp), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+import asyncio
+
+
+class SingleFlight:
+    """
+    Deduplicates identical concurrent async calls.
+    The first caller for a key starts the work; callers arriving while it is
+    in flight await the same task instead of starting their own.
+    """
+
+    def __init__(self):
+        self.coalesced = 0
+        self._inflight = {}
+
+    async def do(self, key: str, factory):
+        """
+        Run factory() for key, or join the call already in flight for key.
+        Cancelling one waiter does not cancel the shared call.
+        """
+        task = self._inflight.get(key)
+        if task is None or task.get_loop() is not asyncio.get_running_loop():
+            task = asyncio.ensure_future(factory())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def running(self, key: str) -> bool:
+        return key in self._inflight
+
+    def inflight(self) -> int:
+        return len(self._inflight)
+
+    def _forget(self, key: str, task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
@@ -0,0 +1,324 @@
+import os
+import re
+import csv
+import bisect
+import asyncio
+import logging
+import threading
+from collections import defaultdict
+
+import store
+
+logger = logging.getLogger("train-mcp")
+
+# Bundled seed list; point TRAIN_MCP_STATIONS_PATH at a refreshed export (code,name CSV) to replace it
+STATIONS_PATH = os.getenv(
+    "TRAIN_MCP_STATIONS_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "stations.csv"),
+)
+# Set when the station list is a full export, so that prefix and fuzzy searches can be answered locally
+STATIONS_COMPLETE = os.getenv("TRAIN_MCP_STATIONS_COMPLETE", "").lower() in ("1", "true", "yes")
+
+# (code field, name field) pairs that identify station records in upstream responses
+STATION_FIELDS = (
+    ("StationCode", "StationName"),
+    ("StationCode", "NameEn"),
+    ("station_code", "station_name"),
+    ("stationCode", "stationName"),
+    ("code", "name"),
+)
+
+# Fuzzy-only matches below this score are not trusted to answer search_station without upstream
+FUZZY_CONFIDENT_SCORE = 0.6
+
+_CODE_RE = re.compile(r"^[A-Z]{1,5}$")
+_WORD_ALIASES = {"JUNCTION": "JN", "CENTRAL": "CTL", "CNTL": "CTL", "CANTONMENT": "CANTT", "TERMINUS": "T"}
+
+
+def normalise_name(name: str) -> str:
+    """
+    Canonical form used for name lookups: upper case, no punctuation, common abbreviations applied.
+    """
+    words = re.sub(r"[^A-Z0-9 ]", " ", str(name).upper()).split()
+    return " ".join(_WORD_ALIASES.get(word, word) for word in words)
+
+
+def _trigrams(text: str) -> set:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class StationIndex:
+    """
+    In-memory station code <-> name index with prefix and typo-tolerant search.
+    Exact lookups are dict hits, prefix search uses a sorted key list and fuzzy
+    search ranks candidates by trigram overlap.
+    """
+
+    def __init__(self):
+        self.by_code = {}
+        self.by_name = {}
+        self._sorted_keys = []  # (search key, code), sorted for prefix search
+        self._grams = defaultdict(set)  # trigram -> codes
+        self._gram_counts = {}  # code -> number of trigrams in its name
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.by_code)
+
+    def add(self, code: str, name: str) -> bool:
+        """
+        Add or rename a station. Returns True when the index changed.
+        """
+        code = str(code).strip().upper()
+        display = " ".join(str(name).upper().split())
+        key = normalise_name(display)
+        if not _CODE_RE.match(code) or not key or self.by_code.get(code) == display:
+            return False
+        with self._lock:
+            old_name = self.by_code.get(code)
+            if old_name is not None:
+                self._unlink(code, old_name)
+            self.by_code[code] = display
+            self.by_name.setdefault(key, code)
+            bisect.insort(self._sorted_keys, (key, code))
+            bisect.insort(self._sorted_keys, (code, code))
+            grams = _trigrams(key)
+            for gram in grams:
+                self._grams[gram].add(code)
+            self._gram_counts[code] = len(grams)
+        return True
+
+    def load_csv(self, path: str) -> int:
+        """
+        Load stations from a code,name CSV file. Returns the number of stations added.
+        """
+        added = 0
+        with open(path, newline="", encoding="utf-8") as handle:
+            for row in csv.DictReader(handle):
+                added += self.add(row["code"], row["name"])
+        return added
+
+    def learn(self, data, added: list = None) -> int:
+        """
+        Walk an upstream response and add every station record found in it.
+        New or renamed stations are appended to `added` as (code, name) when it is given.
+        """
+        count = 0
+        stack = [data]
+        while stack:
+            item = stack.pop()
+            if isinstance(item, list):
+                stack.extend(item)
+            elif isinstance(item, dict):
+                for code_field, name_field in STATION_FIELDS:
+                    code, name = item.get(code_field), item.get(name_field)
+                    if isinstance(code, str) and isinstance(name, str):
+                        if self.add(code, name):
+                            count += 1
+                            if added is not None:
+                                added.append((code.strip().upper(), self.by_code[code.strip().upper()]))
+                        break
+                stack.extend(value for value in item.values() if isinstance(value, (dict, list)))
+        return count
+
+    def code_for(self, name: str):
+        """
+        Exact (normalised) name to code lookup, or None.
+        """
+        return self.by_name.get(normalise_name(name))
+
+    def name_for(self, code: str):
+        """
+        Exact code to name lookup, or None.
+        """
+        return self.by_code.get(str(code).strip().upper())
+
+    def prefix(self, text: str, limit: int = 10) -> list:
+        """
+        Stations whose code or name starts with text, in alphabetical order.
+        """
+        key = normalise_name(text)
+        if not key:
+            return []
+        results = []
+        seen = set()
+        start = bisect.bisect_left(self._sorted_keys, (key, ""))
+        for search_key, code in self._sorted_keys[start:]:
+            if not search_key.startswith(key) or len(results) >= limit:
+                break
+            if code not in seen:
+                seen.add(code)
+                results.append(code)
+        return results
+
+    def fuzzy(self, text: str, limit: int = 10, min_score: float = 0.3) -> list:
+        """
+        Typo-tolerant name search. Returns (code, score) pairs, best first,
+        scored by the Dice coefficient of the names' trigram sets.
+        """
+        query = _trigrams(normalise_name(text))
+        overlaps = defaultdict(int)
+        for gram in query:
+            for code in self._grams.get(gram, ()):
+                overlaps[code] += 1
+        scored = []
+        for code, overlap in overlaps.items():
+            score = 2.0 * overlap / (len(query) + self._gram_counts[code])
+            if score >= min_score:
+                scored.append((code, round(score, 3)))
+        scored.sort(key=lambda item: (-item[1], item[0]))
+        return scored[:limit]
+
+    def search(self, text: str, limit: int = 10) -> list:
+        """
+        Combined search: exact code, exact name, then prefix and fuzzy matches.
+        Returns records of the form {"code", "name", "match"}.
+        """
+        results = []
+        seen = set()
+
+        def add(code, match, score=None):
+            if code in seen or len(results) >= limit:
+                return
+            seen.add(code)
+            record = {"code": code, "name": self.by_code[code], "match": match}
+            if score is not None:
+                record["score"] = score
+            results.append(record)
+
+        code = str(text).strip().upper()
+        if code in self.by_code:
+            add(code, "code")
+        exact = self.code_for(text)
+        if exact:
+            add(exact, "name")
+        for code in self.prefix(text, limit):
+            add(code, "prefix")
+        for code, score in self.fuzzy(text, limit):
+            add(code, "fuzzy", score)
+        return results
+
+    def _unlink(self, code: str, name: str) -> None:
+        name = normalise_name(name)
+        if self.by_name.get(name) == code:
+            del self.by_name[name]
+        for key in (name, code):
+            position = bisect.bisect_left(self._sorted_keys, (key, code))
+            if position < len(self._sorted_keys) and self._sorted_keys[position] == (key, code):
+                del self._sorted_keys[position]
+        for gram in _trigrams(name):
+            self._grams[gram].discard(code)
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index() -> StationIndex:
+    """
+    Return the shared station index, loading the station list on first use. Loading reads
+    files and SQLite, so async code awaits load_index() instead of calling this first.
+    """
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                index = StationIndex()
+                try:
+                    index.load_csv(STATIONS_PATH)
+                except OSError as e:
+                    logger.warning(f"Could not load station list {STATIONS_PATH}: {e}")
+                reference_store = store.get_store()
+                if reference_store is not None:
+                    for code, name in reference_store.stations():
+                        index.add(code, name)
+                _index = index
+    return _index
+
+
+async def load_index() -> StationIndex:
+    """
+    Return the shared station index, loading it in a worker thread when it is not loaded yet.
+    """
+    if _index is None:
+        return await asyncio.to_thread(get_index)
+    return _index
+
+
+def learn_from_response(endpoint: str, data) -> None:
+    """
+    Upstream response listener that grows the index from station data seen in traffic.
+    New stations are persisted to the reference store, in a worker thread when called on the event loop.
+    """
+    if _index is None:
+        try:
+            # Not loaded yet: load it and learn in a worker thread rather than on the event loop
+            _in_worker(learn_from_response, endpoint, data)
+            return
+        except RuntimeError:
+            pass
+    added = []
+    get_index().learn(data, added)
+    reference_store = store.get_store()
+    if added and reference_store is not None:
+        try:
+            _in_worker(reference_store.add_stations, added)
+        except RuntimeError:
+            reference_store.add_stations(added)
+
+
+_learning = set()  # worker thread futures, referenced until they finish
+
+
+def _in_worker(function, *args) -> None:
+    """
+    Run function(*args) in a worker thread from the event loop, logging its failure.
+    Raises RuntimeError when there is no running loop.
+    """
+    future = asyncio.get_running_loop().run_in_executor(None, function, *args)
+    _learning.add(future)
+    future.add_done_callback(_learned)
+
+
+def _learned(future) -> None:
+    _learning.discard(future)
+    if not future.cancelled() and future.exception() is not None:
+        logger.warning(f"Learning stations from a response failed: {future.exception()}")
+
+
+def local_station_code(station_name: str):
+    """
+    Answer a station_name_to_code call from the local index, or return None on a miss.
+    """
+    index = get_index()
+    code = index.code_for(station_name)
+    if code is None:
+        return None
+    return {"ResponseCode": "200", "Source": "local", "Station": {"NameEn": index.by_code[code], "StationCode": code}}
+
+
+def local_station_search(query: str, limit: int = 10):
+    """
+    Answer a search_station call from the local index, or return None to ask upstream.
+    The seed list is partial, so unless the index is known to be complete only exact code or
+    name hits are answered locally, without the prefix and fuzzy matches, and flagged "exact";
+    low-scoring fuzzy matches are never returned.
+    """
+    matches = get_index().search(query, limit)
+    if not STATIONS_COMPLETE:
+        exact = [match for match in matches if match["match"] in ("code", "name")]
+        if not exact:
+            return None
+        return {"status": True, "message": "Success", "source": "local", "exact": True, "data": exact}
+    confident = [match for match in matches if match["match"] != "fuzzy" or match["score"] >= FUZZY_CONFIDENT_SCORE]
+    if not confident:
+        return None
+    return {"status": True, "message": "Success", "source": "local", "data": confident}
+
+
+def station_suggestions(station_name: str, limit: int = 5) -> list:
+    """
+    Closest local matches for a name that could not be resolved exactly.
+    """
+    return get_index().search(station_name, limit)
@@ -0,0 +1,258 @@
+import os
+import sys
+import json
+import time
+import sqlite3
+import asyncio
+import logging
+import threading
+
+import deadlines
+import jsoncodec
+import ratelimit
+from cache import DAY, is_cacheable
+
+logger = logging.getLogger("train-mcp")
+
+# Persistent store for slow-changing reference data (schedules, train information, class lists and
+# stations), so that a freshly spawned server answers from disk instead of the network.
+# Set TRAIN_MCP_STORE_PATH to an empty string to disable it.
+STORE_PATH = os.getenv(
+    "TRAIN_MCP_STORE_PATH",
+    os.path.join(os.path.expanduser("~"), ".cache", "train-mcp", "reference.sqlite3"),
+)
+# Stored documents older than REFRESH_AFTER are still served, and refreshed in the background;
+# past MAX_AGE they are refetched first and only served when the upstream fails.
+REFRESH_AFTER = float(os.getenv("TRAIN_MCP_STORE_REFRESH_AFTER", str(7 * DAY)))
+MAX_AGE = float(os.getenv("TRAIN_MCP_STORE_MAX_AGE", str(60 * DAY)))
+STORED_ENDPOINTS = ("TrainSchedule", "getTrainSchedule", "TrainInformation", "getTrainClasses")
+SCHEDULE_ENDPOINTS = ("TrainSchedule", "getTrainSchedule")
+# Reads go through a memory map of the database file rather than read() calls
+MMAP_SIZE = 256 * 1024 * 1024
+REFRESH_TIMEOUT = 30
+
+
+class ReferenceStore:
+    """
+    SQLite file of upstream documents keyed by (endpoint, key), plus a station code -> name table.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(f"PRAGMA mmap_size={MMAP_SIZE}")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS documents ("
+            "endpoint TEXT, key TEXT, fetched_at REAL, body BLOB, PRIMARY KEY (endpoint, key)) WITHOUT ROWID"
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS stations (code TEXT PRIMARY KEY, name TEXT) WITHOUT ROWID")
+        self._conn.commit()
+
+    def get(self, endpoint: str, key: str):
+        """
+        Return (data, age in seconds) for a stored document, or None.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT fetched_at, body FROM documents WHERE endpoint = ? AND key = ?", (endpoint, key)
+            ).fetchone()
+        if row is None:
+            return None
+        return jsoncodec.loads(row[1]), max(0.0, time.time() - row[0])
+
+    def put(self, endpoint: str, key: str, data, fetched_at: float = None) -> None:
+        self.put_many([(endpoint, key, data, fetched_at)])
+
+    def put_many(self, documents) -> int:
+        """
+        Store (endpoint, key, data, fetched_at or None) tuples in one transaction. Returns the number stored.
+        """
+        now = time.time()
+        rows = [
+            (endpoint, key, fetched_at or now, jsoncodec.dumps(data))
+            for endpoint, key, data, fetched_at in documents
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO documents (endpoint, key, fetched_at, body) VALUES (?, ?, ?, ?)", rows
+            )
+            self._conn.commit()
+        return len(rows)
+
+    def documents(self, endpoint: str):
+        """
+        Every stored (key, data) for an endpoint.
+        """
+        with self._lock:
+            rows = self._conn.execute("SELECT key, body FROM documents WHERE endpoint = ?", (endpoint,)).fetchall()
+        return [(key, jsoncodec.loads(body)) for key, body in rows]
+
+    def add_stations(self, stations) -> int:
+        rows = [(str(code), str(name)) for code, name in stations]
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO stations (code, name) VALUES (?, ?)", rows)
+            self._conn.commit()
+        return len(rows)
+
+    def stations(self) -> list:
+        with self._lock:
+            return self._conn.execute("SELECT code, name FROM stations").fetchall()
+
+    def import_file(self, path: str) -> dict:
+        """
+        Bulk-load a JSON lines dump: {"endpoint", "key", "data", ["fetched_at"]} documents
+        and {"code", "name"} stations, as written by export_file.
+        """
+        documents, stations = [], []
+        with open(path, encoding="utf-8") as handle:
+            for number, line in enumerate(handle, 1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError as e:
+                    raise ValueError(f"{path}:{number}: {e}") from None
+                if "code" in record and "name" in record:
+                    stations.append((record["code"], record["name"]))
+                elif record.get("endpoint") in STORED_ENDPOINTS and record.get("key") and is_cacheable(record.get("data")):
+                    documents.append((record["endpoint"], str(record["key"]), record["data"], record.get("fetched_at")))
+                else:
+                    raise ValueError(f"{path}:{number}: expected a document or a station record")
+        return {"documents": self.put_many(documents), "stations": self.add_stations(stations)}
+
+    def export_file(self, path: str) -> dict:
+        with self._lock:
+            documents = self._conn.execute("SELECT endpoint, key, fetched_at, body FROM documents").fetchall()
+            stations = self._conn.execute("SELECT code, name FROM stations").fetchall()
+        with open(path, "w", encoding="utf-8") as handle:
+            for endpoint, key, fetched_at, body in documents:
+                handle.write(json.dumps({"endpoint": endpoint, "key": key, "fetched_at": fetched_at,
+                                         "data": json.loads(body)}, separators=(",", ":")) + "\n")
+            for code, name in stations:
+                handle.write(json.dumps({"code": code, "name": name}) + "\n")
+        return {"documents": len(documents), "stations": len(stations)}
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = dict(self._conn.execute("SELECT endpoint, COUNT(*) FROM documents GROUP BY endpoint").fetchall())
+            stations = self._conn.execute("SELECT COUNT(*) FROM stations").fetchone()[0]
+        return {"path": self.path, "documents": counts, "stations": stations}
+
+
+_store = None
+_store_lock = threading.Lock()
+_refreshing = {}  # (endpoint, key) -> background refresh task
+
+
+def get_store():
+    """
+    Return the shared reference store, opening it on first use, or None when it is disabled or unusable.
+    """
+    global _store
+    if _store is None and STORE_PATH:
+        with _store_lock:
+            if _store is None:
+                try:
+                    os.makedirs(os.path.dirname(os.path.abspath(STORE_PATH)), exist_ok=True)
+                    _store = ReferenceStore(STORE_PATH)
+                except (OSError, sqlite3.Error) as e:
+                    logger.warning(f"Reference store {STORE_PATH} unavailable: {e}")
+                    _store = False
+    return _store or None
+
+
+async def stored(endpoint: str, key: str, fetch):
+    """
+    Answer from the reference store, calling the coroutine function fetch() only when the document
+    is missing or too old. Fresh upstream answers are written back to the store. SQLite reads and
+    writes run in worker threads, off the event loop.
+    """
+    store = get_store()
+    if store is None:
+        return await fetch()
+    key = str(key).strip().upper()
+    entry = await asyncio.to_thread(store.get, endpoint, key)
+    if entry is not None:
+        data, age = entry
+        if age < REFRESH_AFTER:
+            return data
+        if age < MAX_AGE:
+            _refresh_later(store, endpoint, key, fetch)
+            return data
+    data = await fetch()
+    if is_cacheable(data):
+        await asyncio.to_thread(store.put, endpoint, key, data)
+    elif entry is not None:
+        return entry[0]
+    return data
+
+
+def _refresh_later(store: ReferenceStore, endpoint: str, key: str, fetch) -> None:
+    if (endpoint, key) in _refreshing:
+        return
+
+    async def refresh():
+        try:
+            with deadlines.detached(REFRESH_TIMEOUT), ratelimit.priority(ratelimit.BULK):
+                data = await fetch()
+            if is_cacheable(data):
+                await asyncio.to_thread(store.put, endpoint, key, data)
+        except Exception as e:
+            logger.warning(f"Refreshing stored {endpoint} {key} failed: {e}")
+        finally:
+            _refreshing.pop((endpoint, key), None)
+
+    _refreshing[(endpoint, key)] = asyncio.ensure_future(refresh())
+
+
+async def import_reference_data(train_numbers: list, concurrency: int = None, fetch_schedule=None) -> dict:
+    """
+    Bulk-load the store by fetching schedules for train_numbers with the coroutine function
+    fetch_schedule(train_number), then refresh the local indexes. Dump files are imported with
+    "python store.py import FILE" on the server itself, never through a tool.
+    """
+    from batch import gather_bounded
+    from timetable import load_stored_schedules
+
+    reference_store = get_store()
+    if reference_store is None:
+        return {"error": "The reference store is disabled (TRAIN_MCP_STORE_PATH is empty)"}
+    if not train_numbers:
+        return {"error": "Give the train_numbers whose schedules to fetch"}
+    fetched = await gather_bounded(train_numbers, fetch_schedule, concurrency, ratelimit.BULK)
+    if "error" in fetched:
+        return fetched
+    return {
+        "fetched": {
+            "succeeded": fetched["succeeded"],
+            "failed": [{"train_number": item["id"], "error": item["error"]} for item in fetched["results"] if "error" in item],
+        },
+        "schedules_loaded": await asyncio.to_thread(load_stored_schedules, True),
+        "store": await asyncio.to_thread(reference_store.stats),
+    }
+
+
+async def preload() -> None:
+    """
+    Load stored stations and schedules into the local indexes in a worker thread at startup,
+    so the first queries after a restart do not wait for it.
+    """
+    from stations import get_index
+    from timetable import load_stored_schedules
+
+    await asyncio.to_thread(get_index)
+    await asyncio.to_thread(load_stored_schedules)
+
+
+if __name__ == "__main__":
+    # python store.py import dump.jsonl | export dump.jsonl | stats
+    commands = {"import": "import_file", "export": "export_file", "stats": "stats"}
+    if len(sys.argv) < 2 or sys.argv[1] not in commands or (sys.argv[1] != "stats" and len(sys.argv) != 3):
+        sys.exit("usage: python store.py import FILE | export FILE | stats")
+    reference_store = get_store()
+    if reference_store is None:
+        sys.exit("The reference store is disabled (TRAIN_MCP_STORE_PATH is empty)")
+    print(json.dumps(getattr(reference_store, commands[sys.argv[1]])(*sys.argv[2:]), indent=2))
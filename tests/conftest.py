@@ -0,0 +1,30 @@
+import os
+import sys
+
+# The servers are flat modules at the repository root; keep tests off the persistent stores
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ["TRAIN_MCP_STORE_PATH"] = ""
+os.environ.pop("TRAIN_MCP_CACHE_PATH", None)
+os.environ.pop("TRAIN_MCP_RATE_LIMIT_PATH", None)
+
+import pytest
+
+import endpoints
+from bench.mock_upstream import start_stub
+
+
+@pytest.fixture
+def stub():
+    """
+    Upstream stub answering every endpoint after 200ms, with both providers pointed at it.
+    """
+    server = start_stub(latency_ms=200)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    saved = endpoints.INDIAN_RAIL_BASE_URL, endpoints.INDIAN_RAIL_API_KEY, endpoints.RAPIDAPI_BASE_URL, endpoints.RAPIDAPI_KEY
+    endpoints.INDIAN_RAIL_BASE_URL = f"{base_url}/api/v2"
+    endpoints.INDIAN_RAIL_API_KEY = endpoints.INDIAN_RAIL_API_KEY or "test"
+    endpoints.RAPIDAPI_BASE_URL = base_url
+    endpoints.RAPIDAPI_KEY = endpoints.RAPIDAPI_KEY or "test"
+    yield server
+    endpoints.INDIAN_RAIL_BASE_URL, endpoints.INDIAN_RAIL_API_KEY, endpoints.RAPIDAPI_BASE_URL, endpoints.RAPIDAPI_KEY = saved
+    server.shutdown()
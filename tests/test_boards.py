@@ -0,0 +1,19 @@
+import asyncio
+
+from boards import trains_through_station
+from timetable import timetable
+
+
+def test_train_calling_twice_in_the_window_is_listed_twice():
+    # Arrives 23:55 and leaves 00:05, so the runs that started on consecutive days both call at QXA before midnight
+    timetable.add_train({"number": "90001", "name": "Midnight Mail", "days": 0b1111111,
+                         "stops": [("QXO", 1300, 1300), ("QXA", 1435, 1445), ("QXD", 1600, 1600)]})
+
+    async def fetch_board(station_code):
+        return {"Trains": [{"TrainNo": "90001", "TrainName": "Midnight Mail", "ArrivalTime": "23:55", "DepartureTime": "00:05"}]}
+
+    result = asyncio.run(trains_through_station(fetch_board, "QXA", day="MON"))
+    assert result["served_from"] == "upstream"
+    assert [(train["train_number"], train["arrival"]) for train in result["trains"]] == [
+        ("90001", "23:55 -1d"), ("90001", "23:55"),
+    ]
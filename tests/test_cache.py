@@ -0,0 +1,89 @@
+import asyncio
+import json
+import types
+
+import cache
+import freeTrainMCp
+from upstream import lifespan
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self) -> float:
+        return self.now
+
+
+def tiered(monkeypatch, tmp_path=None):
+    clock = Clock()
+    monkeypatch.setattr(cache, "time", types.SimpleNamespace(time=clock.time))
+    disk = cache.DiskCache(str(tmp_path / "cache.sqlite3")) if tmp_path is not None else None
+    return clock, cache.TieredCache(cache.MemoryCache(), disk)
+
+
+def test_entries_expire_after_their_ttl(monkeypatch):
+    clock, responses = tiered(monkeypatch)
+    responses.set("k", {"v": 1}, ttl=30)
+    clock.now += 29
+    assert responses.get("k") == {"v": 1}
+    clock.now += 2
+    assert responses.get("k") is None
+
+
+def test_expired_entries_are_served_stale_within_the_window(monkeypatch):
+    clock, responses = tiered(monkeypatch)
+    responses.set("k", {"v": 1}, ttl=30)
+    clock.now += 30 + 90
+    assert responses.get("k") is None
+    value, age = responses.get_stale("k", max_stale=120)
+    assert value == {"v": 1} and age == 90
+    clock.now += 60
+    assert responses.get_stale("k", max_stale=120) is None
+
+
+def test_disk_hits_are_promoted_to_memory_for_their_remaining_lifetime(monkeypatch, tmp_path):
+    clock, responses = tiered(monkeypatch, tmp_path)
+
+    async def scenario():
+        await responses.set_async("k", {"v": 1}, ttl=60)
+        responses.memory.clear()
+        clock.now += 20
+        first = await responses.get_async("k")
+        promoted = responses.memory.peek("k")
+        clock.now += 50
+        return first, promoted, await responses.get_async("k"), await responses.get_stale_async("k", 60)
+
+    first, promoted, expired, stale = asyncio.run(scenario())
+    assert first == {"v": 1}
+    assert promoted[0] == 1_000_000.0 + 60
+    assert expired is None
+    assert stale == ({"v": 1}, 10)
+
+
+def test_expired_live_board_is_served_stale_and_revalidated(stub):
+    arguments = {"station_code": "NDLS", "hours": 2}
+
+    async def call():
+        return json.loads((await freeTrainMCp.mcp.call_tool("get_live_station_status", arguments))[0].text)
+
+    async def scenario():
+        async with lifespan(freeTrainMCp.mcp):
+            fresh = await call()
+            after_fetch = stub.requests
+            memory = cache.response_cache.memory
+            for key, (_, size, value) in list(memory._entries.items()):
+                memory._entries[key] = (cache.time.time() - 1, size, value)
+            stale = await call()
+            served_stale_at = stub.requests
+            await asyncio.sleep(0.5)  # the stub answers after 200ms
+            return fresh, after_fetch, stale, served_stale_at, await call()
+
+    cache.response_cache.clear()
+    before = stub.requests
+    fresh, after_fetch, stale, served_stale_at, revalidated = asyncio.run(scenario())
+    assert "error" not in fresh and after_fetch - before == 1
+    # The expired board came back at once, marked stale, and one background request refreshed it
+    assert stale["stale"] is True and served_stale_at == after_fetch
+    assert stub.requests - after_fetch == 1
+    assert "stale" not in revalidated
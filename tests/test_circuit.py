@@ -0,0 +1,52 @@
+import types
+
+import circuit
+
+
+def breaker(monkeypatch):
+    clock = types.SimpleNamespace(now=100.0)
+    monkeypatch.setattr(circuit, "time", types.SimpleNamespace(monotonic=lambda: clock.now))
+    return clock, circuit.CircuitBreaker("test", failure_threshold=3, open_seconds=30)
+
+
+def test_consecutive_failures_open_the_circuit(monkeypatch):
+    clock, breaker_ = breaker(monkeypatch)
+    breaker_.record_failure()
+    breaker_.record_failure()
+    breaker_.record_success()  # a success resets the count
+    breaker_.record_failure()
+    breaker_.record_failure()
+    assert breaker_.state == circuit.CLOSED and breaker_.allow()
+    breaker_.record_failure()
+    assert breaker_.state == circuit.OPEN and not breaker_.allow()
+    clock.now += 10
+    assert breaker_.retry_after() == 20
+    assert breaker_.opened == 1
+
+
+def test_half_open_probe_closes_or_reopens_the_circuit(monkeypatch):
+    clock, breaker_ = breaker(monkeypatch)
+    for _ in range(3):
+        breaker_.record_failure()
+    clock.now += 30
+    assert breaker_.state == circuit.HALF_OPEN
+    assert breaker_.allow() and not breaker_.allow()  # one probe per open period
+
+    breaker_.record_failure()
+    assert breaker_.state == circuit.OPEN and breaker_.opened == 2
+    clock.now += 30
+    assert breaker_.allow()
+    breaker_.record_success()
+    assert breaker_.state == circuit.CLOSED and breaker_.failures == 0 and breaker_.allow()
+
+
+def test_probe_that_never_reports_back_is_replaced(monkeypatch):
+    clock, breaker_ = breaker(monkeypatch)
+    for _ in range(3):
+        breaker_.record_failure()
+    clock.now += 30
+    assert breaker_.allow()
+    clock.now += 29
+    assert not breaker_.allow()
+    clock.now += 1
+    assert breaker_.allow()
@@ -0,0 +1,52 @@
+import asyncio
+import json
+import time
+
+import cache
+import freeTrainMCp
+from upstream import lifespan
+
+TOOL = "get_live_train_status"
+
+
+async def call(train_number: str) -> dict:
+    result = await freeTrainMCp.mcp.call_tool(TOOL, {"train_number": train_number, "date": "20260101"})
+    return json.loads(result[0].text)
+
+
+async def timed(train_numbers: list) -> tuple:
+    start = time.perf_counter()
+    results = await asyncio.gather(*(call(number) for number in train_numbers))
+    return time.perf_counter() - start, results
+
+
+def test_throughput_scales_with_parallel_calls(stub):
+    async def scenario():
+        async with lifespan(freeTrainMCp.mcp):
+            await call("9999")  # open the pooled connection first
+            single, _ = await timed(["10000"])
+            parallel, results = await timed([str(10001 + n) for n in range(20)])
+        return single, parallel, results
+
+    cache.response_cache.clear()
+    before = stub.requests
+    single, parallel, results = asyncio.run(scenario())
+    assert not any("error" in result for result in results)
+    # 20 distinct calls made 20 upstream requests and overlapped instead of queueing one after another
+    assert stub.requests - before == 22
+    assert parallel < 4 * single, f"20 parallel calls took {parallel:.2f}s, one call {single:.2f}s"
+    assert 20 / parallel > 5 / single
+
+
+def test_coalesced_calls_share_one_upstream_request(stub):
+    async def scenario():
+        async with lifespan(freeTrainMCp.mcp):
+            return await timed(["12951"] * 10)
+
+    cache.response_cache.clear()
+    before = stub.requests
+    elapsed, results = asyncio.run(scenario())
+    assert stub.requests - before == 1
+    assert all(result == results[0] for result in results)
+    assert "error" not in results[0]
+    assert elapsed < 1.0
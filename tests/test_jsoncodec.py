@@ -0,0 +1,48 @@
+import json
+
+import pytest
+
+from jsoncodec import IncrementalDecoder
+
+DOCUMENT = {
+    "ResponseCode": "200",
+    "TotalTrains": 3,
+    "Trains": [
+        {"TrainNo": "12951", "TrainName": "MUMBAI RAJDHANI", "Delay": -2.5, "Late": False, "Platform": None},
+        {"TrainNo": "19038", "TrainName": "AVADH EXPRESS – बांद्रा", "Stops": [], "Days": {}},
+        {"TrainNo": "22210", "TrainName": "DURONTO \"NON-STOP\"", "Distance": 1.25e3},
+    ],
+    "Empty": {"list": [], "object": {}},
+}
+
+
+def decode(body: bytes, size: int):
+    decoder = IncrementalDecoder()
+    for start in range(0, len(body), size):
+        decoder.feed(body[start:start + size])
+    return decoder.close()
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64, 10_000])
+def test_document_split_across_chunks_decodes_like_json_loads(size):
+    body = json.dumps(DOCUMENT, ensure_ascii=False, indent=1).encode("utf-8")
+    assert decode(body, size) == json.loads(body)
+
+
+def test_every_split_point_including_inside_numbers_and_multibyte_characters():
+    body = '{"a": [12.5e-1, "बा", true], "b": -0.25}'.encode("utf-8")
+    for split in range(1, len(body)):
+        decoder = IncrementalDecoder()
+        decoder.feed(body[:split])
+        decoder.feed(body[split:])
+        assert decoder.close() == {"a": [1.25, "बा", True], "b": -0.25}, split
+
+
+def test_bare_scalar_document():
+    assert decode(b"1234", 1) == 1234
+
+
+@pytest.mark.parametrize("body", [b'{"a": [1, 2', b'{"a": 1} {"b": 2}', b'{"a" 1}'])
+def test_truncated_or_malformed_documents_are_refused(body):
+    with pytest.raises(ValueError):
+        decode(body, 3)
@@ -0,0 +1,40 @@
+import asyncio
+import json
+import socket
+
+import cache
+import endpoints
+import freeTrainMCp
+from metrics import registry
+from upstream import lifespan
+
+
+def errors(tool: str) -> dict:
+    return {
+        dict(labels)["type"]: value
+        for (name, labels), value in registry.counters.items()
+        if name == "train_mcp_tool_errors_total" and dict(labels)["tool"] == tool
+    }
+
+
+def test_returned_upstream_errors_are_counted():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]  # nothing listens here once the socket is closed
+    saved = endpoints.INDIAN_RAIL_BASE_URL, endpoints.INDIAN_RAIL_API_KEY
+    endpoints.INDIAN_RAIL_BASE_URL = f"http://127.0.0.1:{port}/api/v2"
+    endpoints.INDIAN_RAIL_API_KEY = endpoints.INDIAN_RAIL_API_KEY or "test"
+
+    async def scenario():
+        async with lifespan(freeTrainMCp.mcp):
+            result = await freeTrainMCp.mcp.call_tool("get_train_information", {"train_number": "55555"})
+        return json.loads(result[0].text)
+
+    cache.response_cache.clear()
+    before = errors("get_train_information").get("error_result", 0)
+    try:
+        result = asyncio.run(scenario())
+    finally:
+        endpoints.INDIAN_RAIL_BASE_URL, endpoints.INDIAN_RAIL_API_KEY = saved
+    assert "error" in result
+    assert errors("get_train_information")["error_result"] == before + 1
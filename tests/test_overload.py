@@ -0,0 +1,117 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+import admission
+import cache
+import endpoints
+import trainMCP
+from bench.mock_upstream import STATIONS, start_stub_process
+from upstream import lifespan
+
+SHED_BOUND_MS = 10.0
+CHEAP_P95_LIMIT_MS = 200.0
+
+
+def test_gate_admits_limit_plus_queue_and_sheds_the_rest():
+    gate = admission.Gate("busy", limit=2, queue_size=2)
+
+    async def call():
+        start = time.perf_counter()
+        try:
+            async with gate.admit():
+                await asyncio.sleep(0.2)
+        except admission.Overloaded as e:
+            return "shed", (time.perf_counter() - start) * 1000.0, e.result()
+        return "ran", (time.perf_counter() - start) * 1000.0, None
+
+    async def scenario():
+        return await asyncio.gather(*(call() for _ in range(10)))
+
+    outcomes = asyncio.run(scenario())
+    ran = [latency for outcome, latency, _ in outcomes if outcome == "ran"]
+    shed = [(latency, result) for outcome, latency, result in outcomes if outcome == "shed"]
+    assert len(ran) == 4 and len(shed) == 6
+    # Two calls ran at once and two waited one round; the rest were turned away at once with a retry hint
+    assert max(ran) < 600
+    assert all(latency < SHED_BOUND_MS for latency, _ in shed)
+    assert all(result["overloaded"] and result["retry_after"] > 0 for _, result in shed)
+    assert gate.running == 0 and gate.queued() == 0 and gate.rejected == 6
+
+
+def test_gate_rejects_calls_that_would_outwait_their_deadline():
+    gate = admission.Gate("slow", limit=1, queue_size=8)
+
+    async def scenario():
+        async with gate.admit():
+            start = time.perf_counter()
+            with pytest.raises(admission.Overloaded):
+                # One slot, about a second per call: a 100ms deadline cannot be met, so no waiting
+                await gate.acquire(time.monotonic() + 0.1)
+            return (time.perf_counter() - start) * 1000.0
+
+    assert asyncio.run(scenario()) < SHED_BOUND_MS
+    assert gate.queued() == 0
+
+
+@pytest.fixture
+def overload_stubs():
+    """
+    A slow RapidAPI stub with large live boards and a fast Indian Rail stub, each in its own process.
+    """
+    slow, slow_url = start_stub_process(latency_ms=1000, rows=200)
+    fast, fast_url = start_stub_process(latency_ms=20, rows=20)
+    saved = endpoints.INDIAN_RAIL_BASE_URL, endpoints.INDIAN_RAIL_API_KEY, endpoints.RAPIDAPI_BASE_URL, endpoints.RAPIDAPI_KEY
+    endpoints.RAPIDAPI_BASE_URL = slow_url
+    endpoints.RAPIDAPI_KEY = endpoints.RAPIDAPI_KEY or "test"
+    endpoints.INDIAN_RAIL_BASE_URL = f"{fast_url}/api/v2"
+    endpoints.INDIAN_RAIL_API_KEY = endpoints.INDIAN_RAIL_API_KEY or "test"
+    yield
+    endpoints.INDIAN_RAIL_BASE_URL, endpoints.INDIAN_RAIL_API_KEY, endpoints.RAPIDAPI_BASE_URL, endpoints.RAPIDAPI_KEY = saved
+    for process in (slow, fast):
+        process.terminate()
+        process.wait()
+
+
+async def timed_call(tool: str, arguments: dict):
+    start = time.perf_counter()
+    result = json.loads((await trainMCP.mcp.call_tool(tool, arguments))[0].text)
+    return (time.perf_counter() - start) * 1000.0, result
+
+
+def test_burst_of_slow_calls_is_shed_and_cheap_tools_stay_fast(overload_stubs):
+    stations = [code for code, _ in STATIONS]
+    limit, queue_size = admission.limits["get_live_station_status"]
+
+    async def cheap_calls(latencies: list):
+        for number in range(40):
+            latency, result = await timed_call("get_train_schedule_indian_rail", {"train_number": str(20000 + number), "limit": 1})
+            assert "error" not in result
+            latencies.append(latency)
+            await asyncio.sleep(0.02)
+
+    async def scenario():
+        cache.response_cache.clear()
+        admission.gates.clear()
+        burst = [
+            timed_call("get_live_station_status", {"from_station_code": stations[i % len(stations)],
+                                                   "hours": i // len(stations) + 1, "limit": 1})
+            for i in range(300)
+        ]
+        cheap = []
+        async with lifespan(trainMCP.mcp):
+            results = await asyncio.gather(cheap_calls(cheap), *burst)
+        return cheap, results[1:]
+
+    cheap, burst = asyncio.run(scenario())
+    shed = [latency for latency, result in burst if result.get("overloaded")]
+    completed = [latency for latency, result in burst if "error" not in result]
+    assert len(completed) + len(shed) == len(burst)
+    # At most the running and queued calls get through; the excess is turned away quickly
+    assert len(completed) <= limit + queue_size
+    assert len(shed) >= len(burst) - limit - queue_size
+    assert sorted(shed)[int(0.95 * len(shed))] < SHED_BOUND_MS
+    assert max(completed) < 1000 * (admission.QUEUE_TIMEOUT + 2)
+    assert sorted(cheap)[int(0.95 * len(cheap))] < CHEAP_P95_LIMIT_MS
@@ -0,0 +1,56 @@
+import asyncio
+import time
+
+import pytest
+
+import ratelimit
+
+
+def test_waiters_are_served_by_priority_then_arrival():
+    limiter = ratelimit.RateLimiter("test", rate=20, burst=1)
+    granted = []
+
+    async def wait(name: str, level: int):
+        await limiter.acquire(level)
+        granted.append(name)
+
+    async def scenario():
+        await limiter.acquire()  # empty the bucket, so that everyone below has to queue
+        tasks = []
+        for name, level in (("bulk", ratelimit.BULK), ("normal-1", ratelimit.NORMAL),
+                            ("interactive", ratelimit.INTERACTIVE), ("normal-2", ratelimit.NORMAL)):
+            tasks.append(asyncio.ensure_future(wait(name, level)))
+            await asyncio.sleep(0)
+        await asyncio.gather(*tasks)
+
+    asyncio.run(scenario())
+    assert granted == ["interactive", "normal-1", "normal-2", "bulk"]
+    assert limiter.granted == 5 and limiter.queued() == 0
+
+
+def test_waiter_that_cannot_be_served_before_its_deadline_is_rejected_up_front():
+    limiter = ratelimit.RateLimiter("test", rate=1, burst=1)
+
+    async def scenario():
+        await limiter.acquire()
+        with pytest.raises(ratelimit.QueueDeadlineExceeded) as error:
+            await limiter.acquire(ratelimit.NORMAL, deadline=time.monotonic() + 0.1)
+        return error.value
+
+    error = asyncio.run(scenario())
+    assert 0 < error.retry_after <= 1
+    assert limiter.rejected == 1 and limiter.queued() == 0
+
+
+def test_shared_bucket_is_one_budget_across_instances(tmp_path):
+    path = str(tmp_path / "ratelimits.sqlite3")
+    first = ratelimit.SharedTokenBucket(path, "host", rate=0.1, burst=2)
+    second = ratelimit.SharedTokenBucket(path, "host", rate=0.1, burst=2)
+    assert first.take() == 0 and second.take() == 0
+    assert first.take() > 0 and second.delay() > 0
+    second.block_for(30)
+    assert first.delay() >= 29
+
+    limiter = ratelimit.RateLimiter("host", 0.1, 2, ratelimit.SharedTokenBucket(path, "other", rate=0.1, burst=1))
+    asyncio.run(limiter.acquire())
+    assert limiter.granted == 1
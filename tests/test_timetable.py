@@ -0,0 +1,16 @@
+from timetable import Timetable
+
+
+def schedule(number: str, *stops) -> dict:
+    return {"number": number, "name": f"Train {number}", "days": 0b1111111, "stops": list(stops)}
+
+
+def test_later_direct_train_is_kept_next_to_an_earlier_connection():
+    table = Timetable()
+    # A-B-C with a change at B arrives at 12:00; the direct train leaves after that and arrives at 14:00
+    table.add_train(schedule("1", ("A", 8 * 60, 8 * 60), ("B", 9 * 60, 9 * 60)))
+    table.add_train(schedule("2", ("B", 10 * 60, 10 * 60), ("C", 12 * 60, 12 * 60)))
+    table.add_train(schedule("3", ("A", 12 * 60 + 30, 12 * 60 + 30), ("C", 14 * 60, 14 * 60)))
+    journeys = table.earliest_arrival("A", "C", 7 * 60, max_legs=2)
+    assert [[leg["train_number"] for leg in legs] for legs in journeys] == [["3"], ["1", "2"]]
+    assert [legs[-1]["arrival"] for legs in journeys] == [14 * 60, 12 * 60]
@@ -0,0 +1,524 @@
+import asyncio
+import bisect
+import datetime
+import logging
+import threading
+
+import store
+
+logger = logging.getLogger("train-mcp")
+
+DAY_MINUTES = 24 * 60
+MIN_TRANSFER_MINUTES = 15
+# Journey queries keep one label per station and number of legs, so changes of train are capped
+MAX_CHANGES = 3
+ALL_DAYS = 0b1111111  # bit 0 = Monday
+WEEKDAYS = ("MON", "TUE", "WED", "THU", "FRI", "SAT", "SUN")
+
+
+def parse_time(value):
+    """
+    Parse "HH:MM" (or minutes since midnight) into minutes; None for "Source", "--" and friends.
+    """
+    if isinstance(value, (int, float)):
+        return int(value) if value >= 0 else None
+    if not isinstance(value, str) or ":" not in value:
+        return None
+    hours, _, minutes = value.strip().partition(":")
+    try:
+        return int(hours) * 60 + int(minutes[:2])
+    except ValueError:
+        return None
+
+
+def format_time(minutes: int) -> str:
+    """
+    Format absolute minutes as "HH:MM", with "+Nd" when it falls on a later day.
+    """
+    day, minute = divmod(int(minutes), DAY_MINUTES)
+    text = f"{minute // 60:02d}:{minute % 60:02d}"
+    return f"{text} +{day}d" if day else text
+
+
+def parse_running_days(value) -> int:
+    """
+    Running days as a Monday-first bitmask. Accepts "1111100", "YYYYYNN" or ["MON", "TUE", ...].
+    Unknown formats mean the train runs every day.
+    """
+    if isinstance(value, str) and len(value) == 7 and set(value.upper()) <= set("01YN"):
+        return sum(1 << i for i, flag in enumerate(value.upper()) if flag in "1Y") or ALL_DAYS
+    if isinstance(value, (list, tuple)):
+        mask = 0
+        for day in value:
+            name = str(day).strip().upper()[:3]
+            if name in WEEKDAYS:
+                mask |= 1 << WEEKDAYS.index(name)
+        return mask or ALL_DAYS
+    if isinstance(value, dict):
+        return parse_running_days([day for day, runs in value.items() if runs in (True, "Y", "1", 1)])
+    return ALL_DAYS
+
+
+def _first(record: dict, *fields):
+    for field in fields:
+        if field in record and record[field] not in (None, ""):
+            return record[field]
+    return None
+
+
+def parse_schedule(train_number: str, data) -> dict:
+    """
+    Normalise an indianrailapi.com TrainSchedule or RapidAPI getTrainSchedule response to
+    {"number", "name", "days", "stops": [(station_code, arrival, departure), ...]} with absolute
+    minutes from midnight of the day the train starts. Returns None when no route is present.
+    """
+    if not isinstance(data, dict):
+        return None
+    body = data.get("data") if isinstance(data.get("data"), dict) else data
+    route = _first(body, "Route", "route", "stations")
+    if not isinstance(route, list) or len(route) < 2:
+        return None
+    stops = []
+    day = 0
+    last = None
+    for stop in route:
+        if not isinstance(stop, dict):
+            continue
+        code = _first(stop, "StationCode", "station_code", "stationCode")
+        if not code:
+            continue
+        arrival = parse_time(_first(stop, "ArrivalTime", "sta", "arrivalTime", "sta_min"))
+        departure = parse_time(_first(stop, "DepartureTime", "std", "departureTime", "std_min"))
+        if arrival is None and departure is None:
+            continue
+        stop_day = _first(stop, "Day", "day")
+        try:
+            base = (int(stop_day) - 1) * DAY_MINUTES if stop_day is not None else None
+        except (TypeError, ValueError):
+            base = None
+        if base is None:
+            # No day column: roll over whenever the clock goes backwards
+            first_time = arrival if arrival is not None else departure
+            if last is not None and day * DAY_MINUTES + first_time < last:
+                day += 1
+            base = day * DAY_MINUTES
+        arrival = base + arrival if arrival is not None else None
+        departure = base + departure if departure is not None else None
+        if arrival is None:
+            arrival = departure
+        if departure is None:
+            departure = arrival
+        if departure < arrival:
+            departure += DAY_MINUTES
+        if last is not None and arrival < last:
+            continue
+        last = departure
+        stops.append((str(code).strip().upper(), arrival, departure))
+    if len(stops) < 2:
+        return None
+    return {
+        "number": str(_first(body, "TrainNumber", "train_number", "trainNumber") or train_number),
+        "name": _first(body, "TrainName", "train_name", "trainName"),
+        "days": parse_running_days(_first(body, "RunningDays", "running_days", "run_days", "runDays")),
+        "stops": stops,
+    }
+
+
+class Connections:
+    """
+    One build of a timetable's elementary connections: parallel lists sorted by departure
+    time, plus the train, running days and start day of every trip. Never changed once built,
+    so a query keeps the build it started with while a newer one is swapped in.
+    """
+
+    def __init__(self, trains: list):
+        station_ids = {}
+        trip_trains, trip_days, trip_started = [], [], []
+        rows = []
+        for number, schedule in trains:
+            stops = [(station_ids.setdefault(code, len(station_ids)), arrival, departure)
+                     for code, arrival, departure in schedule["stops"]]
+            span_days = stops[-1][1] // DAY_MINUTES + 1
+            # One trip per start day, so trains already en route on the query day are covered
+            for started in range(-span_days, 2):
+                trip = len(trip_trains)
+                shift = started * DAY_MINUTES
+                for (origin, _, leaves), (stop, arrives, _) in zip(stops, stops[1:]):
+                    if 0 <= leaves + shift < 2 * DAY_MINUTES:
+                        rows.append((leaves + shift, arrives + shift, origin, stop, trip))
+                trip_trains.append(number)
+                trip_days.append(schedule["days"])
+                trip_started.append(started)
+        rows.sort()
+        self.dep_time = [row[0] for row in rows]
+        self.arr_time = [row[1] for row in rows]
+        self.dep_station = [row[2] for row in rows]
+        self.arr_station = [row[3] for row in rows]
+        self.trip = [row[4] for row in rows]
+        self.trip_trains = trip_trains
+        self.trip_days = trip_days
+        self.trip_started = trip_started
+        self.station_ids = station_ids
+        self.station_codes = sorted(station_ids, key=station_ids.get)
+        self._running = {}  # weekday -> per-trip running flags
+
+    def __len__(self) -> int:
+        return len(self.dep_time)
+
+    def running_on(self, weekday: int) -> bytes:
+        """
+        Per-trip flags for whether each trip instance runs on the query weekday.
+        """
+        running = self._running.get(weekday)
+        if running is None:
+            running = bytes(
+                (days >> ((weekday + started) % 7)) & 1
+                for days, started in zip(self.trip_days, self.trip_started)
+            )
+            self._running[weekday] = running
+        return running
+
+    def journey(self, parent: list, legs: int, station: int) -> list:
+        result = []
+        while legs > 0 and station in parent[legs]:
+            board, alight = parent[legs][station]
+            result.append({
+                "train_number": self.trip_trains[self.trip[board]],
+                "from": self.station_codes[self.dep_station[board]],
+                "to": self.station_codes[self.arr_station[alight]],
+                "departure": self.dep_time[board],
+                "arrival": self.arr_time[alight],
+            })
+            station = self.dep_station[board]
+            legs -= 1
+        result.reverse()
+        return result
+
+
+class Timetable:
+    """
+    Compact in-memory timetable built from train schedules, answering journey queries
+    with the Connection Scan Algorithm.
+
+    Every pair of consecutive stops becomes an elementary connection. Connections are
+    stored in parallel lists sorted by departure time, repeated for trips that started on
+    the previous days so that a query window covers trains already en route. They are
+    rebuilt on the first query after the trains change, outside the lock, and swapped in whole.
+    """
+
+    def __init__(self, min_transfer: int = MIN_TRANSFER_MINUTES):
+        self.min_transfer = min_transfer
+        self.trains = {}  # number -> parsed schedule
+        self.at_station = {}  # station code -> {number: (arrival, departure, running days)}
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self._version = 0  # bumped by every change to the trains
+        self._built = None  # (version, Connections)
+
+    def __len__(self) -> int:
+        return len(self.trains)
+
+    def add_train(self, schedule: dict) -> None:
+        """
+        Add or replace a train from a parse_schedule() record, updating the station index in place.
+        """
+        number = schedule["number"]
+        with self._lock:
+            previous = self.trains.get(number)
+            for code, _, _ in previous["stops"] if previous is not None else ():
+                calls = self.at_station.get(code)
+                if calls is not None:
+                    calls.pop(number, None)
+                    if not calls:
+                        del self.at_station[code]
+            self.trains[number] = schedule
+            for code, arrival, departure in schedule["stops"]:
+                self.at_station.setdefault(code, {})[number] = (arrival, departure, schedule["days"])
+            self._version += 1
+
+    def observe_schedule(self, train_number: str, data) -> bool:
+        """
+        Feed an upstream schedule response into the timetable. Returns True when it was usable.
+        """
+        schedule = parse_schedule(train_number, data)
+        if schedule is None:
+            return False
+        if self.trains.get(schedule["number"]) != schedule:
+            self.add_train(schedule)
+        return True
+
+    def trains_at(self, station: str) -> set:
+        """
+        Numbers of the indexed trains that call at a station.
+        """
+        with self._lock:
+            return set(self.at_station.get(station.strip().upper(), ()))
+
+    def calls_at(self, station: str, start: int = 0, end: int = DAY_MINUTES, weekday: int = None) -> list:
+        """
+        Indexed trains at a station from `start` up to, not including, `end` (minutes from midnight
+        of the query day; an end at or before the start runs past midnight) on `weekday` (0 = Monday, None = any
+        day). Returns (number, arrival, departure, started) tuples ordered by arrival, with times
+        relative to midnight of the query day and `started` the day the train left its origin
+        (0 = the query day, -1 = the day before, ...).
+        """
+        if end <= start:
+            end += DAY_MINUTES
+        with self._lock:
+            calls = list(self.at_station.get(station.strip().upper(), {}).items())
+        found = []
+        for number, (arrival, departure, days) in calls:
+            # One candidate per start day that can put the stop inside the window
+            for started in range(-(departure // DAY_MINUTES), 2):
+                shift = started * DAY_MINUTES
+                if arrival + shift >= end or departure + shift < start:
+                    continue
+                if weekday is not None and not (days >> ((weekday + started) % 7)) & 1:
+                    continue
+                found.append((number, arrival + shift, departure + shift, started))
+                if weekday is None:
+                    break
+        found.sort(key=lambda call: (call[1], call[0]))
+        return found
+
+    def stations(self) -> int:
+        return len(self._current().station_codes)
+
+    def connections(self) -> int:
+        return len(self._current())
+
+    def earliest_arrival(self, origin: str, destination: str, departure: int = 0,
+                         weekday: int = None, max_legs: int = 3) -> list:
+        """
+        Pareto-optimal journeys from origin to destination leaving at or after `departure`
+        (minutes from midnight) on `weekday` (0 = Monday, None = any day): the earliest
+        arrival for each number of legs up to max_legs, dropping options that do not
+        arrive strictly earlier than ones with fewer changes.
+        """
+        built = self._current()
+        source = built.station_ids.get(origin.strip().upper())
+        target = built.station_ids.get(destination.strip().upper())
+        if source is None or target is None or source == target:
+            return []
+        infinity = float("inf")
+        count = len(built.station_codes)
+        # best[k][station]: earliest arrival using at most k legs
+        best = [[infinity] * count for _ in range(max_legs + 1)]
+        parent = [dict() for _ in range(max_legs + 1)]
+        for row in best:
+            row[source] = departure
+        # Direct trains come from the station index, which bounds every level from the start;
+        # the scan then only has to find journeys with changes
+        direct = self._direct(origin, destination, departure, weekday)
+        if direct is not None:
+            for row in best[1:]:
+                row[target] = direct["arrival"]
+        boarded = {}  # trip -> (legs, boarding connection index)
+        running = built.running_on(weekday) if weekday is not None else None
+
+        dep_station, arr_station = built.dep_station, built.arr_station
+        dep_time, arr_time, trips = built.dep_time, built.arr_time, built.trip
+        min_transfer = self.min_transfer
+        # Levels 1..open_legs can still improve on the target's arrival; best[k][target] only
+        # grows as k falls, so the open levels are always a prefix and shrink as the scan goes on.
+        # Level 1 is already answered by the direct trains and only feeds the levels above it
+        open_legs = max_legs
+
+        start = bisect.bisect_left(dep_time, departure)
+        for index in range(start, len(dep_time)):
+            leaves = dep_time[index]
+            while open_legs > 1 and best[open_legs][target] <= leaves:
+                open_legs -= 1
+            if open_legs == 1:
+                break
+            trip = trips[index]
+            current = boarded.get(trip)
+            if current is None or current[0] > 1:
+                station = dep_station[index]
+                # best[open_legs - 1] is the earliest arrival with fewer legs than any open level,
+                # so it rules out most boardings cheaply
+                if best[open_legs - 1][station] <= leaves and (running is None or running[trip]):
+                    for legs in range(1, min(open_legs + 1, max_legs + 1 if current is None else current[0])):
+                        ready = best[legs - 1][station]
+                        if legs > 1:
+                            ready += min_transfer
+                        if ready <= leaves:
+                            current = boarded[trip] = (legs, index)
+                            break
+                if current is None:
+                    continue
+            legs, board = current
+            if legs > open_legs:
+                continue
+            arrives = arr_time[index]
+            stop = arr_station[index]
+            for level in range(legs, open_legs + 1):
+                if arrives < best[level][stop]:
+                    best[level][stop] = arrives
+                    parent[level][stop] = (board, index)
+
+        journeys = [[direct]] if direct is not None else []
+        previous = best[1][target]
+        for legs in range(2, max_legs + 1):
+            arrives = best[legs][target]
+            if arrives < previous:
+                journeys.append(built.journey(parent, legs, target))
+                previous = arrives
+        return journeys
+
+    def _direct(self, origin: str, destination: str, departure: int, weekday: int = None):
+        """
+        The earliest-arriving single train from origin to destination leaving at or after
+        `departure`, as a journey leg, or None. Covers the same trip instances as the connections.
+        """
+        origin, destination = origin.strip().upper(), destination.strip().upper()
+        found = None
+        for number in self.trains_at(origin) & self.trains_at(destination):
+            schedule = self.trains[number]
+            codes = [code for code, _, _ in schedule["stops"]]
+            board = codes.index(origin)
+            if destination not in codes[board + 1:]:
+                continue
+            alight = codes.index(destination, board + 1)
+            stops = schedule["stops"]
+            leaves, arrives, last_leaves = stops[board][2], stops[alight][1], stops[alight - 1][2]
+            # Start days in the order their departures come, so the first match arrives earliest
+            for started in range(-(stops[-1][1] // DAY_MINUTES + 1), 2):
+                shift = started * DAY_MINUTES
+                if leaves + shift < max(departure, 0) or last_leaves + shift >= 2 * DAY_MINUTES:
+                    continue
+                if weekday is not None and not (schedule["days"] >> ((weekday + started) % 7)) & 1:
+                    continue
+                if found is None or arrives + shift < found["arrival"]:
+                    found = {"train_number": number, "from": origin, "to": destination,
+                             "departure": leaves + shift, "arrival": arrives + shift}
+                break
+        return found
+
+    def _current(self) -> Connections:
+        """
+        The connections for the current trains, rebuilding them first when the trains changed.
+        While another thread rebuilds, the previous build is used rather than waiting for it.
+        """
+        built = self._built
+        if built is not None and built[0] == self._version:
+            return built[1]
+        if not self._build_lock.acquire(blocking=built is None):
+            return built[1]
+        try:
+            with self._lock:
+                version = self._version
+                trains = list(self.trains.items())
+            built = self._built
+            if built is None or built[0] != version:
+                built = self._built = (version, Connections(trains))
+                logger.info(f"Timetable rebuilt: {len(trains)} trains, {len(built[1])} connections")
+            return built[1]
+        finally:
+            self._build_lock.release()
+
+
+def describe_journeys(table: Timetable, journeys: list) -> list:
+    """
+    Render journeys for tool output, with names and "HH:MM" times.
+    """
+    options = []
+    for legs in journeys:
+        options.append({
+            "changes": len(legs) - 1,
+            "departure": format_time(legs[0]["departure"]),
+            "arrival": format_time(legs[-1]["arrival"]),
+            "duration_minutes": legs[-1]["arrival"] - legs[0]["departure"],
+            "legs": [
+                {
+                    **leg,
+                    "train_name": table.trains[leg["train_number"]]["name"],
+                    "departure": format_time(leg["departure"]),
+                    "arrival": format_time(leg["arrival"]),
+                }
+                for leg in legs
+            ],
+        })
+    return options
+
+
+def parse_weekday(date: str):
+    """
+    Weekday (0 = Monday) of a date in yyyymmdd, yyyy-mm-dd or dd-mm-yyyy format; None if unparseable.
+    """
+    for pattern in ("%Y%m%d", "%Y-%m-%d", "%d-%m-%Y"):
+        try:
+            return datetime.datetime.strptime(str(date).strip(), pattern).weekday()
+        except ValueError:
+            continue
+    return None
+
+
+async def plan_journey(from_station: str, to_station: str, departure_time: str = "00:00",
+                       date: str = None, max_changes: int = 2) -> dict:
+    """
+    Run a journey query against the shared timetable and shape the result for tool output.
+    The query, and the rebuild of the connections when trains were added, run in a worker thread.
+    """
+    departure = parse_time(departure_time)
+    if departure is None:
+        return {"error": f"Invalid departure_time {departure_time!r}, expected HH:MM"}
+    weekday = parse_weekday(date) if date else None
+    if date and weekday is None:
+        return {"error": f"Invalid date {date!r}"}
+    changes = min(max(0, max_changes), MAX_CHANGES)
+    await load_stored_schedules_async()
+    journeys = await asyncio.to_thread(timetable.earliest_arrival, from_station, to_station, departure, weekday, changes + 1)
+    result = {
+        "from": from_station.upper(),
+        "to": to_station.upper(),
+        "trains_indexed": len(timetable),
+        "journeys": describe_journeys(timetable, journeys),
+    }
+    if changes != max_changes and max_changes > 0:
+        result["note"] = f"max_changes clamped to {MAX_CHANGES}"
+    return result
+
+
+timetable = Timetable()
+_stored_loaded = False
+_stored_lock = threading.Lock()
+
+
+def observe_schedule(train_number: str, data) -> bool:
+    """
+    Feed a schedule response into the shared timetable.
+    """
+    return timetable.observe_schedule(train_number, data)
+
+
+def load_stored_schedules(reload: bool = False) -> int:
+    """
+    Add every schedule in the reference store to the shared timetable, once per process
+    unless reload is set. Returns the number of usable schedules. This decodes the whole
+    store, so async code awaits load_stored_schedules_async() instead.
+    """
+    global _stored_loaded
+    if _stored_loaded and not reload:
+        return 0
+    with _stored_lock:
+        if _stored_loaded and not reload:
+            return 0
+        loaded = 0
+        reference_store = store.get_store()
+        for endpoint in store.SCHEDULE_ENDPOINTS if reference_store is not None else ():
+            for train_number, data in reference_store.documents(endpoint):
+                loaded += timetable.observe_schedule(train_number, data)
+        _stored_loaded = True
+    if loaded:
+        logger.info(f"Loaded {loaded} stored schedules into the timetable")
+    return loaded
+
+
+async def load_stored_schedules_async() -> None:
+    """
+    Make sure the stored schedules are in the shared timetable, loading them in a worker thread
+    (or waiting there for the startup preload) when they are not loaded yet.
+    """
+    if not _stored_loaded:
+        await asyncio.to_thread(load_stored_schedules)
@@ -0,0 +1,343 @@
+import os
+import re
+import time
+import array
+import asyncio
+import datetime
+import logging
+
+import deadlines
+import ratelimit
+from timetable import parse_schedule
+
+logger = logging.getLogger("train-mcp")
+
+# A tracked train is polled every MIN_POLL_INTERVAL seconds while its position or delay keeps
+# changing; each unchanged poll stretches the interval by POLL_BACKOFF, up to MAX_POLL_INTERVAL
+MIN_POLL_INTERVAL = float(os.getenv("TRAIN_MCP_TRACKER_MIN_POLL", "60"))
+MAX_POLL_INTERVAL = float(os.getenv("TRAIN_MCP_TRACKER_MAX_POLL", "600"))
+POLL_BACKOFF = 1.5
+# Subscriptions nobody has read for this long are dropped
+SUBSCRIPTION_IDLE = float(os.getenv("TRAIN_MCP_TRACKER_IDLE", "1800"))
+MAX_SUBSCRIPTIONS = int(os.getenv("TRAIN_MCP_TRACKER_MAX_TRAINS", "200"))
+HISTORY_SIZE = 512
+# Delay trend used for ETAs: slope of delay over the last TREND_WINDOW seconds, clamped to +-MAX_TREND min/min;
+# observations spanning less than TREND_MIN_SPAN seconds are too close together to show a trend
+TREND_WINDOW = 3600
+TREND_MIN_SPAN = 600
+MAX_TREND = 0.5
+POLL_TIMEOUT = 30
+
+IST = datetime.timezone(datetime.timedelta(hours=5, minutes=30))
+UNKNOWN_DELAY = -1
+_DELAY_RE = re.compile(r"(\d+)")
+
+
+def parse_delay(value):
+    """
+    Delay in minutes from "HH:MM", a number of minutes or text such as "12 min"; None if unknown.
+    """
+    if isinstance(value, (int, float)):
+        return max(0, int(value))
+    if not isinstance(value, str):
+        return None
+    hours, sep, minutes = value.strip().partition(":")
+    if sep and hours.isdigit() and minutes[:2].isdigit():
+        return int(hours) * 60 + int(minutes[:2])
+    match = _DELAY_RE.search(value)
+    return int(match.group(1)) if match else None
+
+
+class TrainHistory:
+    """
+    Position and delay changes of one train run, kept as parallel arrays.
+    Every stored change gets the next sequence number; clients pass the last one they saw as a cursor.
+    """
+
+    def __init__(self, size: int = HISTORY_SIZE):
+        self.size = size
+        self.first_seq = 1
+        self.times = array.array("d")  # epoch seconds of each change
+        self.delays = array.array("i")  # minutes, UNKNOWN_DELAY when not reported
+        self.stations = array.array("H")  # index into station_codes
+        self.statuses = []
+        self.station_codes = []
+        self._station_ids = {}
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    @property
+    def last_seq(self) -> int:
+        return self.first_seq + len(self.times) - 1
+
+    def append(self, at: float, station: str, delay, status: str) -> bool:
+        """
+        Record an observation. Returns False (and stores nothing) when nothing changed.
+        """
+        station_id = self._station_ids.get(station)
+        if station_id is None:
+            station_id = self._station_ids[station] = len(self.station_codes)
+            self.station_codes.append(station)
+        delay = UNKNOWN_DELAY if delay is None else delay
+        if self.times and (self.stations[-1], self.delays[-1], self.statuses[-1]) == (station_id, delay, status):
+            return False
+        self.times.append(at)
+        self.stations.append(station_id)
+        self.delays.append(delay)
+        self.statuses.append(status)
+        if len(self.times) > self.size:
+            drop = len(self.times) - self.size
+            del self.times[:drop], self.stations[:drop], self.delays[:drop], self.statuses[:drop]
+            self.first_seq += drop
+        return True
+
+    def entry(self, index: int) -> dict:
+        delay = self.delays[index]
+        return {
+            "seq": self.first_seq + index,
+            "at": datetime.datetime.fromtimestamp(self.times[index], IST).strftime("%Y-%m-%d %H:%M"),
+            "station_code": self.station_codes[self.stations[index]] or None,
+            "delay_minutes": None if delay == UNKNOWN_DELAY else delay,
+            "status": self.statuses[index],
+        }
+
+    def since(self, cursor: int) -> list:
+        start = max(0, cursor + 1 - self.first_seq)
+        return [self.entry(index) for index in range(start, len(self.times))]
+
+    def latest(self):
+        return self.entry(len(self.times) - 1) if self.times else None
+
+    def delay_trend(self, now: float) -> float:
+        """
+        Least-squares slope of the delay over the trend window, in minutes of delay per minute.
+        """
+        points = [
+            (self.times[index] / 60.0, self.delays[index])
+            for index in range(len(self.times))
+            if now - self.times[index] <= TREND_WINDOW and self.delays[index] != UNKNOWN_DELAY
+        ]
+        if len(points) < 2 or (points[-1][0] - points[0][0]) * 60.0 < TREND_MIN_SPAN:
+            return 0.0
+        mean_t = sum(t for t, _ in points) / len(points)
+        mean_d = sum(d for _, d in points) / len(points)
+        spread = sum((t - mean_t) ** 2 for t, _ in points)
+        if not spread:
+            return 0.0
+        slope = sum((t - mean_t) * (d - mean_d) for t, d in points) / spread
+        return max(-MAX_TREND, min(MAX_TREND, slope))
+
+
+class Subscription:
+    __slots__ = ("train_number", "date", "history", "schedule", "interval", "next_poll", "last_read",
+                 "last_error", "finished", "polls")
+
+    def __init__(self, train_number: str, date: str):
+        self.train_number = train_number
+        self.date = date
+        self.history = TrainHistory()
+        self.schedule = None
+        self.interval = MIN_POLL_INTERVAL
+        self.next_poll = 0.0
+        self.last_read = time.monotonic()
+        self.last_error = None
+        self.finished = False
+        self.polls = 0
+
+
+class Tracker:
+    """
+    Polls subscribed train runs in the background at an adaptive interval and keeps their
+    position and delay history. Clients read changes since a cursor plus ETAs for the
+    stations ahead, derived from the schedule, the current delay and its recent trend.
+
+    poll(train_number, date) is a coroutine returning a normalised live status
+    ({"current_station_code", "delay_minutes", "status", ...} or {"error"});
+    schedule(train_number) is a coroutine returning an upstream schedule response.
+    """
+
+    def __init__(self, poll, schedule):
+        self.poll = poll
+        self.schedule = schedule
+        self.subscriptions = {}
+
+    def subscribe(self, train_number: str, date: str) -> Subscription:
+        key = (str(train_number).strip(), str(date).strip())
+        subscription = self.subscriptions.get(key)
+        if subscription is None:
+            self._expire_idle()
+            if len(self.subscriptions) >= MAX_SUBSCRIPTIONS:
+                raise ValueError(f"Already tracking {MAX_SUBSCRIPTIONS} trains, try again later")
+            subscription = self.subscriptions[key] = Subscription(*key)
+        subscription.last_read = time.monotonic()
+        return subscription
+
+    def unsubscribe(self, train_number: str, date: str) -> bool:
+        return self.subscriptions.pop((str(train_number).strip(), str(date).strip()), None) is not None
+
+    async def refresh(self, subscription: Subscription) -> None:
+        """
+        Poll one train run now, record any change and schedule the next poll.
+        """
+        subscription.polls += 1
+        if subscription.schedule is None:
+            # Left as None when the fetch fails or has no route, so that the next poll retries it
+            try:
+                data = await self.schedule(subscription.train_number)
+                subscription.schedule = parse_schedule(subscription.train_number, data)
+            except Exception as e:
+                logger.warning(f"Schedule for tracked train {subscription.train_number} unavailable: {e}")
+        status = await self.poll(subscription.train_number, subscription.date)
+        now = time.monotonic()
+        if not isinstance(status, dict) or "error" in status:
+            subscription.last_error = status.get("error") if isinstance(status, dict) else str(status)
+            subscription.interval = min(MAX_POLL_INTERVAL, subscription.interval * POLL_BACKOFF)
+            subscription.next_poll = now + subscription.interval
+            return
+        subscription.last_error = None
+        station = str(status.get("current_station_code") or "")
+        changed = subscription.history.append(
+            time.time(), station, parse_delay(status.get("delay_minutes")), str(status.get("status") or "")
+        )
+        stops = subscription.schedule.get("stops") if subscription.schedule else None
+        if stops and station == stops[-1][0]:
+            subscription.finished = True
+        if changed:
+            subscription.interval = MIN_POLL_INTERVAL
+        else:
+            subscription.interval = min(MAX_POLL_INTERVAL, subscription.interval * POLL_BACKOFF)
+        subscription.next_poll = now + subscription.interval
+
+    async def track(self, train_number: str, date: str, stop: bool = False, eta_stops: int = 5) -> dict:
+        """
+        Start tracking a train run and return where it is now, with ETAs whether or not anything
+        changed; or stop tracking it when stop is set.
+        """
+        if stop:
+            return {"train_number": str(train_number).strip(), "date": str(date).strip(), "tracking": False,
+                    "stopped": self.unsubscribe(train_number, date)}
+        try:
+            subscription = self.subscribe(train_number, date)
+        except ValueError as e:
+            return {"error": str(e)}
+        if not subscription.finished and subscription.next_poll <= time.monotonic():
+            await self.refresh(subscription)
+        result = {
+            "train_number": subscription.train_number,
+            "date": subscription.date,
+            "tracking": not subscription.finished,
+            "cursor": subscription.history.last_seq,
+            "current": subscription.history.latest(),
+            "eta": self.eta(subscription, eta_stops),
+            "next_poll_seconds": 0 if subscription.finished else round(max(0.0, subscription.next_poll - time.monotonic())),
+        }
+        if subscription.finished:
+            result["finished"] = True
+        if subscription.last_error:
+            result["last_error"] = subscription.last_error
+        return result
+
+    async def updates(self, train_number: str, date: str, cursor: int = 0, eta_stops: int = 5) -> dict:
+        """
+        Changes since cursor for a train run, subscribing to it if needed. ETAs are included
+        only when something changed, so an unchanged train costs a few bytes per call.
+        """
+        try:
+            subscription = self.subscribe(train_number, date)
+        except ValueError as e:
+            return {"error": str(e)}
+        if not subscription.finished and subscription.next_poll <= time.monotonic():
+            await self.refresh(subscription)
+        history = subscription.history
+        cursor = max(0, int(cursor or 0))
+        result = {
+            "train_number": subscription.train_number,
+            "date": subscription.date,
+            "cursor": history.last_seq,
+            "changes": history.since(cursor),
+            "next_poll_seconds": 0 if subscription.finished else round(max(0.0, subscription.next_poll - time.monotonic())),
+        }
+        if cursor and cursor < history.first_seq - 1:
+            result["truncated"] = True
+        if subscription.finished:
+            result["finished"] = True
+        if subscription.last_error:
+            result["last_error"] = subscription.last_error
+        if result["changes"]:
+            result["eta"] = self.eta(subscription, eta_stops)
+        return result
+
+    def eta(self, subscription: Subscription, limit: int = 5) -> list:
+        """
+        Expected arrival at the next `limit` stations: scheduled time plus the current delay,
+        extrapolated along the recent delay trend (a recovering train is assumed to keep recovering).
+        """
+        stops = (subscription.schedule or {}).get("stops")
+        latest = subscription.history.latest()
+        start = _journey_start(subscription.date)
+        if not stops or latest is None or start is None:
+            return []
+        delay = latest["delay_minutes"] or 0
+        now = time.time()
+        trend = subscription.history.delay_trend(now)
+        codes = [code for code, _, _ in stops]
+        now_minutes = (now - start.timestamp()) / 60.0
+        if latest["station_code"] in codes:
+            ahead = stops[codes.index(latest["station_code"]) + 1:]
+        else:
+            ahead = [stop for stop in stops if stop[1] + delay >= now_minutes]
+        estimates = []
+        for code, arrival, _ in ahead[:max(0, limit)]:
+            until = max(0.0, arrival + delay - now_minutes)
+            expected_delay = max(0.0, delay + trend * until)
+            estimates.append({
+                "station_code": code,
+                "scheduled": (start + datetime.timedelta(minutes=arrival)).strftime("%Y-%m-%d %H:%M"),
+                "expected": (start + datetime.timedelta(minutes=arrival + expected_delay)).strftime("%Y-%m-%d %H:%M"),
+                "delay_minutes": round(expected_delay),
+            })
+        return estimates
+
+    async def run(self) -> None:
+        """
+        Background loop: poll every subscription that is due, at bulk priority.
+        """
+        while True:
+            self._expire_idle()
+            now = time.monotonic()
+            due = [sub for sub in self.subscriptions.values() if not sub.finished and sub.next_poll <= now]
+            if due:
+                with deadlines.detached(POLL_TIMEOUT), ratelimit.priority(ratelimit.BULK):
+                    results = await asyncio.gather(*(self.refresh(sub) for sub in due), return_exceptions=True)
+                for sub, result in zip(due, results):
+                    if isinstance(result, Exception):
+                        logger.warning(f"Tracking {sub.train_number} failed: {result}")
+                        sub.next_poll = time.monotonic() + sub.interval
+            upcoming = [sub.next_poll for sub in self.subscriptions.values() if not sub.finished]
+            wait = min(upcoming) - time.monotonic() if upcoming else MIN_POLL_INTERVAL
+            await asyncio.sleep(min(max(1.0, wait), MIN_POLL_INTERVAL))
+
+    def stats(self) -> dict:
+        return {
+            "tracked": len(self.subscriptions),
+            "history_entries": sum(len(sub.history) for sub in self.subscriptions.values()),
+        }
+
+    def _expire_idle(self) -> None:
+        cutoff = time.monotonic() - SUBSCRIPTION_IDLE
+        for key in [key for key, sub in self.subscriptions.items() if sub.last_read < cutoff]:
+            del self.subscriptions[key]
+
+
+def _journey_start(date: str):
+    """
+    Midnight (IST) of the day the train run started, from a yyyymmdd or yyyy-mm-dd date.
+    """
+    for pattern in ("%Y%m%d", "%Y-%m-%d", "%d-%m-%Y"):
+        try:
+            day = datetime.datetime.strptime(str(date).strip(), pattern)
+            return day.replace(tzinfo=IST)
+        except ValueError:
+            continue
+    return None
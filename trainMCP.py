@@ -1,280 +1,340 @@
-import os
-import requests
 from dotenv import load_dotenv
-from mcp.server.fastmcp import FastMCP
 import logging
-import sys
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("train-mcp")
 
+# Provider settings are read when endpoints and upstream are imported
 load_dotenv()
 
+import endpoints
+from metrics import InstrumentedFastMCP
+from upstream import add_response_listener, add_background_worker, lifespan
+from availability import availability_matrix, class_codes, date_range
+from batch import gather_bounded
+from boards import trains_through_station
+from journeys import best_journeys
+from records import shape_response
+from store import import_reference_data, preload
+import providers
+import serving
+from timetable import parse_schedule, plan_journey as plan_journey_locally
+from tracker import Tracker
+from stations import learn_from_response, load_index, local_station_code, local_station_search, station_suggestions
 
-# Initialize the MCP server
-mcp = FastMCP("IRCTC MCP Server")
-
-# Set your RapidAPI credentials
-RAPIDAPI_KEY = os.getenv("RAPIDAPI_KEY")  # Ensure this environment variable is set
-RAPIDAPI_HOST = "irctc1.p.rapidapi.com"
-BASE_URL = f"https://{RAPIDAPI_HOST}"
-INDIAN_RAIL_API_KEY = os.getenv("INDIAN_RAIL_API_KEY")  # Ensure this environment variable is set
-INDIAN_RAIL_BASE_URL = "http://indianrailapi.com/api/v2"
 
-HEADERS = {
-    "X-RapidAPI-Key": RAPIDAPI_KEY,
-    "X-RapidAPI-Host": RAPIDAPI_HOST
-}
+# Initialize the MCP server
+mcp = InstrumentedFastMCP("IRCTC MCP Server", lifespan=lifespan)
+add_response_listener(learn_from_response)
+add_background_worker(preload)
 
 @mcp.tool()
-def station_name_to_code(station_name: str) -> dict:
+async def station_name_to_code(station_name: str) -> dict:
     """
     Convert a station name to its code using Indian Rail API.
-    Note name should be in uppercase (e.g., "ERODE JN").
+    Known stations are answered from the local station index; the name is case-insensitive.
     Parameters:
         station_name: The name of the station (e.g., "ERODE JN").
     """
-    try:
-        station_name = station_name.upper()
-        url = f"{INDIAN_RAIL_BASE_URL}/StationNameToCode/apikey/{INDIAN_RAIL_API_KEY}/StationName/{station_name}"
-        response = requests.get(url, timeout=300)
-        response.raise_for_status()
-        return response.json()
-    except Exception as e:
-        return {"error": str(e)}
+    await load_index()
+    local = local_station_code(station_name)
+    if local is not None:
+        return local
+    data = await endpoints.call("StationNameToCode", {"station_name": station_name})
+    if "error" in data:
+        data = {**data, "suggestions": station_suggestions(station_name)}
+    return data
+
+@mcp.tool()
+async def find_station(query: str, limit: int = 10) -> dict:
+    """
+    Search stations by code or name without calling the upstream API.
+    Matches exact codes and names, name prefixes and misspelled names.
+    Parameters:
+        query: Station code or (partial, possibly misspelled) name (e.g., "erod jn").
+        limit: Maximum number of matches to return (e.g., 10).
+    """
+    await load_index()
+    return {"query": query, "matches": station_suggestions(query, limit)}
 
+tools = endpoints.register(
+    mcp, "TrainSchedule", "AllTrainOnStation", "searchTrain", "trainBetweenStations", "getTrainSchedule",
+    "liveTrainStatus", "getPNRStatus", "checkSeatAvailability", "getTrainClasses", "getFare",
+    "getTrainsByStation", "getLiveStation",
+)
+get_train_schedule_indian_rail = tools["get_train_schedule_indian_rail"]
+get_train_schedule = tools["get_train_schedule"]
+get_live_train_status = tools["get_live_train_status"]
+get_pnr_status = tools["get_pnr_status"]
+check_seat_availability = tools["check_seat_availability"]
+get_train_classes = tools["get_train_classes"]
+get_fare = tools["get_fare"]
+find_trains_between_stations = tools["find_trains_between_stations"]
+get_all_trains_on_station = tools["get_all_trains_on_station"]
+get_trains_by_station = tools["get_trains_by_station"]
 
+@mcp.tool()
+async def search_station(query: str, fields: list[str] = None, limit: int = None, offset: int = 0) -> dict:
+    """
+    Search for a station by query.
+    Exact code or name matches are answered from the local station index, flagged "exact";
+    other searches go upstream unless the local station list is complete.
+    Parameters:
+        query: Station name or code to search for.
+        fields: (Optional) Record fields to return (e.g., ["code", "name"]); returns compact records.
+        limit: (Optional) Maximum number of records to return.
+        offset: (Optional) Number of records to skip.
+    """
+    await load_index()
+    local = local_station_search(query)
+    if local is not None:
+        page = shape_response("searchStation", local, fields, limit, offset)
+        if local.get("exact") and "items" in page:
+            page["exact"] = True
+        return page
+    return await endpoints.call("searchStation", {"query": query}, fields, limit, offset)
 
 @mcp.tool()
-def get_train_schedule_indian_rail(train_number: str) -> dict:
+async def plan_journey(from_station: str, to_station: str, departure_time: str = "00:00", date: str = None, max_changes: int = 1) -> dict:
     """
-    Get the schedule of a train by its number using Indian Rail API.
+    Plan journeys between two stations, including connections with changes of train.
+    Answered locally from the timetable built from train schedules fetched earlier,
+    returning the earliest arrival for each number of changes.
     Parameters:
-        train_number: The train number (e.g., "19038").
+        from_station: Source station code (e.g., "NDLS").
+        to_station: Destination station code (e.g., "BCT").
+        departure_time: Earliest departure time in HH:MM format (e.g., "18:00").
+        date: (Optional) Date of journey in yyyymmdd format, to honour running days.
+        max_changes: Maximum number of changes of train, at most 3 (e.g., 1).
     """
-    try:
-        url = f"{INDIAN_RAIL_BASE_URL}/TrainSchedule/apikey/{INDIAN_RAIL_API_KEY}/TrainNumber/{train_number}"
-        response = requests.get(url, timeout=300)
-        response.raise_for_status()
-        return response.json()
-    except Exception as e:
-        return {"error": str(e)}
+    return await plan_journey_locally(from_station, to_station, departure_time, date, max_changes)
+
+async def _station_board(station_code: str) -> dict:
+    data = await get_all_trains_on_station(station_code)
+    if "error" in data:
+        data = await get_trains_by_station(station_code)
+    return data
 
 @mcp.tool()
-def get_all_trains_on_station(station_code: str) -> dict:
+async def get_trains_through_station(station_code: str, from_time: str = "00:00", to_time: str = "23:59", day: str = None, limit: int = None) -> dict:
     """
-    Get all trains arriving at or departing from a station using Indian Rail API.
+    Get the trains calling at a station between two times, e.g. from 18:00 to 22:00 on a Friday.
+    Answered locally from known train schedules when they cover every train at the station,
+    otherwise from the station's upstream board.
     Parameters:
         station_code: The station code (e.g., "NDLS").
+        from_time: (Optional) Start of the window in HH:MM format (e.g., "18:00").
+        to_time: (Optional) End of the window in HH:MM format, inclusive; may be past midnight (e.g., "22:00").
+        day: (Optional) Date in yyyymmdd or yyyy-mm-dd format, or weekday name (e.g., "FRI"), to honour running days.
+        limit: (Optional) Maximum number of trains to return.
     """
-    try:
-        url = f"{INDIAN_RAIL_BASE_URL}/AllTrainOnStation/apikey/{INDIAN_RAIL_API_KEY}/StationCode/{station_code}"
-        response = requests.get(url, timeout=300)
-        response.raise_for_status()
-        return response.json()
-    except Exception as e:
-        return {"error": str(e)}
+    return await trains_through_station(_station_board, station_code, from_time, to_time, day, limit)
 
+@mcp.tool()
+async def get_live_train_status_batch(train_numbers: list[str], day: str = None, concurrency: int = None) -> dict:
+    """
+    Get live status of several trains in one call, fetched concurrently.
+    Parameters:
+        train_numbers: Train numbers (e.g., ["12951", "19038"]).
+        day: (Optional) Start day, as for get_live_train_status.
+        concurrency: (Optional) Maximum number of upstream requests in flight.
+    """
+    return await gather_bounded(train_numbers, lambda train_number: get_live_train_status(train_number, day), concurrency)
 
 @mcp.tool()
-def search_station(query: str) -> dict:
+async def get_pnr_status_batch(pnr_numbers: list[str], concurrency: int = None) -> dict:
     """
-    Search for a station by query.
+    Get the status of several PNRs in one call, fetched concurrently.
+    Parameters:
+        pnr_numbers: PNR numbers (e.g., ["1234567890", "2345678901"]).
+        concurrency: (Optional) Maximum number of upstream requests in flight.
     """
-    try:
-        url = f"{BASE_URL}/api/v1/searchStation"
-        params = {"query": query}
-        response = requests.get(url, headers=HEADERS, params=params, timeout=300)
-        response.raise_for_status()
-        return response.json()
-    except Exception as e:
-        return {"error": str(e)}
+    return await gather_bounded(pnr_numbers, get_pnr_status, concurrency)
+
 
 @mcp.tool()
-def search_train(query: str) -> dict:
+async def check_seat_availability_matrix(from_station_code: str, to_station_code: str, start_date: str, days: int = 7, train_numbers: list[str] = None, classes: list[str] = None, quotas: list[str] = None, concurrency: int = None) -> dict:
     """
-    Search for a train by query.
+    Check seat availability for several trains, dates, classes and quotas in one call.
+    Returns a grid of statuses per train and CLASS/QUOTA (one entry per date) plus the list of bookable cells.
+    Parameters:
+        from_station_code: Source station code (e.g., "ST").
+        to_station_code: Destination station code (e.g., "BVI").
+        start_date: First date of journey in dd-mm-yyyy format.
+        days: (Optional) Number of consecutive dates to check (e.g., 7).
+        train_numbers: (Optional) Trains to check (e.g., ["12951", "19038"]); defaults to the trains running between the stations.
+        classes: (Optional) Classes to check (e.g., ["3A", "2A"]); defaults to each train's classes.
+        quotas: (Optional) Quotas to check (e.g., ["GN", "TQ"]); defaults to ["GN"].
+        concurrency: (Optional) Maximum number of upstream requests in flight.
     """
+    from_station_code, to_station_code = from_station_code.strip().upper(), to_station_code.strip().upper()
     try:
-        url = f"{BASE_URL}/api/v1/searchTrain"
-        params = {"query": query}
-        response = requests.get(url, headers=HEADERS, params=params, timeout=300)
-        response.raise_for_status()
-        return response.json()
-    except Exception as e:
+        dates = date_range(start_date, days)
+    except ValueError as e:
         return {"error": str(e)}
+    if not train_numbers:
+        trains = await find_trains_between_stations(from_station_code, to_station_code, dates[0].isoformat(), ["train_number"])
+        if "error" in trains:
+            return trains
+        train_numbers = [train["train_number"] for train in trains["items"]]
+        if not train_numbers:
+            return {"error": f"No trains found between {from_station_code} and {to_station_code}"}
+
+    async def classes_for(train_number):
+        if classes:
+            return [code.strip().upper() for code in classes]
+        return class_codes(await get_train_classes(train_number))
+
+    async def fetch(train_number, date, class_type, quota):
+        return await check_seat_availability(train_number, date.strftime("%d-%m-%Y"), class_type, quota, from_station_code, to_station_code)
 
+    matrix = await availability_matrix(fetch, train_numbers, dates, classes_for, quotas or ["GN"], concurrency)
+    if "error" not in matrix:
+        matrix = {"from": from_station_code, "to": to_station_code, **matrix}
+    return matrix
 
 @mcp.tool()
-def find_trains_between_stations(from_station_code: str, to_station_code: str, date: str) -> dict:
+async def find_best_journeys(from_station_code: str, to_station_code: str, date: str, rank_by: str = "price", classes: list[str] = None, quota: str = "GN", only_available: bool = True, limit: int = 10, concurrency: int = None) -> dict:
     """
-    Find trains between two stations on a specific date.
-    Date format: YYYY-MM-DD
+    Find the cheapest, fastest or earliest trains between two stations on a date, with the fare and seat
+    availability of each class, in one call. Replaces looking up trains, then fares and availability per train.
+    Parameters:
+        from_station_code: Source station code (e.g., "NDLS").
+        to_station_code: Destination station code (e.g., "BCT").
+        date: Date of journey in dd-mm-yyyy or yyyy-mm-dd format.
+        rank_by: (Optional) "price", "duration" or "departure" (e.g., "price").
+        classes: (Optional) Classes to consider (e.g., ["3A", "2A"]); defaults to every class with a fare.
+        quota: (Optional) Quota type (e.g., "GN").
+        only_available: (Optional) Return only options that can be booked now (e.g., true).
+        limit: (Optional) Maximum number of options to return (e.g., 10).
+        concurrency: (Optional) Maximum number of upstream requests in flight.
     """
-    try:
-        url = f"{BASE_URL}/api/v3/trainBetweenStations"
-        params = {
-            "fromStationCode": from_station_code,
-            "toStationCode": to_station_code,
-            "dateOfJourney": date
-        }
-        response = requests.get(url, headers=HEADERS, params=params, timeout=300)
-        response.raise_for_status()
-        return response.json()
-    except Exception as e:
-        return {"error": str(e)}
+    from_station_code, to_station_code = from_station_code.strip().upper(), to_station_code.strip().upper()
+    quota = quota.strip().upper()
+
+    async def trains_between(journey_date):
+        return await find_trains_between_stations(from_station_code, to_station_code, journey_date.isoformat())
+
+    async def fare(train_number):
+        return await get_fare(train_number, from_station_code, to_station_code)
+
+    async def availability(train_number, journey_date, class_type):
+        return await check_seat_availability(train_number, journey_date.strftime("%d-%m-%Y"), class_type, quota, from_station_code, to_station_code)
+
+    return await best_journeys(trains_between, fare, availability, from_station_code, to_station_code, date,
+                               classes, quota, rank_by, only_available, limit, concurrency)
 
 @mcp.tool()
-def get_train_schedule(train_number: str) -> dict:
+async def import_timetable(train_numbers: list[str], concurrency: int = None) -> dict:
     """
-    Get the schedule of a train by its number.
+    Fetch and store the Indian Rail API schedules of the given trains, so that schedule lookups,
+    station boards and local journey planning work without the network, also after the server restarts.
+    Parameters:
+        train_numbers: Trains whose schedules to fetch and store (e.g., ["12951", "19038"]).
+        concurrency: (Optional) Maximum number of upstream requests in flight.
     """
-    try:
-        url = f"{BASE_URL}/api/v1/getTrainSchedule"
-        params = {"trainNo": train_number}
-        response = requests.get(url, headers=HEADERS, params=params, timeout=300)
-        response.raise_for_status()
-        return response.json()
-    except Exception as e:
-        return {"error": str(e)}
+    return await import_reference_data(train_numbers, concurrency, get_train_schedule_indian_rail)
 
 @mcp.tool()
-def get_live_train_status(train_number: str, day: str = None) -> dict:
+async def get_train_schedule_hedged(train_number: str) -> dict:
     """
-    Get live status of a train.
-    Optional File start day range from 0-4 0 = Day 1 1 = 1 Day Ago 2 = 2 Day Ago 3 = 3 Day Ago 4 = 4 Day Ago
+    Get the schedule of a train from whichever provider answers first (Indian Rail API or RapidAPI),
+    normalised to a common shape. A slow provider is backed up by the other one.
+    Parameters:
+        train_number: The train number (e.g., "19038").
     """
-    try:
-        url = f"{BASE_URL}/api/v1/liveTrainStatus"
-        params = {
-            "trainNo": train_number,
-            "stratDay": day
-        }
-        response = requests.get(url, headers=HEADERS, params=params, timeout=300)
-        response.raise_for_status()
-        return response.json()
-    except Exception as e:
-        return {"error": str(e)}
+    return await providers.call("train_schedule", train_number=train_number)
 
 @mcp.tool()
-def get_pnr_status(pnr_number: str) -> dict:
+async def get_live_train_status_hedged(train_number: str, date: str) -> dict:
     """
-    Get PNR status.
+    Get live status of a train from whichever provider answers first, normalised to a common shape.
+    Parameters:
+        train_number: The train number (e.g., "19038").
+        date: Date of journey in yyyymmdd format.
     """
-    try:
-        url = f"{BASE_URL}/api/v3/getPNRStatus"
-        params = {"pnrNumber": pnr_number}
-        response = requests.get(url, headers=HEADERS, params=params, timeout=300)
-        response.raise_for_status()
-        return response.json()
-    except Exception as e:
-        return {"error": str(e)}
+    return await providers.call("live_train_status", train_number=train_number, date=date)
+
+async def _schedule_for_tracking(train_number: str) -> dict:
+    data = await get_train_schedule_indian_rail(train_number)
+    if parse_schedule(train_number, data) is None:
+        data = await get_train_schedule(train_number)
+    return data
 
+tracker = Tracker(get_live_train_status_hedged, _schedule_for_tracking)
+add_background_worker(tracker.run)
 
 @mcp.tool()
-def check_seat_availability(train_no: str, date: str, class_type: str, quota: str, from_station_code: str, to_station_code: str) -> dict:
+async def track_train(train_number: str, date: str, stop: bool = False) -> dict:
     """
-    Check seat availability for a train.
+    Start tracking a running train and get its current position and expected arrival times, or stop
+    tracking it. Its position and delay are then polled in the background, more often while they change;
+    read what changed with get_train_updates, passing the returned cursor.
     Parameters:
-        train_no: Train number (e.g., "19038").
-        date: Date of journey in dd-mm-yyyy format.
-        class_type: Class type (e.g., "2A").
-        quota: Quota type (e.g., "GN").
-        from_station_code: Source station code (e.g., "ST").
-        to_station_code: Destination station code (e.g., "BVI").
+        train_number: The train number (e.g., "19038").
+        date: Date the train started its run in yyyymmdd format.
+        stop: (Optional) Stop tracking the train instead (e.g., false).
     """
-    try:
-        url = f"{BASE_URL}/api/v1/checkSeatAvailability"
-        params = {
-            "trainNo": train_no,
-            "date": date,
-            "classType": class_type,
-            "quota": quota,
-            "fromStationCode": from_station_code,
-            "toStationCode": to_station_code
-        }
-        response = requests.get(url, headers=HEADERS, params=params, timeout=300)
-        response.raise_for_status()
-        return response.json()
-    except Exception as e:
-        return {"error": str(e)}
+    return await tracker.track(train_number, date, stop)
 
 @mcp.tool()
-def get_train_classes(train_number: str) -> dict:
+async def get_train_updates(train_number: str, date: str, cursor: int = 0, eta_stops: int = 5) -> dict:
     """
-    Get available classes for a train.
+    Get what changed for a tracked train since the last call, plus expected arrival times at the next
+    stations (only when something changed). Starts tracking the train if it is not tracked yet.
+    Parameters:
+        train_number: The train number (e.g., "19038").
+        date: Date the train started its run in yyyymmdd format.
+        cursor: (Optional) The cursor returned by the previous call; 0 returns the whole history.
+        eta_stops: (Optional) Number of upcoming stations to estimate arrival times for (e.g., 5).
     """
-    try:
-        url = f"{BASE_URL}/api/v1/getTrainClasses"
-        params = {"trainNo": train_number}
-        response = requests.get(url, headers=HEADERS, params=params, timeout=300)
-        response.raise_for_status()
-        return response.json()
-    except Exception as e:
-        return {"error": str(e)}
+    return await tracker.updates(train_number, date, cursor, eta_stops)
 
 @mcp.tool()
-def get_fare(train_number: str, from_station_code: str, to_station_code: str) -> dict:
+async def get_live_station_status_hedged(station_code: str, hours: int) -> dict:
     """
-    Get fare details for a train journey.
+    Get live status of trains at a station from whichever provider answers first, normalised to a common shape.
+    Parameters:
+        station_code: The station code (e.g., "NDLS").
+        hours: Number of hours to fetch live status for (e.g., 2 or 4).
     """
-    try:
-        url = f"{BASE_URL}/api/v2/getFare"
-        params = {
-            "trainNo": train_number,
-            "fromStationCode": from_station_code,
-            "toStationCode": to_station_code,
-        }
-        response = requests.get(url, headers=HEADERS, params=params, timeout=300)
-        response.raise_for_status()
-        return response.json()
-    except Exception as e:
-        return {"error": str(e)}
+    return await providers.call("live_station", station_code=station_code.upper(), hours=hours)
 
 @mcp.tool()
-def get_trains_by_station(station_code: str) -> dict:
+async def get_fare_hedged(train_number: str, from_station_code: str, to_station_code: str, quota: str = "GN") -> dict:
     """
-    Get trains arriving at or departing from a station on a specific date.
+    Get fare details for a train journey from whichever provider answers first, normalised to a common shape.
+    Parameters:
+        train_number: The train number (e.g., "19038").
+        from_station_code: Source station code (e.g., "NDLS").
+        to_station_code: Destination station code (e.g., "BCT").
+        quota: Quota type (e.g., "GN").
     """
-    try:
-        url = f"{BASE_URL}/api/v3/getTrainsByStation"
-        params = {
-            "stationCode": station_code
-        }
-        response = requests.get(url, headers=HEADERS, params=params, timeout=300)
-        response.raise_for_status()
-        return response.json()
-    except Exception as e:
-        return {"error": str(e)}
+    return await providers.call(
+        "fare",
+        train_number=train_number,
+        from_station=from_station_code.upper(),
+        to_station=to_station_code.upper(),
+        quota=quota.upper(),
+    )
 
 @mcp.tool()
-def get_live_station_status(from_station_code: str, hours: int, to_station_code: str = None) -> dict:
+async def find_trains_between_stations_hedged(from_station_code: str, to_station_code: str, date: str = None) -> dict:
     """
-    Get live status of trains at a station for the next few hours.
+    Find trains between two stations from whichever provider answers first, normalised to a common shape.
     Parameters:
         from_station_code: Source station code (e.g., "NDLS").
-        hours: Number of hours to fetch live status for (e.g., 1).
-        to_station_code: (Optional) Destination station code (e.g., "BVI").
+        to_station_code: Destination station code (e.g., "BCT").
+        date: (Optional) Date of journey in YYYY-MM-DD format; RapidAPI is only asked when it is given.
     """
-    try:
-        url = f"{BASE_URL}/api/v3/getLiveStation"
-        params = {
-            "fromStationCode": from_station_code,
-            "hours": hours
-        }
-        if to_station_code:
-            params["toStationCode"] = to_station_code
-        response = requests.get(url, headers=HEADERS, params=params, timeout=300)
-        response.raise_for_status()
-        return response.json()
-    except Exception as e:
-        return {"error": str(e)}
+    return await providers.call(
+        "trains_between",
+        from_station=from_station_code.upper(),
+        to_station=to_station_code.upper(),
+        date=date,
+    )
+
 
 if __name__ == "__main__":
-    try:
-        if "mcp dev" in " ".join(sys.argv):
-            mcp.serve(host="127.0.0.1", port=5000, timeout=600)  # Set timeout to 600 seconds (10 minutes)
-        else:
-            mcp.serve(timeout=600)
-    except Exception as e:
-        logger.error(f"Error starting MCP server: {e}")
\ No newline at end of file
+    # stdio by default; see serving.py for the streamable-HTTP options
+    serving.main("trainMCP", mcp)
\ No newline at end of file
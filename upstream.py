@@ -0,0 +1,396 @@
+import os
+import time
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING
+
+import cache
+import circuit
+import deadlines
+import jsoncodec
+import prefetch
+import ratelimit
+from latency import LatencyWindow
+from metrics import registry
+from singleflight import SingleFlight
+
+if TYPE_CHECKING:
+    import aiohttp
+
+logger = logging.getLogger("train-mcp")
+
+# Connection pool settings shared by every server variant
+POOL_LIMIT = int(os.getenv("TRAIN_MCP_POOL_LIMIT", "256"))
+POOL_LIMIT_PER_HOST = int(os.getenv("TRAIN_MCP_POOL_LIMIT_PER_HOST", "128"))
+DNS_CACHE_TTL = int(os.getenv("TRAIN_MCP_DNS_CACHE_TTL", "300"))
+KEEPALIVE_TIMEOUT = float(os.getenv("TRAIN_MCP_KEEPALIVE_TIMEOUT", "30"))
+# Per-request timeouts adapt to each endpoint: a multiple of its recent p99 latency,
+# clamped between MIN_REQUEST_TIMEOUT and REQUEST_TIMEOUT (used until enough samples exist)
+REQUEST_TIMEOUT = float(os.getenv("TRAIN_MCP_REQUEST_TIMEOUT", "30"))
+MIN_REQUEST_TIMEOUT = float(os.getenv("TRAIN_MCP_MIN_REQUEST_TIMEOUT", "2"))
+TIMEOUT_PERCENTILE = 99
+TIMEOUT_MULTIPLIER = 3.0
+TIMEOUT_MIN_SAMPLES = 20
+
+_async_session = None
+_async_loop = None
+_lifespan_users = 0
+
+inflight_requests = SingleFlight()
+_response_listeners = []
+_latencies = {}  # endpoint -> LatencyWindow of successful request latencies
+hot_keys = prefetch.HotKeys()
+_workers = []  # coroutine functions run in the background while a server is up
+_worker_tasks = []
+_background = set()  # revalidation tasks, referenced until they finish
+
+
+def get_async_session() -> "aiohttp.ClientSession":
+    """
+    Return the process-wide aiohttp session used by every server.
+    The connector keeps connections alive, caches DNS lookups and bounds the pool size.
+    aiohttp is imported here, on the first upstream request, to keep server startup fast.
+    """
+    import aiohttp
+
+    global _async_session, _async_loop
+    loop = asyncio.get_running_loop()
+    if _async_session is None or _async_session.closed or _async_loop is not loop:
+        connector = aiohttp.TCPConnector(
+            limit=POOL_LIMIT,
+            limit_per_host=POOL_LIMIT_PER_HOST,
+            ttl_dns_cache=DNS_CACHE_TTL,
+            keepalive_timeout=KEEPALIVE_TIMEOUT,
+        )
+        _async_session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT),
+        )
+        _async_loop = loop
+    return _async_session
+
+
+async def close() -> None:
+    """
+    Close the shared session and release its pooled connections.
+    """
+    global _async_session
+    if _async_session is not None and not _async_session.closed:
+        await _async_session.close()
+    _async_session = None
+
+
+@asynccontextmanager
+async def lifespan(server):
+    """
+    FastMCP lifespan hook: opens the shared pool when the server starts and closes it on shutdown.
+    Nested sessions (e.g. over HTTP transports) share the pool; it is closed when the last one exits.
+    """
+    global _lifespan_users
+    _lifespan_users += 1
+    if not _worker_tasks:
+        _worker_tasks.extend(asyncio.ensure_future(worker()) for worker in _workers)
+    try:
+        yield {}
+    finally:
+        _lifespan_users -= 1
+        if _lifespan_users == 0:
+            for task in _worker_tasks:
+                task.cancel()
+            _worker_tasks.clear()
+            logger.info("Closing upstream connection pool")
+            await close()
+
+
+def add_background_worker(worker) -> None:
+    """
+    Register a coroutine function to run in the background from server start to shutdown.
+    """
+    _workers.append(worker)
+
+
+def add_response_listener(listener) -> None:
+    """
+    Register listener(endpoint, data) to be called with every fresh successful upstream response.
+    Used by the local indexes to learn from traffic; listeners must be cheap and must not mutate data.
+    """
+    _response_listeners.append(listener)
+
+
+async def _store(endpoint: str, key: str, ttl: int, data) -> None:
+    if not cache.is_cacheable(data):
+        return
+    if ttl:
+        await cache.response_cache.set_async(key, data, ttl)
+    for listener in _response_listeners:
+        try:
+            listener(endpoint, data)
+        except Exception as e:
+            logger.warning(f"Response listener failed for {endpoint}: {e}")
+
+
+def latency_window(endpoint: str) -> LatencyWindow:
+    window = _latencies.get(endpoint)
+    if window is None:
+        window = _latencies.setdefault(endpoint, LatencyWindow())
+    return window
+
+
+def timeout_for(endpoint: str) -> float:
+    """
+    Current per-request timeout for an endpoint, derived from its observed latency.
+    """
+    window = latency_window(endpoint)
+    if len(window) < TIMEOUT_MIN_SAMPLES:
+        return REQUEST_TIMEOUT
+    observed = window.percentile(TIMEOUT_PERCENTILE) * TIMEOUT_MULTIPLIER
+    return min(REQUEST_TIMEOUT, max(MIN_REQUEST_TIMEOUT, observed))
+
+
+async def fetch_data(url: str, params: dict = None, headers: dict = None, endpoint: str = None) -> dict:
+    """
+    Helper function to fetch data asynchronously through the shared aiohttp session.
+    Responses are served from the cache when the endpoint has a TTL, and identical
+    concurrent calls share a single upstream request. Calls give up when the current
+    request deadline passes, and fail fast while the endpoint's circuit is open; in
+    both cases an expired cached response is returned, marked stale, if there is one.
+    """
+    ttl = cache.ttl_for(endpoint)
+    key = cache.make_key(endpoint, url, params)
+    if ttl:
+        swr = cache.stale_while_revalidate_for(endpoint)
+        if swr:
+            hot_keys.touch(key, (url, params, headers, endpoint))
+        cached = await cache.response_cache.get_async(key)
+        if cached is not None:
+            registry.inc("train_mcp_cache_requests_total", (("endpoint", endpoint), ("result", "hit")))
+            return cached
+        stale = await cache.response_cache.get_stale_async(key, swr) if swr else None
+        if stale is not None:
+            registry.inc("train_mcp_cache_requests_total", (("endpoint", endpoint), ("result", "revalidate")))
+            _revalidate(key, (url, params, headers, endpoint))
+            value, age = stale
+            return {**value, "stale": True, "stale_seconds": round(age)} if isinstance(value, dict) else value
+        registry.inc("train_mcp_cache_requests_total", (("endpoint", endpoint), ("result", "miss")))
+    breaker = circuit.breaker_for(endpoint)
+    if not breaker.allow():
+        registry.inc("train_mcp_upstream_errors_total", (("endpoint", endpoint), ("type", "circuit_open")))
+        retry_after = round(breaker.retry_after(), 1)
+        return await _serve_stale(endpoint, key, {"error": f"{endpoint} is failing upstream, retry after {retry_after}s", "retry_after": retry_after})
+    remaining = deadlines.remaining()
+    if remaining is not None and remaining <= 0:
+        registry.inc("train_mcp_upstream_errors_total", (("endpoint", endpoint), ("type", "deadline")))
+        return await _serve_stale(endpoint, key, {"error": f"Deadline exceeded before calling {endpoint}"})
+    try:
+        # The shared request keeps running for other callers if this one runs out of time
+        data = await asyncio.wait_for(
+            inflight_requests.do(key, lambda: _fetch_and_store(url, params, headers, endpoint, key, ttl)), remaining
+        )
+    except asyncio.TimeoutError:
+        registry.inc("train_mcp_upstream_errors_total", (("endpoint", endpoint), ("type", "deadline")))
+        data = {"error": f"Deadline exceeded waiting for {endpoint}"}
+    if isinstance(data, dict) and "error" in data:
+        return await _serve_stale(endpoint, key, data)
+    return data
+
+
+async def _prefetch(key: str, request: tuple) -> None:
+    """
+    Fetch one key in the background and store it: at bulk priority, under its own
+    deadline, and not while the endpoint's circuit is open.
+    """
+    url, params, headers, endpoint = request
+    if not circuit.breaker_for(endpoint).allow():
+        return
+    with deadlines.detached(REQUEST_TIMEOUT), ratelimit.priority(ratelimit.BULK):
+        data = await inflight_requests.do(
+            key, lambda: _fetch_and_store(url, params, headers, endpoint, key, cache.ttl_for(endpoint))
+        )
+    registry.inc("train_mcp_prefetch_total", (("endpoint", endpoint), ("result", "error" if "error" in data else "ok")))
+
+
+def _revalidate(key: str, request: tuple) -> None:
+    """
+    Start a background refresh of key unless one is already in flight.
+    """
+    if inflight_requests.running(key):
+        return
+    task = asyncio.ensure_future(_prefetch(key, request))
+    _background.add(task)
+    task.add_done_callback(_background.discard)
+
+
+def _expires_in(key: str, request: tuple):
+    """
+    Seconds until key expires, less the endpoint's typical latency so refreshes land in time.
+    """
+    entry = cache.response_cache.memory.peek(key)
+    if entry is None:
+        return None
+    return entry[0] - time.time() - latency_window(request[3]).percentile(50, 0.0)
+
+
+async def _serve_stale(endpoint: str, key: str, error: dict) -> dict:
+    """
+    An expired cached response for key, marked stale, or the error when there is none.
+    """
+    stale = await cache.response_cache.get_stale_async(key)
+    if stale is None:
+        return error
+    value, age = stale
+    registry.inc("train_mcp_cache_requests_total", (("endpoint", endpoint), ("result", "stale")))
+    if not isinstance(value, dict):
+        return value
+    return {**value, "stale": True, "stale_seconds": round(age), "upstream_error": error["error"]}
+
+
+async def _fetch_and_store(url: str, params: dict, headers: dict, endpoint: str, key: str, ttl: int) -> dict:
+    import aiohttp
+
+    limiter = ratelimit.limiter_for(url)
+    level = ratelimit.current_priority(endpoint)
+    request_deadline = deadlines.expires_at()
+    deadline = time.monotonic() + ratelimit.QUEUE_DEADLINE
+    if request_deadline is not None:
+        deadline = min(deadline, request_deadline)
+    breaker = circuit.breaker_for(endpoint)
+    labels = (("endpoint", endpoint),)
+    caller_bound = False
+    try:
+        if params:
+            params = {name: value for name, value in params.items() if value is not None}
+        if headers:
+            headers = {name: value for name, value in headers.items() if value is not None}
+        session = get_async_session()
+        while True:
+            if limiter is not None:
+                queued_at = time.perf_counter()
+                await limiter.acquire(level, deadline)
+                registry.observe("train_mcp_upstream_queue_seconds", labels, time.perf_counter() - queued_at)
+            timeout = timeout_for(endpoint)
+            if request_deadline is not None and request_deadline - time.monotonic() < timeout:
+                timeout = max(0.001, request_deadline - time.monotonic())
+                caller_bound = True
+            registry.add("train_mcp_upstream_inflight", labels)
+            start = time.perf_counter()
+            status = "error"
+            try:
+                async with session.get(
+                    url, headers=headers, params=params, timeout=aiohttp.ClientTimeout(total=timeout)
+                ) as response:
+                    status = str(response.status)
+                    if response.status in (429, 503) and limiter is not None:
+                        retry_after = ratelimit.parse_retry_after(response.headers.get("Retry-After"))
+                        if retry_after is not None:
+                            registry.inc("train_mcp_upstream_errors_total", labels + (("type", "rate_limited"),))
+                            retry_after = min(retry_after, ratelimit.MAX_RETRY_AFTER)
+                            await limiter.block_for(retry_after)
+                            if time.monotonic() + retry_after < deadline:
+                                logger.info(f"{endpoint} rate limited upstream, retrying after {retry_after:.1f}s")
+                                continue
+                            return {"error": f"Upstream rate limit for {endpoint}", "retry_after": retry_after}
+                    response.raise_for_status()
+                    data = await jsoncodec.read_json(response, endpoint)
+                    latency_window(endpoint).record(time.perf_counter() - start)
+                    break
+            finally:
+                registry.observe("train_mcp_upstream_duration_seconds", labels + (("status", status),), time.perf_counter() - start)
+                registry.add("train_mcp_upstream_inflight", labels, -1)
+    except ratelimit.QueueDeadlineExceeded as e:
+        registry.inc("train_mcp_upstream_errors_total", labels + (("type", "queue_deadline"),))
+        return {"error": str(e), "retry_after": round(e.retry_after, 1)}
+    except Exception as e:
+        kind = error_type(e)
+        registry.inc("train_mcp_upstream_errors_total", labels + (("type", kind),))
+        if kind == "timeout" and caller_bound:
+            pass  # the caller ran out of time, which says nothing about the endpoint
+        elif _is_endpoint_failure(e):
+            breaker.record_failure()
+            if breaker.state != circuit.CLOSED:
+                logger.warning(f"Circuit for {endpoint} is {breaker.state} after {breaker.failures} failures: {e}")
+        elif kind != "http_429":
+            breaker.record_success()
+        return {"error": str(e)}
+    breaker.record_success()
+    await _store(endpoint, key, ttl, data)
+    return data
+
+
+def _is_endpoint_failure(error: Exception) -> bool:
+    """
+    Whether an error means the endpoint itself is unhealthy (as opposed to a bad request).
+    """
+    import aiohttp
+
+    if isinstance(error, aiohttp.ClientResponseError) and not isinstance(error, aiohttp.ContentTypeError):
+        return error.status >= 500
+    if isinstance(error, jsoncodec.ResponseTooLarge):
+        return False  # an oversized answer to one request says nothing about the endpoint
+    return isinstance(error, (asyncio.TimeoutError, aiohttp.ClientError, ValueError))
+
+
+def error_type(error: Exception) -> str:
+    """
+    Coarse class of an upstream failure, used as a metrics label.
+    """
+    import aiohttp
+
+    if isinstance(error, jsoncodec.ResponseTooLarge):
+        return "too_large"
+    if isinstance(error, (aiohttp.ContentTypeError, ValueError)):
+        return "decode"
+    if isinstance(error, aiohttp.ClientResponseError):
+        return f"http_{error.status}"
+    if isinstance(error, asyncio.TimeoutError):
+        return "timeout"
+    if isinstance(error, aiohttp.ClientConnectionError):
+        return "connection"
+    return type(error).__name__
+
+
+def upstream_stats() -> dict:
+    """
+    Counters describing the shared upstream path.
+    """
+    return {
+        "coalesced_calls": inflight_requests.coalesced,
+        "inflight_requests": inflight_requests.inflight(),
+        "cache_entries": len(cache.response_cache.memory),
+        "cache_bytes": cache.response_cache.memory.total_bytes,
+        "rate_limiters": {
+            limiter.name: {"granted": limiter.granted, "rejected": limiter.rejected, "queued": limiter.queued()}
+            for limiter in ratelimit.limiters.values()
+        },
+        "hot_keys": len(hot_keys),
+        "revalidating": len(_background),
+        "circuits": {
+            endpoint: {"state": breaker.state, "failures": breaker.failures, "timeout": round(timeout_for(endpoint), 2)}
+            for endpoint, breaker in circuit.breakers.items()
+        },
+    }
+
+
+def _collect_upstream_metrics() -> list:
+    samples = [
+        ("train_mcp_coalesced_calls_total", "counter", "Calls that joined an identical in-flight upstream request.", (), inflight_requests.coalesced),
+        ("train_mcp_cache_entries", "gauge", "Entries in the in-memory response cache.", (), len(cache.response_cache.memory)),
+        ("train_mcp_cache_bytes", "gauge", "Bytes held by the in-memory response cache.", (), cache.response_cache.memory.total_bytes),
+    ]
+    for limiter in ratelimit.limiters.values():
+        labels = (("host", limiter.name),)
+        samples.append(("train_mcp_ratelimit_granted_total", "counter", "Rate limit tokens granted.", labels, limiter.granted))
+        samples.append(("train_mcp_ratelimit_rejected_total", "counter", "Requests rejected at their queueing deadline.", labels, limiter.rejected))
+        samples.append(("train_mcp_ratelimit_queued", "gauge", "Requests waiting for a rate limit token.", labels, limiter.queued()))
+    for endpoint, breaker in circuit.breakers.items():
+        labels = (("endpoint", endpoint),)
+        samples.append(("train_mcp_circuit_open", "gauge", "1 while the endpoint's circuit is open or half open.", labels, int(breaker.state != circuit.CLOSED)))
+        samples.append(("train_mcp_circuit_opened_total", "counter", "Times the endpoint's circuit has opened.", labels, breaker.opened))
+    for endpoint in _latencies:
+        samples.append(("train_mcp_upstream_timeout_seconds", "gauge", "Current adaptive request timeout.", (("endpoint", endpoint),), timeout_for(endpoint)))
+    return samples
+
+
+registry.add_collector(_collect_upstream_metrics)
+if prefetch.PREFETCH_TOP_N > 0:
+    add_background_worker(lambda: prefetch.run_prefetcher(hot_keys, _expires_in, _prefetch))